@@ -1,4 +1,6 @@
 # Make Crawler a proper Python package
+import importlib
+
 from .exceptions import (
     CrawlerException,
     MaxDepthExceeded,
@@ -10,6 +12,18 @@ from .exceptions import (
     StorageError
 )
 
+# Основные классы импортируются при первом обращении (PEP 562), чтобы
+# `import Crawler` и запуск CLI не загружали aiohttp, bs4 и lxml заранее
+_LAZY_ATTRS = {
+    'CrawlerController': '.crawler_controller',
+    'CrawlerConfig': '.crawler_controller',
+    'URLManager': '.url_manager',
+    'WebFetcher': '.web_fetcher',
+    'ContentParser': '.content_parser',
+    'SiteTreeBuilder': '.site_tree_builder',
+    'DataStorage': '.data_storage',
+}
+
 __all__ = [
     'CrawlerController',
     'URLManager',
@@ -18,4 +32,15 @@ __all__ = [
     'SiteTreeBuilder',
     'DataStorage',
     'exceptions'
-]
\ No newline at end of file
+]
+
+def __getattr__(name):
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
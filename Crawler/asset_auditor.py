@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+from .data_storage import DataStorage
+from .link_checker import LinkChecker, LinkCheckResult
+from .storage_backend import SQLiteBackend
+
+logger = logging.getLogger(__name__)
+
+# Заголовки, которые сохраняются для каждого ресурса
+ASSET_HEADERS = ('Content-Type', 'Content-Length', 'Content-Range', 'Cache-Control',
+                 'ETag', 'Last-Modified', 'Expires')
+
+# Проверяются только сетевые ресурсы: data:, blob: и javascript: встроены в страницу
+PROBE_SCHEMES = ('http', 'https')
+
+@dataclass
+class AssetRecord:
+    """Результат проверки одного ресурса страницы"""
+    url: str
+    status_code: Optional[int] = None
+    content_type: Optional[str] = None
+    content_length: Optional[int] = None
+    cache_control: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    expires: Optional[str] = None
+    error: Optional[str] = None
+    checked_at: float = 0.0
+
+    @classmethod
+    def from_check(cls, result: LinkCheckResult) -> 'AssetRecord':
+        """Собирает запись из результата LinkChecker"""
+        headers = result.headers
+        return cls(
+            url=result.url,
+            status_code=result.status_code,
+            content_type=headers.get('Content-Type'),
+            content_length=cls._parse_size(result.method, headers),
+            cache_control=headers.get('Cache-Control'),
+            etag=headers.get('ETag'),
+            last_modified=headers.get('Last-Modified'),
+            expires=headers.get('Expires'),
+            error=result.error,
+            checked_at=result.checked_at
+        )
+
+    @staticmethod
+    def _parse_size(method: str, headers: Dict[str, str]) -> Optional[int]:
+        """
+        Размер ресурса в байтах
+
+        Для ranged GET полный размер берется из Content-Range (bytes 0-0/12345),
+        иначе — из Content-Length.
+        """
+        content_range = headers.get('Content-Range', '')
+        total = content_range.rpartition('/')[2]
+        if total.isdigit():
+            return int(total)
+        length = headers.get('Content-Length', '')
+        if length.isdigit() and (method == 'HEAD' or not content_range):
+            return int(length)
+        return None
+
+@dataclass
+class AssetAuditSummary:
+    """Итоги проверки ресурсов сканирования"""
+    crawl_id: int
+    unique_assets: int = 0
+    cached: int = 0
+    probed: int = 0
+    skipped: int = 0  # ресурсы не по http(s), которые не запрашиваются
+
+class AssetAuditor:
+    """
+    Инвентаризация ресурсов страниц и расчет полного веса страниц.
+
+    Каждый уникальный ресурс сканирования проверяется один раз пулом
+    HEAD-запросов LinkChecker, даже если на него ссылаются тысячи страниц;
+    результаты кэшируются в таблице assets на ttl секунд.
+    """
+
+    def __init__(self, storage: DataStorage, config: Dict):
+        self.storage = storage
+        self.config = dict(config, capture_headers=ASSET_HEADERS)
+        self.batch_size = config.get('batch_size', 500)
+
+    async def audit(self, crawl_id: int, ttl: float = 86400,
+                    on_result: Callable[[AssetRecord], None] = None) -> AssetAuditSummary:
+        """
+        Проверяет ресурсы сканирования и пересчитывает вес страниц
+
+        :param crawl_id: ID сканирования
+        :param ttl: Время жизни кэша проверок в секундах
+        :param on_result: Колбэк для каждого проверенного ресурса
+        :return: Сводка проверки
+        """
+        summary = AssetAuditSummary(crawl_id=crawl_id)
+        all_urls = self.storage.get_asset_urls(crawl_id)
+        urls = [url for url in all_urls if urlparse(url).scheme.lower() in PROBE_SCHEMES]
+        cached = self.storage.get_fresh_asset_checks(urls, ttl)
+        pending = [url for url in urls if url not in cached]
+        summary.unique_assets = len(all_urls)
+        summary.cached = len(cached)
+        summary.skipped = len(all_urls) - len(urls)
+        logger.info(f"Ресурсов: {len(all_urls)}, не по http(s): {summary.skipped}, из кэша: {len(cached)}, "
+                    f"к проверке: {len(pending)}")
+
+        if pending:
+            buffer: List[AssetRecord] = []
+            writes = []
+
+            # Пачки пишутся в фоновом потоке SQLiteBackend, пока проверки продолжаются
+            async with SQLiteBackend(self.storage) as writer:
+                def collect(result: LinkCheckResult):
+                    nonlocal buffer
+                    record = AssetRecord.from_check(result)
+                    buffer.append(record)
+                    summary.probed += 1
+                    if on_result:
+                        on_result(record)
+                    if len(buffer) >= self.batch_size:
+                        writes.append(asyncio.ensure_future(writer.save_assets(buffer)))
+                        buffer = []
+
+                async with LinkChecker(self.config) as checker:
+                    await checker.check_many(pending, on_result=collect)
+                await asyncio.gather(*writes)
+                await writer.save_assets(buffer)
+
+        self.storage.update_page_weights(crawl_id)
+        return summary
@@ -0,0 +1,179 @@
+"""
+Сравнение реализаций event loop (asyncio и uvloop) на синтетических сайтах.
+
+Поднимает локальный aiohttp-сервер в отдельных процессах (чтобы сервер не
+делил CPU с краулером) и сканирует три сайта настоящим CrawlerController:
+
+  small    — много маленьких страниц (~3 КБ, 10 ссылок): накладные расходы
+             на запрос, сокеты и планирование задач;
+  large    — крупные страницы (~150 КБ): парсинг занимает event loop,
+             видна задержка loop и медленные участки стадий;
+  latency  — маленькие страницы с задержкой ответа 30 мс: много
+             одновременных ожидающих соединений.
+
+Для каждой пары сайт × loop печатает страницы в секунду, CPU процесса
+краулера и задержку event loop (p50/p99/max) из встроенного монитора.
+
+Запуск:
+    python Crawler/benchmarks/bench_event_loop.py --repeat 3
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from Crawler.utils import url_normalizer
+from Crawler.utils.event_loop import get_loop_factory, run
+
+SUITES = {
+    'small': {'pages': 2000, 'size': 3000, 'links': 10, 'delay': 0.0},
+    'large': {'pages': 200, 'size': 150000, 'links': 10, 'delay': 0.0},
+    'latency': {'pages': 1000, 'size': 3000, 'links': 10, 'delay': 0.03},
+}
+
+# URLNormalizer переводит http в https, а тестовый сервер работает без TLS:
+# для 127.0.0.1 оставляем http, остальная нормализация не меняется
+_normalize = url_normalizer.URLNormalizer.normalize
+url_normalizer.URLNormalizer.normalize = staticmethod(
+    lambda url, base_url=None: _normalize(url, base_url).replace('https://127.0.0.1', 'http://127.0.0.1')
+)
+
+def render_page(suite: str, index: int) -> str:
+    """Детерминированная HTML-страница синтетического сайта"""
+    params = SUITES[suite]
+    rng = random.Random(f'{suite}-{index}')
+    links = ''.join(
+        f'<li><a href="/{suite}/{rng.randrange(params["pages"])}">Раздел {rng.randrange(1000)}</a></li>'
+        for _ in range(params['links'])
+    )
+    filler_block = '<p>Lorem ipsum dolor sit amet, <b>consectetur</b> adipiscing elit.</p>'
+    filler = filler_block * max(0, (params['size'] - len(links)) // len(filler_block))
+    return (f'<html><head><title>{suite} {index}</title><meta name="description" content="page {index}">'
+            f'</head><body><h1>{suite} {index}</h1><ul>{links}</ul>{filler}'
+            f'<img src="/static/{index % 10}.png"></body></html>')
+
+def serve(port: int) -> None:
+    """Процесс сервера синтетических сайтов"""
+    from aiohttp import web
+
+    cache = {}
+
+    async def page(request):
+        suite = request.match_info['suite']
+        index = int(request.match_info.get('index', 0))
+        if suite not in SUITES or index >= SUITES[suite]['pages']:
+            raise web.HTTPNotFound()
+        if SUITES[suite]['delay']:
+            await asyncio.sleep(SUITES[suite]['delay'])
+        key = (suite, index)
+        if key not in cache:
+            cache[key] = render_page(suite, index).encode()
+        return web.Response(body=cache[key], content_type='text/html', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get('/{suite}/', page)
+    app.router.add_get('/{suite}/{index}', page)
+    web.run_app(app, host='127.0.0.1', port=port, reuse_port=True, print=None, access_log=None)
+
+def start_server(workers: int):
+    """Запускает процессы сервера на свободном порту"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    processes = [multiprocessing.Process(target=serve, args=(port,), daemon=True) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return port, processes
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("Сервер синтетических сайтов не запустился")
+
+def crawl_once(port: int, suite: str, loop_name: str, args) -> dict:
+    """Одно сканирование сайта в выбранном event loop"""
+    from Crawler.crawler_controller import CrawlerController, CrawlerConfig
+
+    config = CrawlerConfig(
+        max_pages=SUITES[suite]['pages'],
+        max_depth=50,
+        concurrent_requests=args.concurrent,
+        request_delay=0,
+        respect_robots_txt=False,
+        parse_executor=args.parse_executor,
+        save_assets=False,
+        stats_interval=3600,
+        loop_lag_threshold=args.lag_threshold,
+        loop_yield_interval=args.yield_interval,
+    )
+    workdir = tempfile.mkdtemp(prefix='bench_loop_')
+    cwd = os.getcwd()
+    os.chdir(workdir)  # DataStorage пишет crawler_data/ в текущий каталог
+    try:
+        controller = CrawlerController(config)
+        started, cpu_started = time.perf_counter(), time.process_time()
+        tree = run(controller.start_crawling(f'http://127.0.0.1:{port}/{suite}/'), loop_name)
+        elapsed, cpu = time.perf_counter() - started, time.process_time() - cpu_started
+    finally:
+        os.chdir(cwd)
+    lag = controller.get_loop_stats()
+    return {
+        'pages': len(tree.nodes),
+        'elapsed': elapsed,
+        'cpu': cpu,
+        'lag_p50': lag.get('p50', 0.0),
+        'lag_p99': lag.get('p99', 0.0),
+        'lag_max': lag.get('max', 0.0),
+        'slow_sections': sum(entry['count'] for entry in lag['slow_sections'].values()),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--suites', default=','.join(SUITES), help='Сайты через запятую')
+    parser.add_argument('--loops', default='asyncio,uvloop', help='Реализации event loop через запятую')
+    parser.add_argument('--repeat', type=int, default=3, help='Повторов на пару сайт × loop (берется лучший)')
+    parser.add_argument('--concurrent', type=int, default=32, help='Одновременных запросов')
+    parser.add_argument('--parse-executor', default='inline', choices=['inline', 'thread', 'process'])
+    parser.add_argument('--lag-threshold', type=float, default=0.05, help='Порог медленного участка (секунды)')
+    parser.add_argument('--yield-interval', type=float, default=0.005,
+                        help='Сколько секунд воркер стадии держит loop подряд (loop_yield_interval)')
+    parser.add_argument('--server-workers', type=int, default=2, help='Процессов сервера')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    loops = []
+    for name in args.loops.split(','):
+        try:
+            get_loop_factory(name)
+            loops.append(name)
+        except ImportError as e:
+            print(f"Пропускаем {name}: {e}")
+
+    port, processes = start_server(args.server_workers)
+    try:
+        print(f"{'сайт':<9} {'loop':<8} {'страниц':>7} {'стр/с':>8} {'время, с':>9} {'CPU, с':>7} "
+              f"{'lag p50':>8} {'lag p99':>8} {'lag max':>8} {'медл.':>6}")
+        for suite in args.suites.split(','):
+            for loop_name in loops:
+                runs = [crawl_once(port, suite, loop_name, args) for _ in range(args.repeat)]
+                best = min(runs, key=lambda r: r['elapsed'])
+                print(f"{suite:<9} {loop_name:<8} {best['pages']:>7} {best['pages'] / best['elapsed']:>8.0f} "
+                      f"{best['elapsed']:>9.2f} {best['cpu']:>7.2f} "
+                      f"{best['lag_p50'] * 1000:>6.1f}мс {best['lag_p99'] * 1000:>6.1f}мс "
+                      f"{best['lag_max'] * 1000:>6.1f}мс {best['slow_sections']:>6}")
+    finally:
+        for process in processes:
+            process.terminate()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Сравнение порядка обхода при ограниченном бюджете страниц.
+
+Строит синтетический граф интернет-магазина: категории, подкатегории,
+товары, теги, а также «фасетные» страницы сортировки и пагинации, которые
+ссылаются друг на друга и раздувают очередь. Важность страниц — PageRank
+полного графа. Затем имитирует обход через настоящий URLManager (без сети)
+с разными функциями оценки и считает, какую долю важных страниц и массы
+PageRank удается покрыть за max_pages загрузок.
+
+Запуск:
+    python Crawler/benchmarks/bench_frontier.py --budget 1000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from Crawler.exceptions import MaxPagesExceeded
+from Crawler.frontier import DepthScorer, ImportanceScorer
+from Crawler.url_manager import URLManager
+
+BASE = 'https://shop.example'
+
+# Рёбра: страница -> [(url, anchor_text)]
+Graph = Dict[str, List[Tuple[str, str]]]
+
+def build_site(categories: int, subcategories: int, products_per_sub: int,
+               tags: int, seed: int) -> Tuple[Graph, Dict[str, Tuple[float, str]]]:
+    """Возвращает граф ссылок и данные sitemap (priority, lastmod-метка)"""
+    rng = random.Random(seed)
+    graph: Graph = defaultdict(list)
+    sitemap: Dict[str, Tuple[float, str]] = {}
+    home = f'{BASE}/'
+
+    products: List[str] = []
+    popularity: List[int] = []
+    tag_urls = [f'{BASE}/tag/t{t}/' for t in range(tags)]
+
+    for c in range(categories):
+        cat = f'{BASE}/catalog/c{c}/'
+        graph[home].append((cat, f'Категория {c} товары'))
+        sitemap[cat] = (0.8, 'category')
+        cat_products = []
+
+        for s in range(subcategories):
+            sub = f'{BASE}/catalog/c{c}/s{s}/'
+            graph[cat].append((sub, f'Подкатегория {c}-{s}'))
+            sitemap[sub] = (0.6, 'subcategory')
+            sub_products = []
+            for p in range(products_per_sub):
+                product = f'{BASE}/product/{c}-{s}-{p}.html'
+                products.append(product)
+                popularity.append(1)
+                sub_products.append(product)
+                sitemap[product] = (0.5, 'product')
+            cat_products.extend(sub_products)
+
+            page_size = 10
+            pages = (len(sub_products) + page_size - 1) // page_size
+            for i in range(pages):
+                page = sub if i == 0 else f'{sub}?page={i + 1}'
+                chunk = sub_products[i * page_size:(i + 1) * page_size]
+                graph[page].extend((p, f'Товар {p.rsplit("/", 1)[-1]}') for p in chunk)
+                graph[page].extend(
+                    (sub if j == 0 else f'{sub}?page={j + 1}', str(j + 1))
+                    for j in range(pages) if j != i
+                )
+
+        # Фасеты категории: сортировки × страницы, ссылаются на товары и друг на друга
+        facets = [f'{cat}?sort={order}&page={n}' for order in ('price', 'name', 'date', 'rating')
+                  for n in range(1, 9)]
+        for facet in facets:
+            graph[cat].append((facet, facet.rsplit('page=', 1)[-1]))
+            graph[facet].extend((p, f'Товар {p.rsplit("/", 1)[-1]}') for p in rng.sample(cat_products, 12))
+            graph[facet].extend((f, 'далее') for f in rng.sample(facets, 6))
+        graph[cat].extend((p, f'Хит {p.rsplit("/", 1)[-1]}') for p in cat_products[:5])
+
+    # Товары: связанные товары с предпочтительным присоединением, теги, категория
+    for index, product in enumerate(products):
+        category = product.split('/product/', 1)[1].split('-', 1)[0]
+        graph[product].append((f'{BASE}/catalog/c{category}/', 'Назад в категорию'))
+        for related in rng.choices(range(len(products)), weights=popularity, k=4):
+            graph[product].append((products[related], f'Похожий товар {related}'))
+            popularity[related] += 1
+        for tag in rng.sample(tag_urls, 3):
+            graph[product].append((tag, f'#{tag.rsplit("/", 2)[-2]}'))
+
+    for tag in tag_urls:
+        for n in range(1, 6):
+            page = tag if n == 1 else f'{tag}?page={n}'
+            graph[page].extend((p, f'Товар {p.rsplit("/", 1)[-1]}') for p in rng.sample(products, 15))
+            graph[page].append((f'{tag}?page={n + 1}', 'далее'))
+
+    graph[home].extend([(f'{BASE}/about/', 'О компании'), (f'{BASE}/cart/', 'Корзина'),
+                        (f'{BASE}/login/', 'Войти')])
+    for p in sorted(range(len(products)), key=lambda i: -popularity[i])[:len(products) // 20]:
+        sitemap[products[p]] = (0.7, 'product')
+    return graph, sitemap
+
+def pagerank(graph: Graph, damping: float = 0.85, iterations: int = 50) -> Dict[str, float]:
+    """PageRank степенным методом по полному графу"""
+    nodes = set(graph)
+    for edges in graph.values():
+        nodes.update(url for url, _ in edges)
+    out = {node: list({url for url, _ in graph.get(node, ())}) for node in nodes}
+    n = len(nodes)
+    rank = dict.fromkeys(nodes, 1.0 / n)
+    for _ in range(iterations):
+        leaked = sum(rank[node] for node in nodes if not out[node])
+        new_rank = dict.fromkeys(nodes, (1.0 - damping) / n + damping * leaked / n)
+        for node, targets in out.items():
+            if targets:
+                share = damping * rank[node] / len(targets)
+                for target in targets:
+                    new_rank[target] += share
+        rank = new_rank
+    return rank
+
+async def simulate(graph: Graph, sitemap: Dict[str, Tuple[float, str]], scorer,
+                   budget: int, use_sitemap: bool) -> List[str]:
+    """Имитирует обход через URLManager, возвращает загруженные URL"""
+    manager = URLManager(max_pages=budget, scorer=scorer)
+    await manager.add_url(f'{BASE}/', depth=0)
+    if use_sitemap:
+        for url, (priority, _) in sitemap.items():
+            await manager.add_url(url, depth=1, sitemap_priority=priority)
+
+    crawled = []
+    while True:
+        url_info = await manager.get_next_url()
+        if url_info is None:
+            break
+        crawled.append(url_info.url)
+        await manager.mark_completed(url_info.url)
+        try:
+            for link, anchor in graph.get(url_info.url, ()):
+                await manager.add_url(link, depth=url_info.depth + 1,
+                                      parent_url=url_info.url, anchor_text=anchor)
+        except MaxPagesExceeded:
+            break
+    return crawled
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget', type=int, default=1000, help='max_pages для имитации обхода')
+    parser.add_argument('--categories', type=int, default=30)
+    parser.add_argument('--subcategories', type=int, default=5)
+    parser.add_argument('--products', type=int, default=30, help='Товаров в подкатегории')
+    parser.add_argument('--tags', type=int, default=200)
+    parser.add_argument('--top', type=float, default=0.1, help='Доля страниц, считающихся важными')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    graph, sitemap = build_site(args.categories, args.subcategories, args.products, args.tags, args.seed)
+    ranks = pagerank(graph)
+    ordered = sorted(ranks, key=ranks.get, reverse=True)
+    important = set(ordered[:max(1, int(len(ordered) * args.top))])
+    print(f"Граф: {len(ranks)} страниц, {sum(len(e) for e in graph.values())} ссылок; "
+          f"важных (топ {args.top:.0%} по PageRank): {len(important)}; бюджет: {args.budget}")
+
+    modes = [
+        ('depth', DepthScorer, False),
+        ('importance', ImportanceScorer, False),
+        ('importance+sitemap', ImportanceScorer, True),
+    ]
+    print(f"{'scorer':<20} {'important':>10} {'PR mass':>8} {'facets':>7} {'time, s':>8}")
+    for name, scorer_cls, use_sitemap in modes:
+        started = time.perf_counter()
+        crawled = asyncio.run(simulate(graph, sitemap, scorer_cls(), args.budget, use_sitemap))
+        elapsed = time.perf_counter() - started
+        covered = len(important.intersection(crawled)) / len(important)
+        mass = sum(ranks.get(url, 0.0) for url in crawled)
+        facets = sum(1 for url in crawled if '?' in url)
+        print(f"{name:<20} {covered:>10.1%} {mass:>8.3f} {facets:>7} {elapsed:>8.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Замер накладных расходов логирования на горячем пути краулера.
+
+Воспроизводит последовательность вызовов логгера, которая приходится на один
+URL в WebFetcher.fetch_page и стадиях конвейера, в трех режимах:
+
+  before   — f-строки на уровне INFO и синхронный FileHandler (как было
+             с logging.basicConfig при импорте модулей);
+  after    — ленивые %-аргументы, подробные шаги на DEBUG, запись через
+             LazyQueueHandler в фоновом потоке;
+  sampled  — то же, что after, с --log-sample-rate 0.1.
+
+Запуск:
+    python Crawler/benchmarks/bench_logging.py --urls 20000
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from Crawler.utils.logging_setup import DEFAULT_FORMAT, setup_logging, shutdown_logging
+
+logger = logging.getLogger('Crawler.bench')
+
+class FakeResult:
+    status_code = 200
+    content_type = 'text/html; charset=utf-8'
+    content = 'x' * 20000
+    response_time = 0.042
+    redirected_from = None
+
+def log_url_before(url: str, result: FakeResult) -> None:
+    """Вызовы логгера на один URL до изменений"""
+    domain = 'example.com'
+    logger.info(f"Загружаем: {url}")
+    logger.info(f"Начинаем загрузку: {url}")
+    logger.info(f"Проверяем robots.txt для {url}")
+    logger.info(f"robots.txt разрешает сканирование {url}")
+    logger.info(f"Применяем rate limiting для домена {domain}")
+    logger.info(f"Отправляем HTTP запрос к {url}")
+    logger.info(f"Получен ответ {result.status_code} для {url}, Content-Type: {result.content_type}")
+    logger.info(f"Загружен HTML контент для {url}, размер: {len(result.content)} символов")
+    logger.info(f"Загрузка {url} завершена за {result.response_time:.2f} сек")
+    logger.info(f"Страница загружена: {url}, статус: {result.status_code}")
+    logger.info(f"Добавлено {25} новых ссылок в очередь с {url}")
+
+def log_url_after(url: str, result: FakeResult) -> None:
+    """Вызовы логгера на один URL после изменений"""
+    domain = 'example.com'
+    extra = {'url': url}
+    logger.debug("Загружаем: %s", url, extra=extra)
+    logger.debug("Начинаем загрузку: %s", url, extra=extra)
+    logger.debug("Проверяем robots.txt для %s", url, extra=extra)
+    logger.debug("robots.txt разрешает сканирование %s", url, extra=extra)
+    logger.debug("Применяем rate limiting для домена %s", domain, extra=extra)
+    logger.debug("Отправляем HTTP запрос к %s", url, extra=extra)
+    logger.debug("Получен ответ %s для %s, Content-Type: %s", result.status_code, url, result.content_type,
+                 extra={'url': url, 'status': result.status_code})
+    logger.debug("Загружен HTML контент для %s, размер: %d символов", url, len(result.content), extra=extra)
+    logger.info("Загрузка %s завершена за %.2f сек", url, result.response_time,
+                extra={'url': url, 'status': result.status_code, 'elapsed': result.response_time})
+    logger.info("Страница загружена: %s, статус: %s", url, result.status_code,
+                extra={'url': url, 'status': result.status_code})
+    logger.debug("Добавлено %d новых ссылок в очередь с %s", 25, url, extra=extra)
+
+def configure_before(log_file: str) -> None:
+    handler = logging.FileHandler(log_file, encoding='utf-8')
+    handler.setFormatter(logging.Formatter(DEFAULT_FORMAT))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(logging.INFO)
+
+def reset_logging() -> None:
+    shutdown_logging()
+    root = logging.getLogger()
+    for handler in root.handlers:
+        handler.close()
+    root.handlers[:] = []
+
+def run(mode: str, urls: int, log_format: str) -> dict:
+    fd, log_file = tempfile.mkstemp(suffix='.log')
+    os.close(fd)
+    result = FakeResult()
+    try:
+        if mode == 'before':
+            configure_before(log_file)
+            emit = log_url_before
+        else:
+            setup_logging('INFO', log_file, log_format, 0.1 if mode == 'sampled' else 1.0)
+            emit = log_url_after
+
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        for i in range(urls):
+            emit(f"https://example.com/catalog/item-{i}?page={i % 7}", result)
+        caller = time.perf_counter() - start
+
+        reset_logging()
+        total = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        lines = sum(1 for _ in open(log_file, encoding='utf-8'))
+    finally:
+        os.unlink(log_file)
+
+    return {
+        'mode': mode,
+        'caller_us_per_url': caller / urls * 1e6,
+        'total_us_per_url': total / urls * 1e6,
+        'cpu_us_per_url': cpu / urls * 1e6,
+        'lines': lines,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--urls', type=int, default=20000, help='Сколько URL имитировать')
+    parser.add_argument('--format', dest='log_format', choices=['text', 'json'], default='text')
+    parser.add_argument('--repeat', type=int, default=3, help='Повторов на режим (берется лучший)')
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'caller us/url':>14} {'total us/url':>13} {'cpu us/url':>11} {'lines':>8}")
+    for mode in ('before', 'after', 'sampled'):
+        best = min(
+            (run(mode, args.urls, args.log_format) for _ in range(args.repeat)),
+            key=lambda r: r['caller_us_per_url']
+        )
+        print(f"{best['mode']:<8} {best['caller_us_per_url']:>14.1f} {best['total_us_per_url']:>13.1f} "
+              f"{best['cpu_us_per_url']:>11.1f} {best['lines']:>8}")
+
+if __name__ == '__main__':
+    main()
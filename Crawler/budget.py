@@ -0,0 +1,53 @@
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+# Причины остановки сканирования по исчерпанию бюджета
+STOP_MAX_DURATION = 'max_duration'
+STOP_MAX_BYTES = 'max_bytes'
+STOP_MAX_REQUESTS = 'max_requests'
+STOP_INTERRUPTED = 'interrupted'
+
+@dataclass
+class CrawlBudget:
+    """Лимиты ресурсов сканирования; None — без ограничения"""
+    max_duration: Optional[float] = None  # секунды от начала сканирования
+    max_bytes: Optional[int] = None  # суммарный объем загруженных ответов
+    max_requests: Optional[int] = None  # число запросов к страницам
+
+    def is_limited(self) -> bool:
+        """Задан ли хотя бы один лимит"""
+        return any(limit is not None for limit in (self.max_duration, self.max_bytes, self.max_requests))
+
+@dataclass
+class BudgetUsage:
+    """Потраченные ресурсы сканирования"""
+    requests: int = 0
+    bytes: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def exceeded(self, budget: CrawlBudget) -> Optional[str]:
+        """
+        Проверяет, исчерпан ли бюджет
+
+        :param budget: Лимиты сканирования
+        :return: Причина остановки (STOP_*) или None если бюджет не исчерпан
+        """
+        if budget.max_requests is not None and self.requests >= budget.max_requests:
+            return STOP_MAX_REQUESTS
+        if budget.max_bytes is not None and self.bytes >= budget.max_bytes:
+            return STOP_MAX_BYTES
+        if budget.max_duration is not None and self.elapsed >= budget.max_duration:
+            return STOP_MAX_DURATION
+        return None
+
+    def to_dict(self) -> Dict:
+        return {
+            'requests': self.requests,
+            'bytes': self.bytes,
+            'elapsed': round(self.elapsed, 3),
+        }
@@ -1,19 +1,24 @@
 import asyncio
 import re
 import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Set, Tuple
 from .url_manager import URLManager
 from .web_fetcher import WebFetcher
 from .content_parser import ContentParser
 from .site_tree_builder import SiteTree, SiteTreeBuilder
 from .data_storage import DataStorage, ExportFormat
-from .exceptions import (MaxPagesExceeded, InvalidURL,
-                        FetchError, ParseError, StorageError)
+from .storage_backend import SQLiteBackend, StorageBackend, create_backend
+from .pipeline import LoopBudget, PageTask, StageMetrics
+from .budget import BudgetUsage, CrawlBudget, STOP_INTERRUPTED, STOP_MAX_DURATION
+from .scheduler import FairScheduler, SiteCrawl, SiteSeed
+from .frontier import SCORERS
+from .sitemap import SitemapLoader
+from .exceptions import MaxPagesExceeded, InvalidURL, StorageError
 from .utils.url_normalizer import URLNormalizer
+from .utils.loop_monitor import LoopActivity, LoopLagMonitor
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -30,20 +35,69 @@ class CrawlerConfig:
     max_redirects: int = 5
     allowed_domains: List[str] = None
     excluded_patterns: List[str] = None
+    save_links: bool = True
+    save_assets: bool = True
+    link_batch_size: int = 5000
+    parse_workers: int = 2
+    parse_executor: str = 'inline'  # 'inline', 'thread' или 'process'
+    parse_queue_size: int = 100
+    store_queue_size: int = 100
+    stats_interval: float = 30.0
+    frontier_scorer: str = 'depth'  # 'depth' или 'importance'
+    use_sitemap: bool = False
+    sitemap_max_urls: int = 50000
+    loop_lag_threshold: float = 0.1  # секунды; 0 — не следить за задержкой event loop
+    loop_yield_interval: float = 0.005  # сколько секунд воркер стадии может держать loop подряд
+    # Бюджеты сканирования; None — без ограничения. max_* действуют на все
+    # сайты вместе, host_max_* — на каждый сайт (их переопределяет список сайтов)
+    max_duration: Optional[float] = None  # секунды
+    max_bytes: Optional[int] = None
+    max_requests: Optional[int] = None
+    host_max_duration: Optional[float] = None
+    host_max_bytes: Optional[int] = None
+    host_max_requests: Optional[int] = None
+    drain_timeout: float = 30.0  # сколько ждать загрузок в работе после исчерпания бюджета
+    db_url: Optional[str] = None  # None — SQLite в crawler_data; postgresql://... — PostgreSQL
+    max_pending_writes: int = 4  # пачек ссылок/ресурсов, записываемых в фоне одновременно
 
 class CrawlerController:
     """Основной контроллер веб-краулера"""
     
     def __init__(self, config: CrawlerConfig):
         self.config = config
-        self.url_manager = URLManager(max_pages=config.max_pages)
+        self.url_manager = URLManager(max_pages=config.max_pages, scorer=self._create_scorer())
         self.web_fetcher: Optional[WebFetcher] = None
         self.content_parser = ContentParser()
         self.tree_builder = SiteTreeBuilder()
-        self.data_storage = DataStorage()
+        self.storage: StorageBackend = create_backend(config.db_url)
+        self._data_storage: Optional[DataStorage] = None
+        self._writes: Set[asyncio.Task] = set()
         self.site_tree: Optional[SiteTree] = None
         self.is_running = False
         self.crawl_id: Optional[int] = None
+        self.sites: Dict[str, SiteCrawl] = {}
+        self.scheduler: Optional[FairScheduler] = None
+        self.stage_metrics: Dict[str, StageMetrics] = {}
+        self._parse_executor: Optional[Executor] = None
+        self.loop_activity = LoopActivity(config.loop_lag_threshold or float('inf'))
+        self.loop_monitor: Optional[LoopLagMonitor] = None
+        self.budget = CrawlBudget(config.max_duration, config.max_bytes, config.max_requests)
+        self.usage = BudgetUsage()
+        self.stop_reason: Optional[str] = None
+        self._budget_exhausted: Optional[asyncio.Event] = None
+        
+    @property
+    def data_storage(self) -> DataStorage:
+        """
+        Локальная SQLite для экспорта файлов и аудита ресурсов
+        
+        С бэкендом PostgreSQL файл БД создается только при первом обращении,
+        а не при каждом запуске краулера.
+        """
+        if self._data_storage is None:
+            self._data_storage = (self.storage.storage if isinstance(self.storage, SQLiteBackend)
+                                  else DataStorage())
+        return self._data_storage
         
     async def start_crawling(self, root_url: str) -> SiteTree:
         """
@@ -52,127 +106,529 @@ class CrawlerController:
         :param root_url: Начальный URL для сканирования
         :return: Дерево сайта с результатами сканирования
         """
+        site = SiteCrawl(
+            root_url=root_url,
+            max_pages=self.config.max_pages,
+            max_depth=self.config.max_depth,
+            url_manager=self.url_manager,
+            tree_builder=self.tree_builder,
+            budget=self._host_budget()
+        )
+        await self._crawl_sites([site])
+        return self.site_tree
+        
+    async def start_batch_crawling(self, seeds: List[SiteSeed]) -> Dict[str, SiteTree]:
+        """
+        Сканирует несколько сайтов в одном контроллере
+        
+        Все сайты используют общую HTTP-сессию, пул соединений и кэш
+        robots.txt; слоты загрузки распределяются между хостами
+        взвешенным round-robin. Для каждого сайта создается свой crawl_id
+        и SiteTree, лимиты max_pages/max_depth и host_max_* действуют
+        на каждый сайт, max_duration/max_bytes/max_requests — на все вместе.
+        
+        :param seeds: Список стартовых URL с весами и лимитами
+        :return: Словарь домен -> дерево сайта
+        """
+        sites = [
+            SiteCrawl(
+                root_url=seed.url,
+                max_pages=seed.max_pages or self.config.max_pages,
+                max_depth=seed.max_depth if seed.max_depth is not None else self.config.max_depth,
+                weight=max(1, seed.weight),
+                scorer=self._create_scorer(),
+                budget=self._host_budget(seed)
+            )
+            for seed in seeds
+        ]
+        await self._crawl_sites(sites)
+        return {domain: site.site_tree for domain, site in self.sites.items()}
+        
+    async def _crawl_sites(self, sites: List[SiteCrawl]):
+        """Общий цикл сканирования для одного или нескольких сайтов"""
         if self.is_running:
             raise RuntimeError("Crawler is already running")
             
         self.is_running = True
-        self.site_tree = self.tree_builder.initialize_tree(root_url)
-        self.crawl_id = self.data_storage._create_crawl(URLNormalizer.get_domain(root_url))
-        
         try:
-            async with WebFetcher({
-                'request_delay': self.config.request_delay,
-                'timeout': self.config.timeout,
-                'user_agent': self.config.user_agent,
-                'respect_robots_txt': self.config.respect_robots_txt,
-                'follow_redirects': self.config.follow_redirects
-            }) as self.web_fetcher:
-                # Добавляем начальный URL в очередь
-                await self.url_manager.add_url(root_url, depth=0)
-                
-                # Запускаем worker'ы для параллельной обработки
-                workers = [
-                    self._worker() 
-                    for _ in range(self.config.concurrent_requests)
-                ]
-                await asyncio.gather(*workers)
-                
+            await self.storage.open()
+            await self._init_sites(sites)
+            try:
+                async with WebFetcher({
+                    'request_delay': self.config.request_delay,
+                    'timeout': self.config.timeout,
+                    'user_agent': self.config.user_agent,
+                    'respect_robots_txt': self.config.respect_robots_txt,
+                    'follow_redirects': self.config.follow_redirects,
+                    'connection_limit': max(100, self.config.concurrent_requests)
+                }) as self.web_fetcher:
+                    self.scheduler = FairScheduler(
+                        list(self.sites.values()),
+                        is_ready=self.web_fetcher.rate_limiter.is_ready
+                    )
+                    
+                    # Добавляем начальные URL в очереди сайтов
+                    for site in self.sites.values():
+                        await site.url_manager.add_url(site.root_url, depth=0)
+                        if self.config.use_sitemap:
+                            await self._seed_from_sitemap(site)
+                        
+                    await self._run_pipeline()
+                    
+            except (asyncio.CancelledError, KeyboardInterrupt):
+                self.stop_reason = self.stop_reason or STOP_INTERRUPTED
+                raise
+            finally:
+                self.is_running = False
+                await self._save_results()
         finally:
             self.is_running = False
-            if self.site_tree:
-                self.data_storage.save_tree(self.site_tree, self.crawl_id)
-                self.data_storage.complete_crawl(
-                    self.crawl_id, 
-                    len(self.site_tree.nodes)
-                )
+            await self.storage.close()
+            
+    async def _init_sites(self, sites: List[SiteCrawl]):
+        """Создает записи о сканировании и деревья сайтов"""
+        self.sites = {}
+        self.usage = BudgetUsage()
+        self.stop_reason = None
+        for site in sites:
+            if site.domain in self.sites:
+                logger.warning(f"Сайт {site.domain} указан повторно, пропускаем")
+                continue
+            site.site_tree = site.tree_builder.initialize_tree(site.root_url)
+            site.crawl_id = await self.storage.create_crawl(site.domain)
+            site.usage = BudgetUsage()
+            self.sites[site.domain] = site
+            
+        first = next(iter(self.sites.values()))
+        self.site_tree = first.site_tree
+        self.crawl_id = first.crawl_id
+        
+    async def _save_results(self):
+        """Дописывает буферы, страницы и итог сканирования каждого сайта"""
+        for site in self.sites.values():
+            self._flush_links(site)
+            self._flush_assets(site)
+        await self._wait_writes()
+        for site in self.sites.values():
+            await self.storage.save_pages(site.crawl_id, site.site_tree)
+            await self._complete_site(site)
+            
+    async def _complete_site(self, site: SiteCrawl):
+        """
+        Записывает итог сканирования сайта
+        
+        Если сайт остановлен бюджетом или прерыванием, а необработанные URL
+        остались, очередь сохраняется в БД и сканирование помечается как partial.
+        """
+        reason = site.stop_reason or self.stop_reason
+        unfinished = site.url_manager.get_unfinished() if reason else []
+        if unfinished:
+            saved = await self.storage.save_frontier(
+                site.crawl_id,
+                [(info.url, info.depth, info.parent_url, info.score) for info in unfinished]
+            )
+            logger.warning(f"Сканирование {site.domain} остановлено ({reason}): "
+                           f"{saved} необработанных URL сохранено, статус partial")
+        await self.storage.complete_crawl(
+            site.crawl_id,
+            len(site.site_tree.nodes),
+            status='partial' if unfinished else 'completed',
+            stop_reason=reason if unfinished else None,
+            requests=site.usage.requests,
+            bytes_fetched=site.usage.bytes
+        )
+        
+    def _host_budget(self, seed: Optional[SiteSeed] = None) -> CrawlBudget:
+        """Бюджет сайта: лимиты из списка сайтов или host_max_* из конфигурации"""
+        def pick(seed_value, default):
+            return seed_value if seed_value is not None else default
+            
+        return CrawlBudget(
+            max_duration=pick(seed and seed.max_duration, self.config.host_max_duration),
+            max_bytes=pick(seed and seed.max_bytes, self.config.host_max_bytes),
+            max_requests=pick(seed and seed.max_requests, self.config.host_max_requests)
+        )
+        
+    def _create_scorer(self):
+        """Создает функцию оценки URL для очереди сайта"""
+        if self.config.frontier_scorer not in SCORERS:
+            raise ValueError(f"Unknown frontier scorer: {self.config.frontier_scorer}")
+        return SCORERS[self.config.frontier_scorer]()
+        
+    async def _seed_from_sitemap(self, site: SiteCrawl):
+        """Добавляет в очередь сайта URL из sitemap.xml с их priority и lastmod"""
+        robots = self.web_fetcher.robots_checker
+        await robots.can_fetch(site.root_url, self.config.user_agent)
+        parser = robots.robots_cache.get(site.domain)
+        sitemap_urls = parser.site_maps() if parser else None
+        
+        loader = SitemapLoader(self.web_fetcher.session, max_urls=self.config.sitemap_max_urls)
+        added = 0
+        for entry in await loader.load(site.root_url, sitemap_urls):
+            if URLNormalizer.get_domain(entry.url) != site.domain:
+                continue
+            try:
+                if await site.url_manager.add_url(
+                    entry.url,
+                    depth=1,
+                    sitemap_priority=entry.priority,
+                    lastmod=entry.lastmod
+                ):
+                    added += 1
+            except InvalidURL:
+                continue
+        logger.info(f"Из sitemap в очередь {site.domain} добавлено {added} URL")
+        
+    async def _run_pipeline(self):
+        """
+        Запускает конвейер fetch → parse → store
+        
+        Стадии связаны ограниченными очередями: когда парсеры не успевают,
+        загрузчики блокируются на put(), поэтому в памяти одновременно
+        находится не больше parse_queue_size + store_queue_size страниц.
+        """
+        parse_queue = asyncio.Queue(maxsize=self.config.parse_queue_size)
+        store_queue = asyncio.Queue(maxsize=self.config.store_queue_size)
+        self.stage_metrics = {
+            'fetch': StageMetrics('fetch', self.config.concurrent_requests),
+            'parse': StageMetrics('parse', self.config.parse_workers, parse_queue),
+            'store': StageMetrics('store', 1, store_queue),
+        }
+        self._parse_executor = self._create_parse_executor()
+        if self.config.loop_lag_threshold > 0:
+            self.loop_monitor = LoopLagMonitor(threshold=self.config.loop_lag_threshold,
+                                               activity=self.loop_activity)
+            self.loop_monitor.start()
+        reporter = asyncio.create_task(self._report_pipeline_stats())
+        
+        # Исчерпание бюджета останавливает выдачу URL; загрузки в работе
+        # получают drain_timeout секунд, уже загруженное дообрабатывается
+        self._budget_exhausted = asyncio.Event()
+        deadline = None
+        if self.budget.max_duration is not None:
+            deadline = asyncio.get_running_loop().call_later(
+                max(0.0, self.budget.max_duration - self.usage.elapsed),
+                self._stop_dispatch, STOP_MAX_DURATION
+            )
+        writer = asyncio.create_task(self._store_stage(store_queue))
+        parsers = [
+            asyncio.create_task(self._parse_stage(parse_queue, store_queue))
+            for _ in range(self.config.parse_workers)
+        ]
+        fetchers = [
+            asyncio.create_task(self._fetch_stage(parse_queue))
+            for _ in range(self.config.concurrent_requests)
+        ]
+        drain_guard = asyncio.create_task(self._drain_guard(fetchers))
+        
+        try:
+            await asyncio.wait(fetchers)
+            for task in fetchers:
+                if not task.cancelled() and task.exception():
+                    raise task.exception()
+            
+            # Загрузчики завершились: досылаем маркеры окончания по стадиям
+            for _ in parsers:
+                await parse_queue.put(None)
+            await asyncio.gather(*parsers)
+            await store_queue.put(None)
+            await writer
+        finally:
+            if deadline:
+                deadline.cancel()
+            for task in (drain_guard, *fetchers, *parsers, writer):
+                task.cancel()
+            reporter.cancel()
+            if self.loop_monitor:
+                await self.loop_monitor.stop()
+            if self._parse_executor:
+                self._parse_executor.shutdown(wait=False)
+                self._parse_executor = None
+            logger.info(f"Статистика конвейера: {self.get_pipeline_stats()}")
+            
+    def _stop_dispatch(self, reason: str):
+        """Останавливает выдачу новых URL по исчерпанию общего бюджета"""
+        if self.stop_reason is not None:
+            return
+        self.stop_reason = reason
+        logger.warning(f"Бюджет сканирования исчерпан ({reason}): новые URL не выдаются, "
+                       f"ожидаем загрузки в работе до {self.config.drain_timeout} с")
+        if self._budget_exhausted:
+            self._budget_exhausted.set()
+            
+    async def _drain_guard(self, fetchers: List[asyncio.Task]):
+        """Прерывает загрузки, не завершившиеся за drain_timeout после остановки"""
+        await self._budget_exhausted.wait()
+        _, pending = await asyncio.wait(fetchers, timeout=self.config.drain_timeout)
+        if pending:
+            logger.warning(f"За {self.config.drain_timeout} с не завершились {len(pending)} загрузок, "
+                           f"прерываем их; URL вернутся в сохраненную очередь")
+            for task in pending:
+                task.cancel()
                 
-        return self.site_tree
+    def _account(self, site: SiteCrawl, requests: int = 0, size: int = 0):
+        """Учитывает запросы и байты в общем бюджете и бюджете сайта"""
+        for usage in (self.usage, site.usage):
+            usage.requests += requests
+            usage.bytes += size
+        reason = self.usage.exceeded(self.budget)
+        if reason:
+            self._stop_dispatch(reason)
+        if site.stop_reason is None and site.check_budget():
+            logger.info(f"Бюджет сайта {site.domain} исчерпан ({site.stop_reason}), "
+                        f"новые URL сайта не выдаются")
+            
+    def _create_parse_executor(self) -> Optional[Executor]:
+        """Создает пул для парсинга вне event loop (или None для inline)"""
+        mode = self.config.parse_executor
+        if mode == 'thread':
+            return ThreadPoolExecutor(max_workers=self.config.parse_workers)
+        if mode == 'process':
+            return ProcessPoolExecutor(max_workers=self.config.parse_workers)
+        if mode != 'inline':
+            raise ValueError(f"Unknown parse executor: {mode}")
+        return None
         
-    async def _worker(self):
-        """Worker для обработки URL из очереди"""
-        worker_id = id(asyncio.current_task())
-        logger.info(f"Worker {worker_id} запущен")
+    async def _fetch_stage(self, parse_queue: asyncio.Queue):
+        """Стадия загрузки: берет URL из очереди и скачивает страницы"""
+        metrics = self.stage_metrics['fetch']
         
-        while self.is_running:
+        while self.is_running and self.stop_reason is None:
+            next_url = await self.scheduler.next_url()
+            if not next_url:
+                # URL в работе на следующих стадиях могут добавить новые ссылки
+                if not self.scheduler.has_in_flight():
+                    break
+                await asyncio.sleep(0.1)
+                continue
+                
+            site, url_info = next_url
+            if self.stop_reason is not None or site.stop_reason is not None:
+                # Бюджет исчерпан, пока URL выдавался
+                site.url_manager.requeue(url_info.url)
+                continue
+            self._account(site, requests=1)
+            
+            logger.debug("Загружаем: %s", url_info.url, extra={'url': url_info.url})
+            started = metrics.begin()
             try:
-                url_info = await self.url_manager.get_next_url()
-                if not url_info:
-                    # Проверяем, есть ли еще URL в обработке
-                    if not self.url_manager.processing:
-                        logger.info(f"Worker {worker_id}: нет URL для обработки, завершаем")
-                        break
-                    await asyncio.sleep(0.1)
-                    continue
-                    
-                logger.info(f"Worker {worker_id} обрабатывает: {url_info.url}")
+                fetch_result = await self.web_fetcher.fetch_page(url_info.url)
+            except asyncio.CancelledError:
+                metrics.end(started, failed=True)
+                site.url_manager.requeue(url_info.url)
+                raise
+            except Exception as e:
+                metrics.end(started, failed=True)
+                logger.error("Ошибка загрузки %s: %s", url_info.url, e, extra={'url': url_info.url})
+                await site.url_manager.mark_failed(url_info.url, str(e))
+                continue
+            metrics.end(started)
+            self._account(site, size=fetch_result.content_length or 0)
+            
+            logger.info("Страница загружена: %s, статус: %s", url_info.url, fetch_result.status_code,
+                        extra={'url': url_info.url, 'status': fetch_result.status_code})
+            await parse_queue.put(PageTask(url_info, fetch_result, site=site))
+            
+    async def _parse_stage(self, parse_queue: asyncio.Queue, store_queue: asyncio.Queue):
+        """Стадия парсинга: разбирает HTML в пуле или прямо в event loop"""
+        metrics = self.stage_metrics['parse']
+        loop = asyncio.get_running_loop()
+        budget = LoopBudget(self.config.loop_yield_interval)
+        
+        while True:
+            task = await budget.get(parse_queue)
+            if task is None:
+                break
                 
+            fetch_result = task.fetch_result
+            if fetch_result.content is not None and 'text/html' in (fetch_result.content_type or ''):
+                started = metrics.begin()
                 try:
-                    # Загружаем страницу
-                    fetch_result = await self.web_fetcher.fetch_page(url_info.url)
-                    logger.info(f"Страница загружена: {url_info.url}, статус: {fetch_result.status_code}")
-                    
-                    # Парсим контент, если это HTML
-                    if fetch_result.content_type and 'text/html' in fetch_result.content_type:
-                        logger.info(f"Парсим HTML контент: {url_info.url}")
-                        parse_result = self.content_parser.parse_html(
+                    if self._parse_executor:
+                        task.parse_result = await loop.run_in_executor(
+                            self._parse_executor,
+                            self.content_parser.parse_html,
                             fetch_result.content,
-                            url_info.url
+                            task.url_info.url
                         )
-                        
-                        logger.info(f"Найдено {len(parse_result.links)} ссылок на {url_info.url}")
-                        
-                        # Добавляем страницу в дерево
-                        node = self.tree_builder.add_page(
+                    else:
+                        with self.loop_activity.track('parse', task.url_info.url):
+                            task.parse_result = self.content_parser.parse_html(
+                                fetch_result.content,
+                                task.url_info.url
+                            )
+                except Exception as e:
+                    metrics.end(started, failed=True)
+                    logger.error("Ошибка парсинга %s: %s", task.url_info.url, e,
+                                 extra={'url': task.url_info.url})
+                    await task.site.url_manager.mark_failed(task.url_info.url, str(e))
+                    continue
+                metrics.end(started)
+                
+                # Тело страницы больше не нужно — освобождаем память до записи
+                fetch_result.content = None
+            else:
+                logger.debug("Пропускаем не-HTML контент: %s", task.url_info.url,
+                             extra={'url': task.url_info.url})
+                
+            await budget.put(store_queue, task)
+            await budget.checkpoint()
+            
+    async def _store_stage(self, store_queue: asyncio.Queue):
+        """Единственный писатель: обновляет дерево, граф ссылок и очередь URL"""
+        metrics = self.stage_metrics['store']
+        budget = LoopBudget(self.config.loop_yield_interval)
+        
+        while True:
+            task = await budget.get(store_queue)
+            if task is None:
+                break
+                
+            site, url_info = task.site, task.url_info
+            started = metrics.begin()
+            try:
+                if task.parse_result:
+                    with self.loop_activity.track('store', url_info.url):
+                        site.tree_builder.add_page(
                             url_info.url,
                             url_info.parent_url,
-                            fetch_result,
-                            parse_result
+                            task.fetch_result,
+                            task.parse_result
                         )
-                        
-                        logger.info(f"Страница добавлена в дерево: {url_info.url}")
-                        
-                        # Добавляем найденные ссылки в очередь
-                        new_links_count = 0
-                        for link in parse_result.links:
-                            if self._should_follow_url(link.url, url_info.depth + 1):
-                                await self.url_manager.add_url(
-                                    link.url,
-                                    depth=url_info.depth + 1,
-                                    parent_url=url_info.url
-                                )
-                                new_links_count += 1
-                        
-                        logger.info(f"Добавлено {new_links_count} новых ссылок в очередь")
-                    else:
-                        logger.info(f"Пропускаем не-HTML контент: {url_info.url}")
-                                
-                    await self.url_manager.mark_completed(url_info.url)
-                    logger.info(f"URL помечен как завершенный: {url_info.url}")
-                    
-                except FetchError as e:
-                    logger.error(f"Ошибка загрузки {url_info.url}: {e}")
-                    await self.url_manager.mark_failed(url_info.url, str(e))
-                except ParseError as e:
-                    logger.error(f"Ошибка парсинга {url_info.url}: {e}")
-                    await self.url_manager.mark_failed(url_info.url, str(e))
-                except Exception as e:
-                    logger.error(f"Неожиданная ошибка для {url_info.url}: {e}")
-                    await self.url_manager.mark_failed(url_info.url, f"Unexpected error: {e}")
+                        self._record_links(site, url_info.url, task.parse_result.links)
+                        self._record_assets(site, url_info.url, task.parse_result)
+                    new_links_count = await self._enqueue_links(site, url_info, task.parse_result.links)
+                    logger.debug("Добавлено %d новых ссылок в очередь с %s", new_links_count, url_info.url,
+                                 extra={'url': url_info.url})
                     
-            except MaxPagesExceeded:
-                logger.info(f"Worker {worker_id}: достигнут лимит страниц")
-                self.is_running = False
-                break
+                await site.url_manager.mark_completed(url_info.url)
+                metrics.end(started)
             except Exception as e:
-                logger.error(f"Worker {worker_id} error: {e}")
-                continue
-                
-        logger.info(f"Worker {worker_id} завершен")
+                metrics.end(started, failed=True)
+                logger.error("Неожиданная ошибка для %s: %s", url_info.url, e, extra={'url': url_info.url})
+                await site.url_manager.mark_failed(url_info.url, f"Unexpected error: {e}")
+            await budget.checkpoint()
+            
+            # Хранилище не успевает за конвейером: ждем, пока допишется хотя бы одна пачка
+            if len(self._writes) >= self.config.max_pending_writes:
+                await asyncio.wait(self._writes, return_when=asyncio.FIRST_COMPLETED)
                 
-    def _should_follow_url(self, url: str, depth: int) -> bool:
+    async def _enqueue_links(self, site: SiteCrawl, url_info, links) -> int:
+        """Добавляет найденные ссылки в очередь сайта, возвращает число новых"""
+        if site.limit_reached:
+            return 0
+            
+        new_links_count = 0
+        for link in links:
+            if not self._should_follow_url(link.url, url_info.depth + 1, site.max_depth):
+                continue
+            try:
+                if await site.url_manager.add_url(
+                    link.url,
+                    depth=url_info.depth + 1,
+                    parent_url=url_info.url,
+                    anchor_text=link.anchor_text
+                ):
+                    new_links_count += 1
+            except InvalidURL:
+                continue
+            except MaxPagesExceeded:
+                logger.info(f"Достигнут лимит страниц для {site.domain}, новые URL не добавляются")
+                site.limit_reached = True
+                break
+        return new_links_count
+        
+    async def _report_pipeline_stats(self):
+        """Периодически пишет в лог глубину очередей и загрузку стадий"""
+        while True:
+            await asyncio.sleep(self.config.stats_interval)
+            logger.info(f"Конвейер: {self.get_pipeline_stats()}")
+            
+    def get_pipeline_stats(self) -> Dict[str, Dict]:
+        """Возвращает метрики стадий конвейера"""
+        stats = {
+            name: metrics.to_dict()
+            for name, metrics in self.stage_metrics.items()
+        }
+        if 'fetch' in stats:
+            stats['fetch']['queue_depth'] = sum(
+                site.url_manager.pending_queue.qsize() for site in self.sites.values()
+            )
+        if self.loop_monitor:
+            stats['loop'] = self.get_loop_stats()
+        if self.budget.is_limited() or self.stop_reason:
+            stats['budget'] = {'stop_reason': self.stop_reason, **self.usage.to_dict()}
+        return stats
+        
+    def get_loop_stats(self) -> Dict:
+        """Задержка event loop и медленные участки стадий"""
+        stats = self.loop_monitor.get_stats() if self.loop_monitor else {'samples': 0}
+        stats['slow_sections'] = self.loop_activity.get_stats()
+        return stats
+        
+    def _record_links(self, site: SiteCrawl, source_url: str, links) -> None:
+        """Копит рёбра графа ссылок и сбрасывает их в БД пачками"""
+        if not self.config.save_links:
+            return
+            
+        site.link_buffer.extend(
+            (source_url, link.url, link.link_type) for link in links
+        )
+        if len(site.link_buffer) >= self.config.link_batch_size:
+            self._flush_links(site)
+            
+    def _flush_links(self, site: SiteCrawl) -> None:
+        """Сохраняет накопленные рёбра графа ссылок сайта"""
+        if not site.link_buffer or site.crawl_id is None:
+            return
+            
+        batch, site.link_buffer = site.link_buffer, []
+        self._spawn_write(self.storage.save_links(site.crawl_id, batch), 'графа ссылок')
+            
+    def _record_assets(self, site: SiteCrawl, page_url: str, parse_result) -> None:
+        """Копит связи страница → ресурс (изображения, скрипты, стили)"""
+        if not self.config.save_assets:
+            return
+            
+        for kind, urls in (
+            ('image', parse_result.images),
+            ('script', parse_result.scripts),
+            ('stylesheet', parse_result.stylesheets),
+        ):
+            site.asset_buffer.extend((page_url, url, kind) for url in urls)
+        if len(site.asset_buffer) >= self.config.link_batch_size:
+            self._flush_assets(site)
+            
+    def _flush_assets(self, site: SiteCrawl) -> None:
+        """Сохраняет накопленные связи страниц с ресурсами"""
+        if not site.asset_buffer or site.crawl_id is None:
+            return
+            
+        batch, site.asset_buffer = site.asset_buffer, []
+        self._spawn_write(self.storage.save_page_assets(site.crawl_id, batch), 'ресурсов страниц')
+        
+    def _spawn_write(self, coro, what: str) -> None:
+        """Записывает пачку в фоне, не задерживая стадию сохранения"""
+        task = asyncio.create_task(self._write(coro, what))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+        
+    @staticmethod
+    async def _write(coro, what: str) -> None:
+        try:
+            await coro
+        except Exception as e:
+            logger.error(f"Ошибка сохранения {what}: {e}")
+            
+    async def _wait_writes(self) -> None:
+        """Дожидается фоновой записи всех пачек"""
+        while self._writes:
+            await asyncio.gather(*self._writes)
+            
+    def _should_follow_url(self, url: str, depth: int, max_depth: int = None) -> bool:
         """Проверяет, нужно ли сканировать URL"""
         # Проверка максимальной глубины
-        if depth > self.config.max_depth:
+        if depth > (self.config.max_depth if max_depth is None else max_depth):
             return False
             
         # Проверка разрешенных доменов
@@ -199,4 +655,18 @@ class CrawlerController:
         if not self.site_tree:
             raise StorageError("No site tree to export")
             
-        self.data_storage.export_tree(self.site_tree, format, output_path)
\ No newline at end of file
+        self.data_storage.export_tree(self.site_tree, format, output_path)
+        
+    async def export_site_results(self, domain: str, format: ExportFormat, output_path: str):
+        """
+        Экспортирует результаты одного сайта из пакетного сканирования
+        
+        :param domain: Домен сайта
+        :param format: Формат экспорта
+        :param output_path: Путь для сохранения
+        """
+        site = self.sites.get(domain)
+        if not site or not site.site_tree:
+            raise StorageError(f"No site tree to export for {domain}")
+            
+        self.data_storage.export_tree(site.site_tree, format, output_path)
\ No newline at end of file
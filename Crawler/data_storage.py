@@ -1,7 +1,8 @@
 import sqlite3
 import json
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Iterable, Iterator, Tuple
 from datetime import datetime
 from enum import Enum
 from .site_tree_builder import SiteTree, SiteNode
@@ -15,13 +16,49 @@ class ExportFormat(Enum):
     CSV = 'csv'
     GRAPHML = 'graphml'
 
+# Колонки, добавленные в таблицу pages после первой версии схемы
+PAGE_EXTRA_COLUMNS = {
+    'url_id': 'INTEGER',
+    'in_degree': 'INTEGER',
+    'pagerank': 'REAL',
+    'click_depth': 'INTEGER',
+    'scc_id': 'INTEGER',
+    'content_length': 'INTEGER',
+    'response_time': 'REAL',
+    'content_hash': 'TEXT',
+    'page_weight': 'INTEGER',
+}
+
+# Колонки, добавленные в таблицу crawls после первой версии схемы
+CRAWL_EXTRA_COLUMNS = {
+    'stop_reason': 'TEXT',
+    'requests': 'INTEGER',
+    'bytes_fetched': 'INTEGER',
+}
+
+# Виды изменений между двумя сканированиями
+DIFF_CHANGES = ('added', 'removed', 'status', 'title', 'depth', 'content')
+
+# Колонки crawl_stats со счетчиками; остальные поля — гистограммы и перцентили
+STATUS_CLASSES = ('2xx', '3xx', '4xx', '5xx', 'other', 'no_response')
+LATENCY_PERCENTILES = (50, 90, 95, 99)
+
+# Максимальное число параметров в одном SQL-запросе SQLite
+SQLITE_MAX_VARIABLES = 500
+
+# Сколько пар URL -> ID справочника urls держать в памяти; остальные читаются из БД
+URL_ID_CACHE_SIZE = 100000
+
 class DataStorage:
     """Класс для хранения и экспорта данных сканирования"""
     
-    def __init__(self, storage_path: str = "crawler_data"):
+    def __init__(self, storage_path: str = "crawler_data", url_id_cache_size: int = URL_ID_CACHE_SIZE):
         self.storage_path = Path(storage_path)
         self.storage_path.mkdir(parents=True, exist_ok=True)
         self.db_path = self.storage_path / "crawler.db"
+        # LRU-кэш справочника urls: недавние URL без запроса к БД, память ограничена
+        self._url_ids: OrderedDict[str, int] = OrderedDict()
+        self.url_id_cache_size = url_id_cache_size
         self._init_database()
         
     def _init_database(self):
@@ -41,6 +78,7 @@ class DataStorage:
                     config TEXT
                 )
             """)
+            self._ensure_columns(cursor, 'crawls', CRAWL_EXTRA_COLUMNS)
             
             # Таблица для страниц
             cursor.execute("""
@@ -61,11 +99,578 @@ class DataStorage:
                 )
             """)
             
+            self._ensure_columns(cursor, 'pages', PAGE_EXTRA_COLUMNS)
+            
+            # Справочник URL: целочисленные ID для графа ссылок
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS urls (
+                    id INTEGER PRIMARY KEY,
+                    url TEXT NOT NULL UNIQUE
+                )
+            """)
+            
+            # Таблица рёбер графа ссылок (все найденные ссылки, а не только первый родитель)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS links (
+                    crawl_id INTEGER NOT NULL,
+                    source_id INTEGER NOT NULL,
+                    target_id INTEGER NOT NULL,
+                    link_type TEXT,
+                    FOREIGN KEY (crawl_id) REFERENCES crawls (id)
+                )
+            """)
+            
+            # Кэш результатов проверки ссылок (общий для всех сканирований)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS link_checks (
+                    url_id INTEGER PRIMARY KEY,
+                    status_code INTEGER,
+                    final_url TEXT,
+                    redirect_chain TEXT,
+                    latency REAL,
+                    method TEXT,
+                    error TEXT,
+                    checked_at REAL NOT NULL,
+                    FOREIGN KEY (url_id) REFERENCES urls (id)
+                )
+            """)
+            
+            # Ресурсы страниц (изображения, скрипты, стили): результаты проверки
+            # хранятся один раз на URL и используются всеми сканированиями
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS assets (
+                    url_id INTEGER PRIMARY KEY,
+                    status_code INTEGER,
+                    content_type TEXT,
+                    content_length INTEGER,
+                    cache_control TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    expires TEXT,
+                    error TEXT,
+                    checked_at REAL NOT NULL,
+                    FOREIGN KEY (url_id) REFERENCES urls (id)
+                )
+            """)
+            
+            # Связи страница → ресурс в рамках сканирования
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS page_assets (
+                    crawl_id INTEGER NOT NULL,
+                    page_id INTEGER NOT NULL,
+                    asset_id INTEGER NOT NULL,
+                    kind TEXT,
+                    UNIQUE (crawl_id, page_id, asset_id),
+                    FOREIGN KEY (crawl_id) REFERENCES crawls (id)
+                )
+            """)
+            
+            # Сводная статистика сканирования, пересчитывается при записи страниц
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS crawl_stats (
+                    crawl_id INTEGER PRIMARY KEY,
+                    total_pages INTEGER NOT NULL,
+                    external_pages INTEGER NOT NULL,
+                    {', '.join(f'status_{name} INTEGER NOT NULL' for name in STATUS_CLASSES)},
+                    max_depth INTEGER,
+                    depth_histogram TEXT,
+                    content_types TEXT,
+                    total_bytes INTEGER,
+                    bytes_p50 INTEGER,
+                    bytes_p95 INTEGER,
+                    latency_avg REAL,
+                    {', '.join(f'latency_p{q} REAL' for q in LATENCY_PERCENTILES)},
+                    latency_max REAL,
+                    updated_at TEXT,
+                    FOREIGN KEY (crawl_id) REFERENCES crawls (id)
+                )
+            """)
+            
+            # Необработанные URL сканирования, остановленного по бюджету
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS frontier (
+                    crawl_id INTEGER NOT NULL,
+                    url TEXT NOT NULL,
+                    depth INTEGER,
+                    parent_url TEXT,
+                    score REAL,
+                    UNIQUE (crawl_id, url),
+                    FOREIGN KEY (crawl_id) REFERENCES crawls (id)
+                )
+            """)
+            
             # Индексы для ускорения запросов
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_pages_url ON pages(url)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_pages_crawl_id ON pages(crawl_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_pages_crawl_url_id ON pages(crawl_id, url_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_pages_crawl_url ON pages(crawl_id, url)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_pages_crawl_status ON pages(crawl_id, status_code)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_pages_crawl_depth ON pages(crawl_id, depth)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_crawls_domain_id ON crawls(domain, id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_links_crawl_id ON links(crawl_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_page_assets_asset ON page_assets(crawl_id, asset_id)")
+            conn.commit()
+            
+    @staticmethod
+    def _ensure_columns(cursor, table: str, columns: Dict[str, str]):
+        """Добавляет недостающие колонки в существующую таблицу"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cursor.fetchall()}
+        for name, column_type in columns.items():
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+                
+    def _resolve_url_ids(self, cursor, urls: Iterable[str]) -> Dict[str, int]:
+        """
+        Возвращает целочисленные ID для URL, создавая недостающие записи
+        
+        ID берутся из LRU-кэша; URL, которых нет в кэше, добавляются
+        в справочник и читаются из БД.
+        
+        :param cursor: Курсор открытого соединения
+        :param urls: URL для преобразования
+        :return: Словарь URL -> ID для переданных URL
+        """
+        url_ids = {}
+        missing = []
+        for url in set(urls):
+            url_id = self._url_ids.get(url)
+            if url_id is None:
+                missing.append(url)
+            else:
+                self._url_ids.move_to_end(url)
+                url_ids[url] = url_id
+        if missing:
+            cursor.executemany(
+                "INSERT OR IGNORE INTO urls (url) VALUES (?)",
+                ((url,) for url in missing)
+            )
+            for start in range(0, len(missing), SQLITE_MAX_VARIABLES):
+                chunk = missing[start:start + SQLITE_MAX_VARIABLES]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(
+                    f"SELECT id, url FROM urls WHERE url IN ({placeholders})",
+                    chunk
+                )
+                for url_id, url in cursor.fetchall():
+                    url_ids[url] = self._url_ids[url] = url_id
+            while len(self._url_ids) > self.url_id_cache_size:
+                self._url_ids.popitem(last=False)
+        return url_ids
+        
+    def save_links(self, crawl_id: int, edges: List[Tuple[str, str, str]]) -> int:
+        """
+        Сохраняет пачку рёбер графа ссылок
+        
+        :param crawl_id: ID сканирования
+        :param edges: Список кортежей (source_url, target_url, link_type)
+        :return: Количество сохраненных рёбер
+        """
+        if not edges:
+            return 0
+            
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            url_ids = self._resolve_url_ids(
+                cursor,
+                (url for source, target, _ in edges for url in (source, target))
+            )
+            cursor.executemany("""
+                INSERT INTO links (crawl_id, source_id, target_id, link_type)
+                VALUES (?, ?, ?, ?)
+            """, (
+                (crawl_id, url_ids[source], url_ids[target], link_type)
+                for source, target, link_type in edges
+            ))
+            conn.commit()
+            
+        return len(edges)
+        
+    def save_link_metrics(self, crawl_id: int, rows: Iterable[Tuple[int, float, Optional[int], int, int]]):
+        """
+        Записывает метрики графа ссылок обратно в таблицу pages
+        
+        :param crawl_id: ID сканирования
+        :param rows: Кортежи (in_degree, pagerank, click_depth, scc_id, url_id)
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.executemany("""
+                UPDATE pages
+                SET in_degree = ?, pagerank = ?, click_depth = ?, scc_id = ?
+                WHERE crawl_id = ? AND url_id = ?
+            """, (
+                (in_degree, pagerank, click_depth, scc_id, crawl_id, url_id)
+                for in_degree, pagerank, click_depth, scc_id, url_id in rows
+            ))
+            conn.commit()
+            
+    def get_link_targets(self, crawl_id: int) -> List[str]:
+        """
+        Возвращает уникальные цели ссылок сканирования
+        
+        Если граф ссылок для сканирования не сохранялся, используются
+        URL страниц из таблицы pages.
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT u.url FROM urls u
+                WHERE u.id IN (SELECT DISTINCT target_id FROM links WHERE crawl_id = ?)
+            """, (crawl_id,))
+            targets = [row[0] for row in cursor.fetchall()]
+            
+            if not targets:
+                cursor.execute(
+                    "SELECT DISTINCT url FROM pages WHERE crawl_id = ?",
+                    (crawl_id,)
+                )
+                targets = [row[0] for row in cursor.fetchall()]
+                
+        return targets
+        
+    def get_fresh_link_checks(self, urls: List[str], ttl: float) -> Dict[str, float]:
+        """
+        Возвращает URL, проверенные не раньше чем ttl секунд назад
+        
+        :param urls: URL для поиска в кэше
+        :param ttl: Время жизни результата проверки в секундах
+        :return: Словарь URL -> время проверки
+        """
+        return self._get_fresh_checks('link_checks', urls, ttl)
+        
+    def _get_fresh_checks(self, table: str, urls: List[str], ttl: float) -> Dict[str, float]:
+        """Ищет в таблице кэша (link_checks или assets) свежие проверки URL"""
+        threshold = datetime.now().timestamp() - ttl
+        fresh = {}
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            for start in range(0, len(urls), SQLITE_MAX_VARIABLES):
+                chunk = urls[start:start + SQLITE_MAX_VARIABLES]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f"""
+                    SELECT u.url, c.checked_at FROM {table} c
+                    JOIN urls u ON u.id = c.url_id
+                    WHERE u.url IN ({placeholders}) AND c.checked_at >= ?
+                """, (*chunk, threshold))
+                fresh.update(cursor.fetchall())
+                
+        return fresh
+        
+    def save_link_checks(self, results: List) -> None:
+        """
+        Сохраняет результаты проверки ссылок в кэш
+        
+        :param results: Список объектов LinkCheckResult
+        """
+        if not results:
+            return
+            
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            url_ids = self._resolve_url_ids(cursor, (r.url for r in results))
+            cursor.executemany("""
+                INSERT OR REPLACE INTO link_checks (
+                    url_id, status_code, final_url, redirect_chain,
+                    latency, method, error, checked_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                (
+                    url_ids[r.url], r.status_code, r.final_url,
+                    json.dumps(r.redirect_chain), r.latency, r.method,
+                    r.error, r.checked_at
+                )
+                for r in results
+            ))
+            conn.commit()
+            
+    def get_link_check_report(self, crawl_id: int) -> List[Dict]:
+        """
+        Формирует отчет о проверке ссылок сканирования
+        
+        :param crawl_id: ID сканирования
+        :return: Список словарей с результатом проверки и числом ссылающихся страниц
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT
+                    u.url, c.status_code, c.final_url, c.redirect_chain,
+                    c.latency, c.method, c.error, c.checked_at,
+                    COUNT(DISTINCT l.source_id) AS referrers,
+                    MIN(s.url) AS example_source
+                FROM links l
+                JOIN urls u ON u.id = l.target_id
+                JOIN urls s ON s.id = l.source_id
+                JOIN link_checks c ON c.url_id = l.target_id
+                WHERE l.crawl_id = ?
+                GROUP BY l.target_id
+                ORDER BY c.error IS NULL, c.status_code DESC, u.url
+            """, (crawl_id,))
+            rows = [dict(row) for row in cursor.fetchall()]
+            
+            if not rows:
+                cursor.execute("""
+                    SELECT
+                        p.url, c.status_code, c.final_url, c.redirect_chain,
+                        c.latency, c.method, c.error, c.checked_at,
+                        0 AS referrers, p.parent_url AS example_source
+                    FROM pages p
+                    JOIN urls u ON u.url = p.url
+                    JOIN link_checks c ON c.url_id = u.id
+                    WHERE p.crawl_id = ?
+                    ORDER BY c.error IS NULL, c.status_code DESC, p.url
+                """, (crawl_id,))
+                rows = [dict(row) for row in cursor.fetchall()]
+                
+        for row in rows:
+            row['redirect_chain'] = json.loads(row['redirect_chain'] or '[]')
+        return rows
+        
+    def save_page_assets(self, crawl_id: int, rows: List[Tuple[str, str, str]]) -> int:
+        """
+        Сохраняет пачку связей страница → ресурс
+        
+        :param crawl_id: ID сканирования
+        :param rows: Список кортежей (page_url, asset_url, kind)
+        :return: Количество переданных связей
+        """
+        if not rows:
+            return 0
+            
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            url_ids = self._resolve_url_ids(
+                cursor,
+                (url for page, asset, _ in rows for url in (page, asset))
+            )
+            cursor.executemany("""
+                INSERT OR IGNORE INTO page_assets (crawl_id, page_id, asset_id, kind)
+                VALUES (?, ?, ?, ?)
+            """, (
+                (crawl_id, url_ids[page], url_ids[asset], kind)
+                for page, asset, kind in rows
+            ))
+            conn.commit()
+            
+        return len(rows)
+        
+    def get_asset_urls(self, crawl_id: int) -> List[str]:
+        """Возвращает уникальные URL ресурсов сканирования"""
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute("""
+                SELECT u.url FROM urls u
+                WHERE u.id IN (SELECT DISTINCT asset_id FROM page_assets WHERE crawl_id = ?)
+            """, (crawl_id,)).fetchall()
+        return [row[0] for row in rows]
+        
+    def get_fresh_asset_checks(self, urls: List[str], ttl: float) -> Dict[str, float]:
+        """Возвращает ресурсы, проверенные не раньше чем ttl секунд назад"""
+        return self._get_fresh_checks('assets', urls, ttl)
+        
+    def save_assets(self, records: List) -> None:
+        """
+        Сохраняет результаты проверки ресурсов
+        
+        :param records: Список объектов AssetRecord
+        """
+        if not records:
+            return
+            
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            url_ids = self._resolve_url_ids(cursor, (r.url for r in records))
+            cursor.executemany("""
+                INSERT OR REPLACE INTO assets (
+                    url_id, status_code, content_type, content_length, cache_control,
+                    etag, last_modified, expires, error, checked_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                (
+                    url_ids[r.url], r.status_code, r.content_type, r.content_length,
+                    r.cache_control, r.etag, r.last_modified, r.expires, r.error, r.checked_at
+                )
+                for r in records
+            ))
             conn.commit()
             
+    def update_page_weights(self, crawl_id: int) -> None:
+        """
+        Пересчитывает pages.page_weight: размер HTML плюс размер всех ресурсов страницы
+        
+        Ресурсы с неизвестным размером считаются нулевыми.
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                UPDATE pages
+                SET page_weight = COALESCE(content_length, 0) + COALESCE((
+                    SELECT SUM(a.content_length)
+                    FROM page_assets pa
+                    JOIN assets a ON a.url_id = pa.asset_id
+                    WHERE pa.crawl_id = pages.crawl_id AND pa.page_id = pages.url_id
+                ), 0)
+                WHERE crawl_id = ?
+            """, (crawl_id,))
+            conn.commit()
+            
+    def get_page_weight_report(self, crawl_id: int, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Возвращает страницы сканирования по убыванию полного веса
+        
+        :param crawl_id: ID сканирования
+        :param limit: Максимальное число строк (None — все)
+        :return: Список словарей url, html_bytes, asset_bytes, assets,
+                 unknown_size, uncached, page_weight
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("""
+                SELECT
+                    p.url,
+                    COALESCE(p.content_length, 0) AS html_bytes,
+                    COALESCE(SUM(a.content_length), 0) AS asset_bytes,
+                    COUNT(pa.asset_id) AS assets,
+                    SUM(CASE WHEN pa.asset_id IS NOT NULL AND a.content_length IS NULL
+                        THEN 1 ELSE 0 END) AS unknown_size,
+                    SUM(CASE WHEN a.url_id IS NOT NULL AND a.cache_control IS NULL
+                        AND a.expires IS NULL THEN 1 ELSE 0 END) AS uncached,
+                    p.page_weight
+                FROM pages p
+                LEFT JOIN page_assets pa ON pa.crawl_id = p.crawl_id AND pa.page_id = p.url_id
+                LEFT JOIN assets a ON a.url_id = pa.asset_id
+                WHERE p.crawl_id = ?
+                GROUP BY p.id
+                ORDER BY p.page_weight DESC, p.url
+                LIMIT ?
+            """, (crawl_id, -1 if limit is None else limit)).fetchall()
+        return [dict(row) for row in rows]
+        
+    def get_asset_summary(self, crawl_id: int) -> Dict:
+        """Сводка по уникальным ресурсам сканирования"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("""
+                SELECT
+                    COUNT(*) AS unique_assets,
+                    SUM(refs.pages) AS references_count,
+                    COALESCE(SUM(a.content_length), 0) AS total_bytes,
+                    SUM(CASE WHEN a.error IS NOT NULL OR a.status_code >= 400 THEN 1 ELSE 0 END) AS broken,
+                    SUM(CASE WHEN a.url_id IS NOT NULL AND a.cache_control IS NULL
+                        AND a.expires IS NULL THEN 1 ELSE 0 END) AS uncached
+                FROM (
+                    SELECT asset_id, COUNT(*) AS pages FROM page_assets
+                    WHERE crawl_id = ? GROUP BY asset_id
+                ) refs
+                LEFT JOIN assets a ON a.url_id = refs.asset_id
+            """, (crawl_id,)).fetchone()
+        return dict(row)
+        
+    def get_latest_crawl_id(self, domain: str) -> Optional[int]:
+        """Возвращает ID последнего сканирования домена"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT MAX(id) FROM crawls WHERE domain = ?",
+                (domain,)
+            )
+            row = cursor.fetchone()
+            return row[0] if row else None
+            
+    def get_crawl_ids(self, domain: str, limit: int = 2, before: Optional[int] = None) -> List[int]:
+        """
+        Возвращает ID последних сканирований домена, от новых к старым
+        
+        :param domain: Домен
+        :param limit: Сколько сканирований вернуть
+        :param before: Только сканирования с ID меньше указанного (None - все)
+        :return: Список ID сканирований
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute(
+                "SELECT id FROM crawls WHERE domain = ? AND (? IS NULL OR id < ?) ORDER BY id DESC LIMIT ?",
+                (domain, before, before, limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+        
+    def diff_crawls(self, old_crawl_id: int, new_crawl_id: int,
+                    include_content: bool = False) -> Iterator[Dict]:
+        """
+        Сравнивает два сканирования и по одной отдает измененные страницы
+        
+        Сравнение выполняется в SQLite соединением по индексу (crawl_id, url):
+        ни одно из сканирований не загружается в память целиком.
+        Изменение содержимого учитывается, только если хэш есть в обоих
+        сканированиях.
+        
+        :param old_crawl_id: ID предыдущего сканирования
+        :param new_crawl_id: ID нового сканирования
+        :param include_content: Сравнивать ли хэш содержимого страниц
+        :return: Итератор словарей с полями url, changes и значениями old_*/new_*
+        """
+        content_changed = """
+            o.content_hash IS NOT NULL AND n.content_hash IS NOT NULL
+            AND o.content_hash != n.content_hash
+        """ if include_content else "0"
+        
+        query = f"""
+            SELECT o.url, 'changed' AS kind,
+                   o.status_code, n.status_code, o.title, n.title,
+                   o.depth, n.depth, o.content_hash, n.content_hash,
+                   {content_changed} AS content_changed
+            FROM pages o
+            JOIN pages n ON n.crawl_id = :new AND n.url = o.url
+            WHERE o.crawl_id = :old
+              AND (o.status_code IS NOT n.status_code
+                   OR o.title IS NOT n.title
+                   OR o.depth IS NOT n.depth
+                   OR ({content_changed}))
+            UNION ALL
+            SELECT o.url, 'removed', o.status_code, NULL, o.title, NULL,
+                   o.depth, NULL, o.content_hash, NULL, 0
+            FROM pages o
+            WHERE o.crawl_id = :old
+              AND NOT EXISTS (SELECT 1 FROM pages n WHERE n.crawl_id = :new AND n.url = o.url)
+            UNION ALL
+            SELECT n.url, 'added', NULL, n.status_code, NULL, n.title,
+                   NULL, n.depth, NULL, n.content_hash, 0
+            FROM pages n
+            WHERE n.crawl_id = :new
+              AND NOT EXISTS (SELECT 1 FROM pages o WHERE o.crawl_id = :old AND o.url = n.url)
+        """
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.execute(query, {'old': old_crawl_id, 'new': new_crawl_id})
+            for (url, kind, old_status, new_status, old_title, new_title,
+                 old_depth, new_depth, old_hash, new_hash, content) in cursor:
+                if kind != 'changed':
+                    changes = [kind]
+                else:
+                    changes = [
+                        name for name, changed in (
+                            ('status', old_status != new_status),
+                            ('title', old_title != new_title),
+                            ('depth', old_depth != new_depth),
+                            ('content', bool(content)),
+                        ) if changed
+                    ]
+                yield {
+                    'url': url,
+                    'changes': changes,
+                    'old_status': old_status,
+                    'new_status': new_status,
+                    'old_title': old_title,
+                    'new_title': new_title,
+                    'old_depth': old_depth,
+                    'new_depth': new_depth,
+                    'old_hash': old_hash,
+                    'new_hash': new_hash,
+                }
+        finally:
+            conn.close()
+            
     def save_tree(self, site_tree: SiteTree, crawl_id: int = None) -> int:
         """
         Сохраняет дерево сайта в базу данных
@@ -83,24 +688,172 @@ class DataStorage:
             # Удаляем старые данные для этого crawl_id
             cursor.execute("DELETE FROM pages WHERE crawl_id = ?", (crawl_id,))
             
+            url_ids = self._resolve_url_ids(cursor, site_tree.nodes.keys())
+            
             # Сохраняем все страницы
-            for node in site_tree.nodes.values():
-                cursor.execute("""
-                    INSERT INTO pages (
-                        crawl_id, url, parent_url, depth, status_code, content_type,
-                        title, description, is_external, links_count, images_count
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    crawl_id, node.url, node.parent.url if node.parent else None,
+            cursor.executemany("""
+                INSERT INTO pages (
+                    crawl_id, url, url_id, parent_url, depth, status_code, content_type,
+                    title, description, is_external, links_count, images_count,
+                    content_length, response_time, content_hash
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                (
+                    crawl_id, node.url, url_ids[node.url],
+                    node.parent.url if node.parent else None,
                     node.depth, node.status_code, node.content_type,
                     node.metadata.get('title'), node.metadata.get('description'),
-                    int(node.is_external), node.links_count, node.images_count
-                ))
+                    int(node.is_external), node.links_count, node.images_count,
+                    node.content_length, node.response_time, node.content_hash
+                )
+                for node in site_tree.nodes.values()
+            ))
+            
+            # Статистика считается по дереву в памяти, без повторного чтения pages
+            self._write_crawl_stats(cursor, crawl_id, (
+                (node.status_code, node.depth, node.content_type, int(node.is_external),
+                 node.content_length, node.response_time)
+                for node in site_tree.nodes.values()
+            ))
                 
             conn.commit()
             
         return crawl_id
         
+    def _write_crawl_stats(self, cursor, crawl_id: int, rows: Iterable[Tuple]) -> Dict:
+        """
+        Считает сводную статистику за один проход и записывает ее в crawl_stats
+        
+        :param cursor: Курсор открытого соединения
+        :param crawl_id: ID сканирования
+        :param rows: Кортежи (status_code, depth, content_type, is_external,
+                     content_length, response_time)
+        :return: Записанная статистика
+        """
+        statuses = dict.fromkeys(STATUS_CLASSES, 0)
+        depths: Dict[int, int] = {}
+        content_types: Dict[str, int] = {}
+        sizes: List[int] = []
+        latencies: List[float] = []
+        total = external = 0
+        
+        for status_code, depth, content_type, is_external, size, latency in rows:
+            total += 1
+            external += is_external or 0
+            if status_code is None:
+                statuses['no_response'] += 1
+            elif 200 <= status_code < 600:
+                statuses[f'{status_code // 100}xx'] += 1
+            else:
+                statuses['other'] += 1
+            if depth is not None:
+                depths[depth] = depths.get(depth, 0) + 1
+            mime = (content_type or 'unknown').split(';', 1)[0].strip().lower() or 'unknown'
+            content_types[mime] = content_types.get(mime, 0) + 1
+            if size:
+                sizes.append(size)
+            if latency:
+                latencies.append(latency)
+                
+        sizes.sort()
+        latencies.sort()
+        stats = {
+            'crawl_id': crawl_id,
+            'total_pages': total,
+            'external_pages': external,
+            **{f'status_{name}': count for name, count in statuses.items()},
+            'max_depth': max(depths) if depths else None,
+            'depth_histogram': json.dumps({str(d): depths[d] for d in sorted(depths)}),
+            'content_types': json.dumps(dict(sorted(content_types.items(), key=lambda item: -item[1]))),
+            'total_bytes': sum(sizes),
+            'bytes_p50': _percentile(sizes, 50),
+            'bytes_p95': _percentile(sizes, 95),
+            'latency_avg': sum(latencies) / len(latencies) if latencies else None,
+            **{f'latency_p{q}': _percentile(latencies, q) for q in LATENCY_PERCENTILES},
+            'latency_max': latencies[-1] if latencies else None,
+            'updated_at': datetime.now().isoformat(),
+        }
+        
+        columns = ', '.join(stats)
+        placeholders = ', '.join('?' * len(stats))
+        cursor.execute(
+            f"INSERT OR REPLACE INTO crawl_stats ({columns}) VALUES ({placeholders})",
+            tuple(stats.values())
+        )
+        return stats
+        
+    def refresh_crawl_stats(self, crawl_id: int) -> Dict:
+        """
+        Пересчитывает статистику по таблице pages
+        
+        Нужен для сканирований, сохраненных до появления crawl_stats.
+        Страницы читаются курсором, без загрузки всей выборки в память.
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            rows = conn.execute("""
+                SELECT status_code, depth, content_type, is_external, content_length, response_time
+                FROM pages WHERE crawl_id = ?
+            """, (crawl_id,))
+            stats = self._write_crawl_stats(cursor, crawl_id, rows)
+            conn.commit()
+        return stats
+        
+    def get_crawl_stats(self, crawl_id: int) -> Optional[Dict]:
+        """
+        Возвращает сводную статистику сканирования
+        
+        :param crawl_id: ID сканирования
+        :return: Словарь со статистикой или None если сканирование не найдено
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("""
+                SELECT c.domain, c.start_time, c.end_time, c.status, c.stop_reason,
+                       c.requests, c.bytes_fetched,
+                       (SELECT COUNT(*) FROM frontier f WHERE f.crawl_id = c.id) AS frontier_size,
+                       s.*
+                FROM crawls c
+                LEFT JOIN crawl_stats s ON s.crawl_id = c.id
+                WHERE c.id = ?
+            """, (crawl_id,)).fetchone()
+            
+        if row is None:
+            return None
+        if row['total_pages'] is None:
+            self.refresh_crawl_stats(crawl_id)
+            return self.get_crawl_stats(crawl_id)
+            
+        stats = dict(row)
+        stats['crawl_id'] = crawl_id
+        stats['depth_histogram'] = json.loads(stats['depth_histogram'] or '{}')
+        stats['content_types'] = json.loads(stats['content_types'] or '{}')
+        return stats
+        
+    def list_sites(self) -> List[Dict]:
+        """
+        Возвращает список сканированных доменов с данными последнего сканирования
+        
+        :return: Список словарей (domain, crawls, crawl_id, start_time, status,
+                 total_pages, status_4xx, status_5xx)
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("""
+                SELECT
+                    latest.domain, latest.crawls, c.id AS crawl_id, c.start_time, c.status,
+                    COALESCE(s.total_pages, c.total_pages) AS total_pages,
+                    s.status_4xx, s.status_5xx
+                FROM (
+                    SELECT domain, COUNT(*) AS crawls, MAX(id) AS last_id
+                    FROM crawls GROUP BY domain
+                ) latest
+                JOIN crawls c ON c.id = latest.last_id
+                LEFT JOIN crawl_stats s ON s.crawl_id = c.id
+                ORDER BY c.id DESC
+            """).fetchall()
+        return [dict(row) for row in rows]
+        
     def _create_crawl(self, domain: str) -> int:
         """Создает новую запись о сканировании"""
         with sqlite3.connect(self.db_path) as conn:
@@ -112,16 +865,67 @@ class DataStorage:
             conn.commit()
             return cursor.lastrowid
             
-    def complete_crawl(self, crawl_id: int, total_pages: int):
-        """Помечает сканирование как завершенное"""
+    def complete_crawl(self, crawl_id: int, total_pages: int, status: str = 'completed',
+                       stop_reason: Optional[str] = None, requests: Optional[int] = None,
+                       bytes_fetched: Optional[int] = None):
+        """
+        Помечает сканирование как завершенное
+        
+        :param crawl_id: ID сканирования
+        :param total_pages: Число сохраненных страниц
+        :param status: 'completed' или 'partial' (остановлено до обхода всей очереди)
+        :param stop_reason: Причина остановки (исчерпанный бюджет, прерывание)
+        :param requests: Число выполненных запросов
+        :param bytes_fetched: Объем загруженных ответов в байтах
+        """
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 UPDATE crawls 
-                SET end_time = ?, status = 'completed', total_pages = ?
+                SET end_time = ?, status = ?, total_pages = ?,
+                    stop_reason = ?, requests = ?, bytes_fetched = ?
                 WHERE id = ?
-            """, (datetime.now().isoformat(), total_pages, crawl_id))
+            """, (datetime.now().isoformat(), status, total_pages,
+                  stop_reason, requests, bytes_fetched, crawl_id))
+            conn.commit()
+            
+    def save_frontier(self, crawl_id: int, entries: Iterable[Tuple[str, int, Optional[str], float]]) -> int:
+        """
+        Сохраняет необработанные URL сканирования
+        
+        Предыдущее состояние очереди этого сканирования заменяется.
+        
+        :param crawl_id: ID сканирования
+        :param entries: Кортежи (url, depth, parent_url, score)
+        :return: Число сохраненных URL
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM frontier WHERE crawl_id = ?", (crawl_id,))
+            cursor.executemany("""
+                INSERT OR IGNORE INTO frontier (crawl_id, url, depth, parent_url, score)
+                VALUES (?, ?, ?, ?, ?)
+            """, ((crawl_id, *entry) for entry in entries))
             conn.commit()
+            return cursor.execute(
+                "SELECT COUNT(*) FROM frontier WHERE crawl_id = ?", (crawl_id,)
+            ).fetchone()[0]
+            
+    def get_frontier(self, crawl_id: int) -> List[Dict]:
+        """
+        Возвращает сохраненную очередь сканирования
+        
+        :param crawl_id: ID сканирования
+        :return: Список словарей (url, depth, parent_url, score) по убыванию оценки
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("""
+                SELECT url, depth, parent_url, score FROM frontier
+                WHERE crawl_id = ?
+                ORDER BY score DESC, rowid
+            """, (crawl_id,)).fetchall()
+        return [dict(row) for row in rows]
             
     def export_tree(self, site_tree: SiteTree, format: ExportFormat, output_path: str):
         """
@@ -199,45 +1003,11 @@ class DataStorage:
             f.write('\n'.join(xml_content))
             
     def _export_html(self, site_tree: SiteTree, output_path: Path):
-        """Экспорт в HTML отчет"""
-        html_content = [
-            '<!DOCTYPE html>',
-            '<html><head>',
-            '<title>Site Tree Report</title>',
-            '<style>',
-            'body { font-family: Arial, sans-serif; margin: 20px; }',
-            'h1 { color: #333; }',
-            'ul { list-style-type: none; padding-left: 20px; }',
-            'li { margin: 5px 0; }',
-            '.external { color: #666; }',
-            '.error { color: red; }',
-            '</style>',
-            '</head><body>',
-            f'<h1>Site Tree: {site_tree.domain}</h1>',
-            f'<p>Total pages: {len(site_tree.nodes)}</p>',
-            '<ul>'
-        ]
+        """Экспорт в интерактивный HTML отчет с данными в отдельных файлах"""
+        from .html_report import HTMLReportExporter
         
-        def build_tree(node: SiteNode, level: int):
-            indent = '&nbsp;' * 4 * level
-            cls = 'external' if node.is_external else ''
-            cls += ' error' if node.status_code and node.status_code >= 400 else ''
-            
-            html_content.append(
-                f'<li>{indent}<a href="{node.url}" class="{cls}">'
-                f'{node.metadata.get("title", node.url)}</a>'
-                f'<span> (status: {node.status_code}, depth: {node.depth})</span></li>'
-            )
-            
-            for child in sorted(node.children, key=lambda n: n.url):
-                build_tree(child, level + 1)
-                
-        build_tree(site_tree.root, 0)
-        html_content.append('</ul></body></html>')
+        HTMLReportExporter().export(site_tree, output_path)
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(html_content))
-            
     def _export_csv(self, site_tree: SiteTree, output_path: Path):
         """Экспорт в CSV формат"""
         import csv
@@ -299,4 +1069,11 @@ class DataStorage:
         ])
         
         with open(output_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(graphml_content))
\ No newline at end of file
+            f.write('\n'.join(graphml_content))
+
+def _percentile(sorted_values: List, q: float):
+    """Перцентиль методом ближайшего ранга по отсортированному списку"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, -(-q * len(sorted_values) // 100) - 1))
+    return sorted_values[int(rank)]
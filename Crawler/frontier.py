@@ -0,0 +1,280 @@
+import math
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+@dataclass
+class URLSignals:
+    """Сигналы, накопленные краулером для URL в очереди"""
+    depth: int
+    in_links: int = 0
+    anchor_texts: List[str] = field(default_factory=list)
+    sitemap_priority: Optional[float] = None
+    lastmod: Optional[float] = None  # Unix timestamp из <lastmod>
+
+    def add_anchor(self, text: Optional[str], limit: int = 5) -> None:
+        """Запоминает несколько первых непустых текстов ссылок"""
+        if text and len(self.anchor_texts) < limit:
+            self.anchor_texts.append(text.strip()[:200])
+
+# Оценка URL: чем больше число, тем раньше страница будет загружена
+Scorer = Callable[[str, URLSignals], float]
+
+class DepthScorer:
+    """
+    Оценка только по глубине — прежнее поведение URLManager:
+    корень, затем страницы глубже 0 и меньше 3, затем все остальные.
+    """
+
+    def __call__(self, url: str, signals: URLSignals) -> float:
+        if signals.depth == 0:
+            return 3.0
+        return 2.0 if signals.depth < 3 else 1.0
+
+class ImportanceScorer:
+    """
+    Оценка важности страницы по сигналам, доступным до ее загрузки.
+
+    Складывает взвешенные составляющие:
+    - число входящих ссылок, найденных на уже загруженных страницах (log1p);
+    - текст ссылок: описательный текст лучше, чем «далее», «2» или пустой;
+    - шаблон URL: параметры запроса, пагинация, сортировки, теги, служебные
+      разделы и длинные пути снижают оценку;
+    - priority из sitemap.xml и свежесть lastmod;
+    - небольшой штраф за глубину.
+    """
+
+    GENERIC_ANCHORS = {
+        '', 'next', 'prev', 'previous', 'more', 'read more', 'here', 'click here',
+        'далее', 'назад', 'вперед', 'вперёд', 'еще', 'ещё', 'подробнее', 'читать далее',
+        'следующая', 'предыдущая', '»', '«', '>', '<', '...', '→', '←',
+    }
+    LOW_VALUE_PATH = re.compile(
+        r'/(tag|tags|page|search|filter|sort|print|login|logout|register|signin|signup|'
+        r'cart|basket|checkout|account|compare|wishlist|feed|rss|calendar|archive)(/|$)',
+        re.IGNORECASE
+    )
+    LOW_VALUE_QUERY = re.compile(r'(^|&)(page|p|sort|order|filter|view|limit|offset|sessionid|utm_[a-z]+)=',
+                                 re.IGNORECASE)
+    BINARY_EXTENSIONS = re.compile(r'\.(jpe?g|png|gif|svg|webp|pdf|zip|gz|mp4|mp3|docx?|xlsx?)$', re.IGNORECASE)
+
+    def __init__(self, in_link_weight: float = 2.0, anchor_weight: float = 0.5,
+                 pattern_weight: float = 1.0, sitemap_weight: float = 0.5,
+                 freshness_weight: float = 0.5, depth_weight: float = 0.1,
+                 freshness_half_life_days: float = 30.0):
+        self.in_link_weight = in_link_weight
+        self.anchor_weight = anchor_weight
+        self.pattern_weight = pattern_weight
+        self.sitemap_weight = sitemap_weight
+        self.freshness_weight = freshness_weight
+        self.depth_weight = depth_weight
+        self.freshness_half_life = freshness_half_life_days * 86400
+
+    def __call__(self, url: str, signals: URLSignals) -> float:
+        if signals.depth == 0:
+            return math.inf
+
+        score = self.in_link_weight * math.log1p(signals.in_links)
+        score += self.anchor_weight * self._anchor_score(signals.anchor_texts)
+        score += self.pattern_weight * self._pattern_score(url)
+        score -= self.depth_weight * signals.depth
+
+        if signals.sitemap_priority is not None:
+            score += self.sitemap_weight * signals.sitemap_priority
+        if signals.lastmod is not None:
+            age = max(0.0, time.time() - signals.lastmod)
+            score += self.freshness_weight * 0.5 ** (age / self.freshness_half_life)
+        return score
+
+    def _anchor_score(self, anchors: List[str]) -> float:
+        """1 для описательного текста ссылки, 0 для пустого/служебного"""
+        best = 0.0
+        for text in anchors:
+            normalized = text.lower().strip()
+            if normalized in self.GENERIC_ANCHORS or normalized.isdigit():
+                continue
+            best = max(best, min(len(normalized.split()), 4) / 4)
+        return best
+
+    def _pattern_score(self, url: str) -> float:
+        """Штрафы за признаки служебных и «фасетных» страниц (от -3 до 0)"""
+        parsed = urlparse(url)
+        score = 0.0
+        if parsed.query:
+            score -= 0.5
+            if self.LOW_VALUE_QUERY.search(parsed.query):
+                score -= 1.0
+        if self.LOW_VALUE_PATH.search(parsed.path):
+            score -= 1.0
+        if self.BINARY_EXTENSIONS.search(parsed.path):
+            score -= 1.0
+        segments = [s for s in parsed.path.split('/') if s]
+        score -= 0.1 * max(0, len(segments) - 3)
+        return max(score, -3.0)
+
+SCORERS: Dict[str, Callable[[], Scorer]] = {
+    'depth': DepthScorer,
+    'importance': ImportanceScorer,
+}
+
+class IndexedHeap:
+    """
+    Двоичная max-куча с индексом позиций элементов.
+
+    Позволяет за O(log n) менять приоритет элемента, уже находящегося
+    в очереди (decrease-key/increase-key), без дубликатов и «ленивого»
+    удаления. При равном приоритете раньше выходит добавленный раньше.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._position: Dict[Hashable, int] = {}
+        self._counter = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._position
+
+    def push(self, key: Hashable, priority: float) -> None:
+        """Добавляет элемент или обновляет приоритет существующего"""
+        if key in self._position:
+            self.update(key, priority)
+            return
+        self._counter += 1
+        # Храним -priority: heapq-порядок «меньше — раньше»
+        self._heap.append((-priority, self._counter, key))
+        self._position[key] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+
+    def update(self, key: Hashable, priority: float) -> None:
+        """Меняет приоритет элемента в куче"""
+        index = self._position[key]
+        old_priority, order, _ = self._heap[index]
+        self._heap[index] = (-priority, order, key)
+        if -priority < old_priority:
+            self._sift_up(index)
+        else:
+            self._sift_down(index)
+
+    def priority(self, key: Hashable) -> float:
+        """Текущий приоритет элемента"""
+        return -self._heap[self._position[key]][0]
+
+    def pop(self) -> Tuple[Hashable, float]:
+        """Извлекает элемент с наибольшим приоритетом"""
+        if not self._heap:
+            raise IndexError("pop from empty heap")
+        top = self._heap[0]
+        last = self._heap.pop()
+        del self._position[top[2]]
+        if self._heap:
+            self._heap[0] = last
+            self._position[last[2]] = 0
+            self._sift_down(0)
+        return top[2], -top[0]
+
+    def _sift_up(self, index: int) -> None:
+        heap, position = self._heap, self._position
+        item = heap[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if heap[parent] <= item:
+                break
+            heap[index] = heap[parent]
+            position[heap[index][2]] = index
+            index = parent
+        heap[index] = item
+        position[item[2]] = index
+
+    def _sift_down(self, index: int) -> None:
+        heap, position = self._heap, self._position
+        size = len(heap)
+        item = heap[index]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1] < heap[child]:
+                child += 1
+            if item <= heap[child]:
+                break
+            heap[index] = heap[child]
+            position[heap[index][2]] = index
+            index = child
+        heap[index] = item
+        position[item[2]] = index
+
+class Frontier:
+    """
+    Очередь URL, упорядоченная функцией оценки.
+
+    Хранит сигналы каждого URL в очереди; при появлении новой входящей
+    ссылки сигналы обновляются, и URL пересчитывается на месте.
+    Интерфейс empty()/qsize() совместим с asyncio.PriorityQueue,
+    который раньше использовал URLManager.
+
+    Сигналы извлеченного URL хранятся до release(): если загрузка не
+    состоялась, requeue() возвращает URL с накопленными входящими ссылками.
+    """
+
+    def __init__(self, scorer: Optional[Scorer] = None):
+        self.scorer = scorer or DepthScorer()
+        self.signals: Dict[str, URLSignals] = {}
+        self._taken: Dict[str, URLSignals] = {}
+        self._heap = IndexedHeap()
+
+    def empty(self) -> bool:
+        return not len(self._heap)
+
+    def qsize(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._heap
+
+    def push(self, url: str, signals: URLSignals) -> float:
+        """Добавляет URL с начальными сигналами, возвращает оценку"""
+        self.signals[url] = signals
+        score = self.scorer(url, signals)
+        self._heap.push(url, score)
+        return score
+
+    def add_in_link(self, url: str, depth: int, anchor_text: Optional[str] = None) -> float:
+        """Учитывает новую входящую ссылку на URL из очереди и обновляет его место"""
+        signals = self.signals[url]
+        signals.in_links += 1
+        signals.depth = min(signals.depth, depth)
+        signals.add_anchor(anchor_text)
+        score = self.scorer(url, signals)
+        self._heap.update(url, score)
+        return score
+
+    def update_signals(self, url: str, sitemap_priority: Optional[float] = None,
+                       lastmod: Optional[float] = None) -> float:
+        """Дополняет сигналы URL данными sitemap и обновляет его место"""
+        signals = self.signals[url]
+        if sitemap_priority is not None:
+            signals.sitemap_priority = sitemap_priority
+        if lastmod is not None:
+            signals.lastmod = lastmod
+        score = self.scorer(url, signals)
+        self._heap.update(url, score)
+        return score
+
+    def pop(self) -> Tuple[str, float]:
+        """Извлекает URL с наибольшей оценкой"""
+        url, score = self._heap.pop()
+        self._taken[url] = self.signals.pop(url)
+        return url, score
+
+    def requeue(self, url: str) -> float:
+        """Возвращает извлеченный URL в очередь с прежними сигналами, возвращает оценку"""
+        return self.push(url, self._taken.pop(url))
+
+    def release(self, url: str) -> None:
+        """Забывает сигналы обработанного URL"""
+        self._taken.pop(url, None)
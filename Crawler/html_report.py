@@ -0,0 +1,392 @@
+import html
+import json
+import time
+from collections import deque
+from itertools import repeat
+from operator import attrgetter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .site_tree_builder import SiteTree
+
+# Порядок полей записи узла в файлах данных; id узла — его номер в обходе в ширину
+NODE_FIELDS = ['parent', 'url', 'title', 'status', 'depth', 'external', 'child_start', 'child_count']
+
+_CHUNK_PREFIX = 'window.__treeChunk('
+_SCRIPT_ESCAPES = [('<', '\\u003c'), ('\u2028', '\\u2028'), ('\u2029', '\\u2029')]
+
+class HTMLReportExporter:
+    """
+    Интерактивный HTML-отчет по дереву сайта.
+
+    Пишет небольшую HTML-оболочку и каталог <имя>_data с данными узлов,
+    разбитыми на файлы по chunk_size записей. Узлы нумеруются обходом
+    в ширину без рекурсии, поэтому дети любого узла занимают непрерывный
+    диапазон номеров: запись узла хранит начало диапазона и число детей,
+    и браузер загружает только файлы, нужные для раскрытого поддерева
+    или текущей страницы детей. Поиск просматривает файлы по одному.
+
+    Файлы данных — JS-скрипты вида window.__treeChunk(n, [...]) с JSON
+    внутри: их можно подключать тегом <script> при открытии отчета
+    с диска, где fetch() локальных файлов браузеры запрещают.
+    """
+
+    def __init__(self, chunk_size: int = 5000, page_size: int = 200, max_title_length: int = 300):
+        """
+        :param chunk_size: Количество узлов в одном файле данных
+        :param page_size: Сколько детей узла показывать за раз
+        :param max_title_length: Максимальная длина заголовка в отчете
+        """
+        self.chunk_size = chunk_size
+        self.page_size = page_size
+        self.max_title_length = max_title_length
+
+    def export(self, site_tree: SiteTree, output_path: Path) -> Dict:
+        """
+        Сохраняет отчет
+
+        :param site_tree: Дерево сайта
+        :param output_path: Путь к HTML-файлу; данные пишутся в соседний каталог <имя>_data
+        :return: Сводка: число узлов, файлов данных, время генерации
+        """
+        started = time.perf_counter()
+        output_path = Path(output_path)
+        data_dir = output_path.with_name(f"{output_path.stem}_data")
+        data_dir.mkdir(parents=True, exist_ok=True)
+        for stale in data_dir.glob('chunk_*.js'):
+            stale.unlink()
+
+        total, chunks, max_depth, status_classes = self._write_chunks(site_tree, data_dir)
+
+        meta = {
+            'domain': site_tree.domain,
+            'total': total,
+            'chunkSize': self.chunk_size,
+            'chunks': chunks,
+            'pageSize': self.page_size,
+            'dataDir': data_dir.name,
+            'maxDepth': max_depth,
+            'statusClasses': dict(sorted(status_classes.items())),
+            'generatedAt': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(_HTML_TEMPLATE
+                    .replace('{{title}}', html.escape(f"Site Tree: {site_tree.domain}"))
+                    .replace('{{meta}}', self._script_json(meta)))
+
+        return {
+            'nodes': total,
+            'chunks': chunks,
+            'data_dir': str(data_dir),
+            'elapsed': time.perf_counter() - started,
+        }
+
+    def _write_chunks(self, site_tree: SiteTree, data_dir: Path):
+        """
+        Обходит дерево в ширину и пишет записи узлов пачками
+
+        :return: (число узлов, число файлов, максимальная глубина, число страниц по классам статусов)
+        """
+        by_url = attrgetter('url')
+        title_limit = self.max_title_length
+        chunk_size = self.chunk_size
+        queue = deque([(site_tree.root, -1)])
+        next_id = 1
+        node_id = 0
+        chunk: List[tuple] = []
+        chunk_index = 0
+        max_depth = 0
+        status_classes: Dict[Optional[int], int] = {}
+
+        while queue:
+            node, parent_id = queue.popleft()
+            children = sorted(node.children, key=by_url) if node.children else ()
+            status = node.status_code
+            depth = node.depth
+            chunk.append((
+                parent_id,
+                node.url,
+                (node.metadata.get('title') or '')[:title_limit],
+                status,
+                depth,
+                1 if node.is_external else 0,
+                next_id,
+                len(children),
+            ))
+            if children:
+                queue.extend(zip(children, repeat(node_id)))
+                next_id += len(children)
+            if depth > max_depth:
+                max_depth = depth
+            status_class = status // 100 if status else None
+            status_classes[status_class] = status_classes.get(status_class, 0) + 1
+            node_id += 1
+
+            if len(chunk) == chunk_size:
+                self._write_chunk(data_dir, chunk_index, chunk)
+                chunk_index += 1
+                chunk = []
+
+        if chunk:
+            self._write_chunk(data_dir, chunk_index, chunk)
+            chunk_index += 1
+        classes = {f"{key}xx" if key else 'none': count for key, count in status_classes.items()}
+        return node_id, chunk_index, max_depth, classes
+
+    def _write_chunk(self, data_dir: Path, index: int, rows: List[tuple]):
+        with open(data_dir / f"chunk_{index}.js", 'w', encoding='utf-8') as f:
+            f.write(f"{_CHUNK_PREFIX}{index},{self._script_json(rows)});\n")
+
+    @staticmethod
+    def _script_json(value) -> str:
+        """JSON, безопасный для вставки в <script>: без «</script>» и разделителей строк"""
+        text = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+        for char, escape in _SCRIPT_ESCAPES:
+            if char in text:
+                text = text.replace(char, escape)
+        return text
+
+_HTML_TEMPLATE = """<!DOCTYPE html>
+<html><head>
+<meta charset="utf-8">
+<title>{{title}}</title>
+<style>
+body { font-family: Arial, sans-serif; margin: 20px; }
+h1 { color: #333; }
+ul { list-style-type: none; padding-left: 20px; }
+li { margin: 3px 0; }
+a { color: #1a4f9c; }
+.external { color: #666; }
+.error { color: red; }
+.toggle { display: inline-block; width: 1.2em; cursor: pointer; user-select: none; color: #555; }
+.leaf { cursor: default; color: #bbb; }
+.info, .path { color: #888; font-size: 90%; margin-left: 6px; }
+#summary { color: #444; margin-bottom: 12px; }
+#search-form { margin-bottom: 12px; }
+#search-form input { width: 360px; padding: 4px; }
+#search-status { color: #888; margin-left: 8px; }
+button.link { background: none; border: none; color: #1a4f9c; cursor: pointer; padding: 0; font-size: 90%; }
+</style>
+</head><body>
+<h1 id="title"></h1>
+<div id="summary"></div>
+<form id="search-form">
+<input id="search" type="search" placeholder="Search URL or title, or status:404">
+<button type="submit">Search</button>
+<button type="button" id="search-clear">Clear</button>
+<span id="search-status"></span>
+</form>
+<ul id="results" hidden></ul>
+<ul id="tree"></ul>
+<script>
+const META = {{meta}};
+const MAX_CACHED_CHUNKS = 20;
+const cache = new Map();
+const pending = new Map();
+
+window.__treeChunk = function (index, rows) {
+  cache.set(index, rows);
+  const request = pending.get(index);
+  if (request) request.resolve(rows);
+};
+
+function loadChunk(index) {
+  if (cache.has(index)) {
+    const rows = cache.get(index);
+    cache.delete(index);
+    cache.set(index, rows);
+    return Promise.resolve(rows);
+  }
+  if (pending.has(index)) return pending.get(index).promise;
+  const request = {};
+  request.promise = new Promise((resolve, reject) => { request.resolve = resolve; request.reject = reject; });
+  pending.set(index, request);
+  const script = document.createElement('script');
+  script.src = META.dataDir + '/chunk_' + index + '.js';
+  script.onload = () => {
+    script.remove();
+    pending.delete(index);
+    while (cache.size > MAX_CACHED_CHUNKS) cache.delete(cache.keys().next().value);
+  };
+  script.onerror = () => {
+    script.remove();
+    pending.delete(index);
+    request.reject(new Error('Cannot load ' + script.src));
+  };
+  document.head.appendChild(script);
+  return request.promise;
+}
+
+function toNode(id, row) {
+  return {id: id, parent: row[0], url: row[1], title: row[2], status: row[3], depth: row[4],
+          external: row[5] === 1, childStart: row[6], childCount: row[7]};
+}
+
+async function getNodes(start, count) {
+  const nodes = [];
+  const end = Math.min(start + count, META.total);
+  let id = start;
+  while (id < end) {
+    const index = Math.floor(id / META.chunkSize);
+    const rows = await loadChunk(index);
+    const offset = index * META.chunkSize;
+    const stop = Math.min(end, offset + rows.length);
+    for (; id < stop; id++) nodes.push(toNode(id, rows[id - offset]));
+  }
+  return nodes;
+}
+
+function el(tag, className, text) {
+  const element = document.createElement(tag);
+  if (className) element.className = className;
+  if (text !== undefined) element.textContent = text;
+  return element;
+}
+
+function nodeLink(node) {
+  let className = node.external ? 'external' : '';
+  if (node.status && node.status >= 400) className += ' error';
+  const link = el('a', className.trim(), node.title || node.url);
+  if (/^https?:\\/\\//i.test(node.url)) {
+    link.href = node.url;
+    link.target = '_blank';
+    link.rel = 'noopener noreferrer';
+  }
+  link.title = node.url;
+  return link;
+}
+
+function nodeInfo(node) {
+  let text = '(status: ' + (node.status === null ? '\\u2014' : node.status) + ', depth: ' + node.depth;
+  if (node.childCount) text += ', children: ' + node.childCount;
+  return el('span', 'info', text + ')');
+}
+
+function renderNode(node) {
+  const li = el('li');
+  const toggle = el('span', node.childCount ? 'toggle' : 'toggle leaf', node.childCount ? '\\u25b8' : '\\u00b7');
+  li.append(toggle, nodeLink(node), nodeInfo(node));
+  if (node.childCount) {
+    let list = null;
+    toggle.onclick = () => {
+      if (list) {
+        // Свернутое поддерево удаляется из DOM, чтобы память не росла
+        list.remove();
+        list = null;
+        toggle.textContent = '\\u25b8';
+        return;
+      }
+      list = el('ul');
+      li.appendChild(list);
+      toggle.textContent = '\\u25be';
+      renderChildren(node, list, 0);
+    };
+  }
+  return li;
+}
+
+async function renderChildren(node, list, offset) {
+  const count = Math.min(META.pageSize, node.childCount - offset);
+  const children = await getNodes(node.childStart + offset, count);
+  const fragment = document.createDocumentFragment();
+  children.forEach(child => fragment.appendChild(renderNode(child)));
+  list.appendChild(fragment);
+  const rest = node.childCount - offset - count;
+  if (rest > 0) {
+    const more = el('li');
+    const button = el('button', 'link', 'Show ' + Math.min(rest, META.pageSize) + ' more of ' + rest);
+    button.onclick = () => { more.remove(); renderChildren(node, list, offset + count); };
+    more.appendChild(button);
+    list.appendChild(more);
+  }
+}
+
+async function showPath(node, target) {
+  const parts = [];
+  let parent = node.parent;
+  while (parent >= 0) {
+    const ancestor = (await getNodes(parent, 1))[0];
+    parts.unshift(ancestor.title || ancestor.url);
+    parent = ancestor.parent;
+  }
+  target.textContent = parts.join(' \\u203a ') || '(root)';
+}
+
+const SEARCH_PAGE = 100;
+let searchToken = 0;
+
+function matcher(query) {
+  const status = /^status:(\\d{3})$/i.exec(query);
+  if (status) {
+    const code = Number(status[1]);
+    return row => row[3] === code;
+  }
+  const needle = query.toLowerCase();
+  return row => row[1].toLowerCase().includes(needle) || row[2].toLowerCase().includes(needle);
+}
+
+async function search(query, fromId, token) {
+  const results = document.getElementById('results');
+  const status = document.getElementById('search-status');
+  const matches = matcher(query);
+  let found = 0;
+  for (let index = Math.floor(fromId / META.chunkSize); index < META.chunks; index++) {
+    const rows = await loadChunk(index);
+    if (token !== searchToken) return;
+    const offset = index * META.chunkSize;
+    for (let i = Math.max(fromId - offset, 0); i < rows.length; i++) {
+      if (!matches(rows[i])) continue;
+      const node = toNode(offset + i, rows[i]);
+      const li = el('li');
+      const path = el('span', 'path');
+      const pathButton = el('button', 'link', 'path');
+      pathButton.onclick = () => { pathButton.remove(); showPath(node, path); };
+      li.append(nodeLink(node), nodeInfo(node), path);
+      path.appendChild(pathButton);
+      results.appendChild(li);
+      if (++found === SEARCH_PAGE) {
+        status.textContent = 'Searched ' + (offset + i + 1) + ' of ' + META.total;
+        const more = el('li');
+        const button = el('button', 'link', 'Find more');
+        button.onclick = () => { more.remove(); search(query, offset + i + 1, token); };
+        more.appendChild(button);
+        results.appendChild(more);
+        return;
+      }
+    }
+    status.textContent = 'Searched ' + Math.min(offset + rows.length, META.total) + ' of ' + META.total;
+  }
+  status.textContent += ' \\u2014 done';
+}
+
+document.getElementById('search-form').onsubmit = event => {
+  event.preventDefault();
+  const query = document.getElementById('search').value.trim();
+  const results = document.getElementById('results');
+  results.textContent = '';
+  searchToken++;
+  if (!query) { results.hidden = true; return; }
+  results.hidden = false;
+  search(query, 0, searchToken);
+};
+document.getElementById('search-clear').onclick = () => {
+  searchToken++;
+  document.getElementById('search').value = '';
+  document.getElementById('search-status').textContent = '';
+  const results = document.getElementById('results');
+  results.textContent = '';
+  results.hidden = true;
+};
+
+document.getElementById('title').textContent = 'Site Tree: ' + META.domain;
+document.getElementById('summary').textContent = 'Total pages: ' + META.total + ', max depth: ' + META.maxDepth +
+  ', statuses: ' + Object.entries(META.statusClasses).map(([k, v]) => k + ' ' + v).join(', ') +
+  ', generated: ' + META.generatedAt;
+getNodes(0, 1).then(nodes => {
+  const root = renderNode(nodes[0]);
+  document.getElementById('tree').appendChild(root);
+  if (nodes[0].childCount) root.firstChild.click();
+});
+</script>
+</body></html>
+"""
@@ -0,0 +1,172 @@
+import aiohttp
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from itertools import zip_longest
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Статусы, при которых HEAD повторяется ranged GET-запросом:
+# многие серверы не поддерживают HEAD или отвечают на него некорректно.
+# Таймаут и ошибка соединения не повторяются: GET к недоступному хосту
+# только удвоил бы время проверки
+HEAD_FALLBACK_STATUSES = {400, 403, 405, 501}
+
+@dataclass
+class LinkCheckResult:
+    """Результат проверки одной ссылки"""
+    url: str
+    status_code: Optional[int] = None
+    final_url: Optional[str] = None
+    redirect_chain: List[str] = field(default_factory=list)
+    latency: float = 0.0
+    method: str = 'HEAD'
+    error: Optional[str] = None
+    checked_at: float = 0.0
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def is_broken(self) -> bool:
+        """Ссылка считается битой при ошибке соединения или статусе >= 400"""
+        return self.error is not None or (self.status_code or 0) >= 400
+
+class LinkChecker:
+    """
+    Массовая проверка ссылок пулом HEAD-запросов.
+
+    Каждый уникальный URL проверяется один раз. Общее число одновременных
+    запросов ограничено `concurrency`, число запросов к одному хосту —
+    `per_host`. Если HEAD не поддерживается, выполняется GET с Range: bytes=0-0.
+    """
+
+    def __init__(self, config: Dict):
+        self.config = config
+        self.concurrency = config.get('concurrency', 1000)
+        self.per_host = config.get('per_host', 8)
+        self.max_redirects = config.get('max_redirects', 10)
+        # Заголовки ответа, которые нужно сохранить в результате
+        self.capture_headers = tuple(config.get('capture_headers', ()))
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.per_host)
+        )
+
+    async def __aenter__(self):
+        """Создание общей HTTP-сессии с пулом соединений"""
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.per_host,
+            ttl_dns_cache=300
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.config.get('timeout', 15)),
+            headers={'User-Agent': self.config.get('user_agent', 'WebCrawler/1.0')}
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Закрытие HTTP-сессии"""
+        if self.session:
+            await self.session.close()
+
+    async def check_many(self, urls: Iterable[str],
+                         on_result: Callable[[LinkCheckResult], None] = None) -> List[LinkCheckResult]:
+        """
+        Проверяет набор URL с ограничением параллелизма
+
+        :param urls: URL для проверки (дубликаты отбрасываются)
+        :param on_result: Колбэк, вызываемый для каждого готового результата
+        :return: Список результатов
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for url in self._interleave_hosts(urls):
+            queue.put_nowait(url)
+
+        results: List[LinkCheckResult] = []
+
+        async def worker():
+            while True:
+                try:
+                    url = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                result = await self.check(url)
+                results.append(result)
+                if on_result:
+                    on_result(result)
+
+        workers = min(self.concurrency, queue.qsize())
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
+
+    async def check(self, url: str) -> LinkCheckResult:
+        """
+        Проверяет один URL с учетом лимита на хост
+
+        :param url: URL для проверки
+        :return: Объект LinkCheckResult
+        """
+        host = urlparse(url).netloc.lower()
+        async with self._host_limits[host]:
+            result = await self._request(url, 'HEAD')
+            if result.status_code in HEAD_FALLBACK_STATUSES:
+                result = await self._request(url, 'GET')
+        return result
+
+    async def _request(self, url: str, method: str) -> LinkCheckResult:
+        """Выполняет HEAD или ranged GET и заполняет результат"""
+        result = LinkCheckResult(url=url, method=method, checked_at=time.time())
+        headers = {'Range': 'bytes=0-0'} if method == 'GET' else None
+        start_time = time.perf_counter()
+
+        try:
+            async with self.session.request(
+                method, url,
+                headers=headers,
+                allow_redirects=True,
+                max_redirects=self.max_redirects
+            ) as response:
+                result.status_code = response.status
+                result.final_url = str(response.url)
+                result.redirect_chain = [str(r.url) for r in response.history]
+                result.headers = {
+                    name: response.headers[name]
+                    for name in self.capture_headers
+                    if name in response.headers
+                }
+        except asyncio.TimeoutError:
+            result.error = 'timeout'
+        except aiohttp.TooManyRedirects as e:
+            result.error = 'too many redirects'
+            result.redirect_chain = [str(r.url) for r in e.history]
+        except Exception as e:
+            result.error = str(e) or e.__class__.__name__
+
+        result.latency = time.perf_counter() - start_time
+        return result
+
+    @staticmethod
+    def _interleave_hosts(urls: Iterable[str]) -> List[str]:
+        """
+        Убирает дубликаты и чередует хосты, чтобы воркеры не простаивали
+        в ожидании лимита одного и того же хоста
+        """
+        by_host: Dict[str, List[str]] = defaultdict(list)
+        seen = set()
+        for url in urls:
+            if url in seen:
+                continue
+            seen.add(url)
+            by_host[urlparse(url).netloc.lower()].append(url)
+
+        return [
+            url
+            for group in zip_longest(*by_host.values())
+            for url in group
+            if url is not None
+        ]
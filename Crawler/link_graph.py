@@ -0,0 +1,228 @@
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from .data_storage import DataStorage
+from .exceptions import StorageError
+
+try:
+    import numpy as np
+    from scipy import sparse
+    from scipy.sparse import csgraph
+except ImportError:  # pragma: no cover - зависит от окружения
+    np = None
+    sparse = None
+    csgraph = None
+
+@dataclass
+class LinkGraphMetrics:
+    """Сводка по графу ссылок одного сканирования"""
+    crawl_id: int
+    nodes: int = 0
+    edges: int = 0
+    pages: int = 0
+    orphan_pages: int = 0
+    unreachable_pages: int = 0
+    scc_count: int = 0
+    largest_scc: int = 0
+    pagerank_iterations: int = 0
+    top_pages: List[Tuple[str, float, int]] = field(default_factory=list)
+
+class LinkGraphAnalyzer:
+    """
+    Анализ графа ссылок на разреженных матрицах NumPy/SciPy.
+
+    Граф загружается из таблицы links одним проходом, URL переиндексируются
+    в плотный диапазон 0..n-1, после чего in-degree, PageRank, глубина клика
+    (BFS от корня) и сильно связные компоненты считаются векторно.
+    """
+
+    def __init__(self, storage: DataStorage, damping: float = 0.85,
+                 tolerance: float = 1e-8, max_iterations: int = 100):
+        if np is None:
+            raise StorageError(
+                "Для анализа графа ссылок нужны numpy и scipy: "
+                "pip install 'web-crawler[analytics]'"
+            )
+        self.storage = storage
+        self.damping = damping
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+
+    def analyze(self, crawl_id: int, top: int = 10) -> LinkGraphMetrics:
+        """
+        Считает метрики графа и записывает их в таблицу pages
+
+        :param crawl_id: ID сканирования
+        :param top: Сколько страниц с наибольшим PageRank вернуть в сводке
+        :return: Сводка по графу
+        """
+        metrics = LinkGraphMetrics(crawl_id=crawl_id)
+
+        with sqlite3.connect(self.storage.db_path) as conn:
+            sources, targets = self._load_edges(conn, crawl_id)
+            page_ids, root_id = self._load_pages(conn, crawl_id)
+
+        if page_ids.size == 0:
+            raise StorageError(f"Нет страниц для сканирования {crawl_id}")
+
+        # Плотная переиндексация: страницы + все концы рёбер
+        node_ids, inverse = np.unique(
+            np.concatenate([page_ids, sources, targets]),
+            return_inverse=True
+        )
+        n = node_ids.size
+        page_idx = inverse[:page_ids.size]
+        src = inverse[page_ids.size:page_ids.size + sources.size]
+        dst = inverse[page_ids.size + sources.size:]
+
+        adjacency = self._build_adjacency(src, dst, n)
+        metrics.nodes = n
+        metrics.edges = adjacency.nnz
+        metrics.pages = page_ids.size
+
+        in_degree = np.diff(adjacency.tocsc().indptr)
+        pagerank, metrics.pagerank_iterations = self._pagerank(adjacency)
+
+        root_idx = int(np.searchsorted(node_ids, root_id)) if root_id is not None else None
+        click_depth = self._click_depth(adjacency, root_idx)
+
+        metrics.scc_count, scc_labels = csgraph.connected_components(
+            adjacency, directed=True, connection='strong'
+        )
+        scc_sizes = np.bincount(scc_labels)
+        metrics.largest_scc = int(scc_sizes.max()) if scc_sizes.size else 0
+
+        page_in_degree = in_degree[page_idx]
+        page_depth = click_depth[page_idx]
+        is_root = page_idx == root_idx if root_idx is not None else np.zeros(page_idx.size, bool)
+        metrics.orphan_pages = int(np.count_nonzero((page_in_degree == 0) & ~is_root))
+        metrics.unreachable_pages = int(np.count_nonzero(page_depth < 0))
+
+        self.storage.save_link_metrics(crawl_id, zip(
+            page_in_degree.tolist(),
+            pagerank[page_idx].tolist(),
+            [depth if depth >= 0 else None for depth in page_depth.tolist()],
+            scc_labels[page_idx].tolist(),
+            page_ids.tolist()
+        ))
+
+        metrics.top_pages = self._top_pages(
+            node_ids, pagerank, in_degree, page_idx, top
+        )
+        return metrics
+
+    @staticmethod
+    def _load_edges(conn, crawl_id: int) -> Tuple['np.ndarray', 'np.ndarray']:
+        """Загружает рёбра в массивы без промежуточных Python-списков"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM links WHERE crawl_id = ?", (crawl_id,))
+        count = cursor.fetchone()[0]
+
+        cursor.execute(
+            "SELECT source_id, target_id FROM links WHERE crawl_id = ?",
+            (crawl_id,)
+        )
+        edges = np.fromiter(
+            cursor,
+            dtype=np.dtype([('source', np.int64), ('target', np.int64)]),
+            count=count
+        )
+        return edges['source'], edges['target']
+
+    @staticmethod
+    def _load_pages(conn, crawl_id: int) -> Tuple['np.ndarray', Optional[int]]:
+        """Загружает ID страниц сканирования и ID корневой страницы"""
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT url_id FROM pages WHERE crawl_id = ? AND url_id IS NOT NULL",
+            (crawl_id,)
+        )
+        page_ids = np.fromiter((row[0] for row in cursor), dtype=np.int64)
+
+        cursor.execute("""
+            SELECT url_id FROM pages
+            WHERE crawl_id = ? AND url_id IS NOT NULL
+            ORDER BY depth, id LIMIT 1
+        """, (crawl_id,))
+        row = cursor.fetchone()
+        return page_ids, (row[0] if row else None)
+
+    @staticmethod
+    def _build_adjacency(src: 'np.ndarray', dst: 'np.ndarray', n: int):
+        """Строит бинарную матрицу смежности без петель и кратных рёбер"""
+        keep = src != dst
+        adjacency = sparse.csr_matrix(
+            (np.ones(np.count_nonzero(keep), dtype=np.float64), (src[keep], dst[keep])),
+            shape=(n, n)
+        )
+        adjacency.sum_duplicates()
+        adjacency.data[:] = 1.0
+        return adjacency
+
+    def _pagerank(self, adjacency) -> Tuple['np.ndarray', int]:
+        """PageRank степенным методом с учетом висячих вершин"""
+        n = adjacency.shape[0]
+        out_degree = np.diff(adjacency.indptr).astype(np.float64)
+        dangling = out_degree == 0
+        inv_out = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+        transition_t = adjacency.T.tocsr()
+
+        rank = np.full(n, 1.0 / n)
+        for iteration in range(1, self.max_iterations + 1):
+            leaked = rank[dangling].sum()
+            new_rank = self.damping * (transition_t @ (rank * inv_out))
+            new_rank += (self.damping * leaked + 1.0 - self.damping) / n
+            delta = np.abs(new_rank - rank).sum()
+            rank = new_rank
+            if delta < self.tolerance:
+                break
+        return rank, iteration
+
+    @staticmethod
+    def _click_depth(adjacency, root_idx: Optional[int]) -> 'np.ndarray':
+        """Глубина клика: послойный BFS по CSR-матрице, -1 для недостижимых"""
+        n = adjacency.shape[0]
+        depth = np.full(n, -1, dtype=np.int64)
+        if root_idx is None:
+            return depth
+
+        indptr, indices = adjacency.indptr, adjacency.indices
+        frontier = np.array([root_idx], dtype=np.int64)
+        depth[root_idx] = 0
+        level = 0
+        while frontier.size:
+            level += 1
+            starts, ends = indptr[frontier], indptr[frontier + 1]
+            lengths = ends - starts
+            if not lengths.sum():
+                break
+            # Индексы всех исходящих рёбер текущего слоя одним массивом
+            offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+            neighbours = indices[offsets + np.arange(lengths.sum())]
+            neighbours = np.unique(neighbours)
+            frontier = neighbours[depth[neighbours] < 0]
+            depth[frontier] = level
+        return depth
+
+    def _top_pages(self, node_ids, pagerank, in_degree, page_idx, top: int) -> List[Tuple[str, float, int]]:
+        """Возвращает страницы с наибольшим PageRank"""
+        if top <= 0 or page_idx.size == 0:
+            return []
+        order = page_idx[np.argsort(-pagerank[page_idx])[:top]]
+        urls = self._urls_by_id(node_ids[order].tolist())
+        return [
+            (urls.get(int(node_ids[i]), ''), float(pagerank[i]), int(in_degree[i]))
+            for i in order
+        ]
+
+    def _urls_by_id(self, url_ids: List[int]) -> Dict[int, str]:
+        """Получает URL по их ID"""
+        if not url_ids:
+            return {}
+        with sqlite3.connect(self.storage.db_path) as conn:
+            placeholders = ','.join('?' * len(url_ids))
+            rows = conn.execute(
+                f"SELECT id, url FROM urls WHERE id IN ({placeholders})",
+                url_ids
+            ).fetchall()
+        return dict(rows)
@@ -37,13 +37,16 @@ def check_crawler_status():
                 cursor = conn.cursor()
                 
                 # Получаем информацию о сканированиях
-                cursor.execute("SELECT * FROM crawls ORDER BY id DESC LIMIT 5")
+                cursor.execute("""
+                    SELECT id, domain, start_time, end_time, total_pages, status
+                    FROM crawls ORDER BY id DESC LIMIT 5
+                """)
                 crawls = cursor.fetchall()
                 
                 if crawls:
                     print("\n📊 Последние сканирования:")
                     for crawl in crawls:
-                        crawl_id, domain, start_time, end_time, total_pages, status, config = crawl
+                        crawl_id, domain, start_time, end_time, total_pages, status = crawl
                         print(f"   ID: {crawl_id}, Домен: {domain}")
                         print(f"   Статус: {status}, Страниц: {total_pages or 'N/A'}")
                         print(f"   Начало: {start_time}")
@@ -52,15 +55,27 @@ def check_crawler_status():
                         
                         # Получаем статистику по страницам для последнего сканирования
                         if crawl == crawls[0]:  # Последнее сканирование
+                            # Сводка хранится в crawl_stats, pages не сканируется
                             cursor.execute("""
                                 SELECT 
-                                    COUNT(*) as total,
-                                    COUNT(CASE WHEN status_code = 200 THEN 1 END) as success,
-                                    COUNT(CASE WHEN status_code >= 400 THEN 1 END) as errors,
-                                    MAX(depth) as max_depth
-                                FROM pages WHERE crawl_id = ?
+                                    total_pages as total,
+                                    status_2xx as success,
+                                    status_4xx + status_5xx as errors,
+                                    max_depth
+                                FROM crawl_stats WHERE crawl_id = ?
                             """, (crawl_id,))
                             stats = cursor.fetchone()
+                            if stats is None:
+                                # Сканирование без сводки (старое или идущее): считаем по pages
+                                cursor.execute("""
+                                    SELECT 
+                                        COUNT(*) as total,
+                                        COUNT(CASE WHEN status_code BETWEEN 200 AND 299 THEN 1 END) as success,
+                                        COUNT(CASE WHEN status_code >= 400 THEN 1 END) as errors,
+                                        MAX(depth) as max_depth
+                                    FROM pages WHERE crawl_id = ?
+                                """, (crawl_id,))
+                                stats = cursor.fetchone()
                             if stats and stats[0] > 0:
                                 total, success, errors, max_depth = stats
                                 print(f"   📈 Статистика страниц:")
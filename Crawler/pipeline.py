@@ -0,0 +1,98 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from .url_manager import URLInfo
+
+@dataclass
+class PageTask:
+    """Страница, передаваемая между стадиями конвейера"""
+    url_info: URLInfo
+    fetch_result: object = None
+    parse_result: object = None
+    site: object = None
+
+@dataclass
+class StageMetrics:
+    """Метрики одной стадии конвейера fetch → parse → store"""
+    name: str
+    workers: int
+    queue: Optional[asyncio.Queue] = None
+    processed: int = 0
+    errors: int = 0
+    in_flight: int = 0
+    busy_time: float = 0.0
+    max_queue_depth: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    def observe_queue(self) -> None:
+        """Запоминает максимальную глубину входной очереди стадии"""
+        if self.queue is not None:
+            self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+
+    def begin(self) -> float:
+        """Отмечает начало обработки элемента"""
+        self.in_flight += 1
+        self.observe_queue()
+        return time.perf_counter()
+
+    def end(self, started: float, failed: bool = False) -> None:
+        """Отмечает окончание обработки элемента"""
+        self.in_flight -= 1
+        self.busy_time += time.perf_counter() - started
+        if failed:
+            self.errors += 1
+        else:
+            self.processed += 1
+
+    def to_dict(self) -> Dict:
+        """Снимок метрик для логов и статистики"""
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return {
+            'workers': self.workers,
+            'processed': self.processed,
+            'errors': self.errors,
+            'in_flight': self.in_flight,
+            'queue_depth': self.queue.qsize() if self.queue is not None else 0,
+            'queue_capacity': self.queue.maxsize if self.queue is not None else 0,
+            'max_queue_depth': self.max_queue_depth,
+            'utilization': round(self.busy_time / (elapsed * self.workers), 3),
+        }
+
+class LoopBudget:
+    """
+    Ограничение времени, которое воркер стадии держит event loop.
+
+    asyncio.Queue.get()/put() не уступают управление, пока очередь не пуста
+    и не полна, поэтому воркер с синхронной работой (inline-парсинг, запись
+    в дерево) может обработать подряд много элементов, не давая loop
+    обслуживать загрузки и таймеры. checkpoint() уступает управление, когда
+    с момента последнего ожидания прошло больше interval секунд; уступка
+    после каждой страницы обходится дороже на маленьких страницах.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._since = time.perf_counter()
+
+    async def get(self, queue: asyncio.Queue):
+        """queue.get(), учитывающий ожидание как уступку loop"""
+        if queue.empty():
+            item = await queue.get()
+            self._since = time.perf_counter()
+            return item
+        return queue.get_nowait()
+
+    async def put(self, queue: asyncio.Queue, item) -> None:
+        """queue.put(), учитывающий ожидание как уступку loop"""
+        if queue.full():
+            await queue.put(item)
+            self._since = time.perf_counter()
+        else:
+            queue.put_nowait(item)
+
+    async def checkpoint(self) -> None:
+        """Уступает управление, если бюджет времени исчерпан"""
+        if time.perf_counter() - self._since >= self.interval:
+            await asyncio.sleep(0)
+            self._since = time.perf_counter()
@@ -0,0 +1,189 @@
+import asyncio
+import cProfile
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Awaitable, Dict, List, Optional, Tuple
+from .utils.loop_monitor import LoopLagMonitor, SlowCallbackCollector
+
+logger = logging.getLogger(__name__)
+
+class SamplingProfiler:
+    """
+    Статистический профилировщик основного потока.
+
+    Фоновый поток раз в interval секунд снимает стек основного потока через
+    sys._current_frames() и считает одинаковые стеки. Сам профилируемый код
+    не инструментируется, поэтому накладные расходы не зависят от числа
+    вызовов функций и составляют доли процента при интервале 5 мс.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._target_id: Optional[int] = None
+
+    def start(self) -> None:
+        """Начинает снимать стеки текущего потока"""
+        self._target_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Останавливает сбор"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                self.stacks[tuple(stack)] += 1
+                self.samples += 1
+
+    def _label(self, code) -> str:
+        """Имя функции для flamegraph: func (file.py:line)"""
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            parts = Path(filename).parts
+            short = '/'.join(parts[-2:]) if len(parts) > 1 else filename
+            label = f"{code.co_name} ({short}:{code.co_firstlineno})".replace(';', ':')
+            self._labels[code] = label
+        return label
+
+    def write_collapsed(self, path: Path) -> None:
+        """
+        Пишет стеки в формате collapsed stacks («a;b;c 42»), который понимают
+        flamegraph.pl, speedscope и inferno
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+    def top_functions(self, limit: int = 15) -> List[Tuple[str, int, int]]:
+        """Функции с наибольшим собственным и общим числом сэмплов"""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                total[label] += count
+        return [(label, count, total[label]) for label, count in own.most_common(limit)]
+
+class CrawlProfiler:
+    """
+    Профилирование сканирования.
+
+    Режимы:
+    - sampling — только SamplingProfiler (collapsed stacks), низкие накладные расходы;
+    - cprofile — дополнительно детерминированный cProfile (pstats), точнее,
+      но заметно замедляет код с большим числом вызовов.
+
+    В обоих режимах замеряется задержка event loop. Флаг asyncio_debug
+    включает отладочный режим asyncio и собирает медленные callback'и;
+    он заметно дороже и рассчитан на короткие прогоны.
+    """
+
+    def __init__(self, output_dir: str, mode: str = 'sampling', interval: float = 0.005,
+                 asyncio_debug: bool = False, slow_callback_duration: float = 0.1):
+        if mode not in ('sampling', 'cprofile'):
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.output_dir = Path(output_dir)
+        self.mode = mode
+        self.asyncio_debug = asyncio_debug
+        self.slow_callback_duration = slow_callback_duration
+        self.sampler = SamplingProfiler(interval)
+        self.loop_monitor = LoopLagMonitor(threshold=slow_callback_duration)
+        self.slow_callbacks = SlowCallbackCollector()
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._started = 0.0
+        self._elapsed = 0.0
+        self._cpu = 0.0
+
+    async def run(self, coro: Awaitable):
+        """Выполняет корутину сканирования под профилировщиком"""
+        loop = asyncio.get_running_loop()
+        asyncio_logger = logging.getLogger('asyncio')
+        if self.asyncio_debug:
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.slow_callback_duration
+            asyncio_logger.addHandler(self.slow_callbacks)
+
+        self.loop_monitor.start()
+        self._started = time.perf_counter()
+        cpu_started = time.process_time()
+        self.sampler.start()
+        if self.mode == 'cprofile':
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        try:
+            return await coro
+        finally:
+            if self._cprofile:
+                self._cprofile.disable()
+            self.sampler.stop()
+            self._elapsed = time.perf_counter() - self._started
+            self._cpu = time.process_time() - cpu_started
+            await self.loop_monitor.stop()
+            if self.asyncio_debug:
+                asyncio_logger.removeHandler(self.slow_callbacks)
+                loop.set_debug(False)
+
+    def write_reports(self) -> Dict[str, str]:
+        """
+        Сохраняет результаты в output_dir
+
+        :return: Словарь вид отчета -> путь к файлу
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        files = {}
+
+        collapsed = self.output_dir / 'profile.collapsed'
+        self.sampler.write_collapsed(collapsed)
+        files['collapsed'] = str(collapsed)
+
+        if self._cprofile:
+            pstats_path = self.output_dir / 'profile.pstats'
+            self._cprofile.dump_stats(str(pstats_path))
+            files['pstats'] = str(pstats_path)
+
+        loop_path = self.output_dir / 'profile_loop.json'
+        with open(loop_path, 'w', encoding='utf-8') as f:
+            json.dump(self.get_summary(), f, indent=2, ensure_ascii=False)
+        files['loop'] = str(loop_path)
+        return files
+
+    def get_summary(self) -> Dict:
+        """Сводка: время, сэмплы, задержка loop, медленные callback'и, топ функций"""
+        return {
+            'mode': self.mode,
+            'pid': os.getpid(),
+            'wall_time': self._elapsed,
+            'cpu_time': self._cpu,
+            'samples': self.sampler.samples,
+            'sample_interval': self.sampler.interval,
+            'loop_lag': self.loop_monitor.get_stats(),
+            'slow_callbacks': self.slow_callbacks.get_stats() if self.asyncio_debug else None,
+            'top_functions': [
+                {'function': label, 'self_samples': own, 'total_samples': total}
+                for label, own, total in self.sampler.top_functions()
+            ],
+        }
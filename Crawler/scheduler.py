@@ -0,0 +1,145 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from .url_manager import URLManager, URLInfo
+from .site_tree_builder import SiteTree, SiteTreeBuilder
+from .frontier import Scorer
+from .budget import BudgetUsage, CrawlBudget
+from .utils.url_normalizer import URLNormalizer
+from .exceptions import InvalidURL
+
+@dataclass
+class SiteSeed:
+    """Стартовый URL сайта для пакетного сканирования"""
+    url: str
+    weight: int = 1
+    max_pages: Optional[int] = None
+    max_depth: Optional[int] = None
+    max_bytes: Optional[int] = None
+    max_requests: Optional[int] = None
+    max_duration: Optional[float] = None
+
+@dataclass
+class SiteCrawl:
+    """Состояние сканирования одного сайта внутри общего контроллера"""
+    root_url: str
+    max_pages: int
+    max_depth: int
+    weight: int = 1
+    crawl_id: Optional[int] = None
+    url_manager: URLManager = None
+    tree_builder: SiteTreeBuilder = field(default_factory=SiteTreeBuilder)
+    site_tree: Optional[SiteTree] = None
+    link_buffer: List[Tuple[str, str, str]] = field(default_factory=list)
+    asset_buffer: List[Tuple[str, str, str]] = field(default_factory=list)
+    limit_reached: bool = False
+    scorer: Optional[Scorer] = None
+    budget: CrawlBudget = field(default_factory=CrawlBudget)
+    usage: BudgetUsage = field(default_factory=BudgetUsage)
+    stop_reason: Optional[str] = None
+
+    def __post_init__(self):
+        if self.url_manager is None:
+            self.url_manager = URLManager(max_pages=self.max_pages, scorer=self.scorer)
+        self.domain = URLNormalizer.get_domain(self.root_url)
+
+    def can_dispatch(self) -> bool:
+        """Есть ли у сайта URL, которые можно отдать загрузчику"""
+        manager = self.url_manager
+        if self.limit_reached or manager.pending_queue.empty() or self.check_budget():
+            return False
+        return manager.total_processed + len(manager.processing) < self.max_pages
+
+    def check_budget(self) -> Optional[str]:
+        """
+        Проверяет бюджет сайта и запоминает причину остановки
+
+        :return: Причина остановки или None если сайту можно выдавать URL
+        """
+        if self.stop_reason is None:
+            self.stop_reason = self.usage.exceeded(self.budget)
+        return self.stop_reason
+
+    def has_in_flight(self) -> bool:
+        """Обрабатываются ли сейчас страницы сайта на стадиях конвейера"""
+        return bool(self.url_manager.processing)
+
+class FairScheduler:
+    """
+    Распределяет URL между сайтами по алгоритму smooth weighted round-robin.
+
+    Сайт с весом 2 получает вдвое больше слотов загрузки, чем сайт с весом 1,
+    при этом выдачи чередуются, а не идут подряд. Сайты, чей хост еще не
+    готов по rate limit, пропускаются, пока есть готовые.
+    """
+
+    def __init__(self, sites: List[SiteCrawl], is_ready: Callable[[str], bool] = None):
+        self.sites = sites
+        self.is_ready = is_ready or (lambda domain: True)
+        self._current_weight: Dict[str, int] = {site.domain: 0 for site in sites}
+
+    async def next_url(self) -> Optional[Tuple[SiteCrawl, URLInfo]]:
+        """
+        Выбирает сайт и берет из его очереди следующий URL
+
+        :return: Пара (сайт, URLInfo) или None если отдавать нечего
+        """
+        candidates = [site for site in self.sites if site.can_dispatch()]
+        while candidates:
+            ready = [site for site in candidates if self.is_ready(site.domain)] or candidates
+            site = self._pick(ready)
+            url_info = await site.url_manager.get_next_url()
+            if url_info:
+                return site, url_info
+            candidates.remove(site)
+        return None
+
+    def has_in_flight(self) -> bool:
+        """Есть ли страницы в обработке хотя бы у одного сайта"""
+        return any(site.has_in_flight() for site in self.sites)
+
+    def _pick(self, sites: List[SiteCrawl]) -> SiteCrawl:
+        """Один шаг smooth weighted round-robin"""
+        total = 0
+        best = None
+        for site in sites:
+            self._current_weight[site.domain] += site.weight
+            total += site.weight
+            if best is None or self._current_weight[site.domain] > self._current_weight[best.domain]:
+                best = site
+        self._current_weight[best.domain] -= total
+        return best
+
+# Параметры сайта, которые можно указать в файле со списком сайтов
+SEED_OPTIONS = ('weight', 'max_pages', 'max_depth', 'max_bytes', 'max_requests', 'max_duration')
+
+def load_seeds(path: str) -> List[SiteSeed]:
+    """
+    Читает файл со списком сайтов
+
+    Формат строки: URL и необязательные параметры key=value
+    (weight, max_pages, max_depth, max_bytes, max_requests, max_duration
+    в секундах). Пустые строки и строки с # пропускаются.
+
+        https://example.com weight=2 max_pages=500 max_duration=600
+    """
+    seeds = []
+    for line_no, line in enumerate(Path(path).read_text(encoding='utf-8').splitlines(), 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+
+        url, *options = line.split()
+        if not URLNormalizer.is_valid_url(url):
+            raise InvalidURL(f"Недопустимый URL в строке {line_no}: {url}")
+
+        seed = SiteSeed(url=url)
+        for option in options:
+            key, _, value = option.partition('=')
+            # Время может быть дробным, остальные параметры — целые
+            number = value.replace('.', '', 1) if key == 'max_duration' else value
+            if key not in SEED_OPTIONS or not number.isdigit():
+                raise ValueError(f"Неизвестный параметр в строке {line_no}: {option}")
+            setattr(seed, key, float(value) if key == 'max_duration' else int(value))
+        seeds.append(seed)
+    return seeds
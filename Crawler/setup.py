@@ -9,10 +9,19 @@ setup(
         'beautifulsoup4>=4.11.0',
         'lxml>=4.9.0',
         'click>=8.1.0',
-        'PyYAML>=6.0',
-        'tqdm>=4.65.0',
-        'loguru>=0.7.0',
     ],
+    extras_require={
+        'analytics': [
+            'numpy>=1.23',
+            'scipy>=1.9',
+        ],
+        'uvloop': [
+            'uvloop>=0.17; sys_platform != "win32"',
+        ],
+        'postgres': [
+            'asyncpg>=0.27',
+        ],
+    },
     entry_points={
         'console_scripts': [
             'web-crawler=Crawler.cli:cli',
@@ -16,6 +16,9 @@ class SiteNode:
     is_external: bool = False
     links_count: int = 0
     images_count: int = 0
+    content_length: int = 0
+    response_time: float = 0.0
+    content_hash: Optional[str] = None
     
     def __post_init__(self):
         if self.children is None:
@@ -108,6 +111,9 @@ class SiteTreeBuilder:
         
         node.status_code = fetch_result.status_code
         node.content_type = fetch_result.content_type
+        node.content_length = fetch_result.content_length
+        node.response_time = fetch_result.response_time
+        node.content_hash = fetch_result.content_hash
         
         if parse_result.metadata:
             node.metadata.update({
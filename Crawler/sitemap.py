@@ -0,0 +1,121 @@
+import gzip
+import logging
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional
+from urllib.parse import urljoin
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class SitemapEntry:
+    """Запись <url> из sitemap.xml"""
+    url: str
+    priority: Optional[float] = None
+    lastmod: Optional[float] = None
+
+class SitemapLoader:
+    """
+    Загрузка URL из sitemap.xml для начального заполнения очереди.
+
+    Адреса sitemap берутся из директив Sitemap в robots.txt, иначе
+    используется /sitemap.xml. Поддерживаются индексы sitemap и файлы .gz.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, max_urls: int = 50000, max_files: int = 50):
+        self.session = session
+        self.max_urls = max_urls
+        self.max_files = max_files
+
+    async def load(self, root_url: str, sitemap_urls: Optional[List[str]] = None) -> List[SitemapEntry]:
+        """
+        Загружает записи всех найденных sitemap сайта
+
+        :param root_url: Корневой URL сайта
+        :param sitemap_urls: Адреса sitemap из robots.txt (если известны)
+        :return: Список записей не длиннее max_urls
+        """
+        pending = list(sitemap_urls or [urljoin(root_url, '/sitemap.xml')])
+        seen = set()
+        entries: List[SitemapEntry] = []
+
+        while pending and len(seen) < self.max_files and len(entries) < self.max_urls:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in seen:
+                continue
+            seen.add(sitemap_url)
+
+            content = await self._fetch(sitemap_url)
+            if content is None:
+                continue
+            try:
+                root = ET.fromstring(content)
+            except ET.ParseError as e:
+                logger.warning(f"Не удалось разобрать sitemap {sitemap_url}: {e}")
+                continue
+
+            tag = self._local_name(root.tag)
+            for item in root:
+                fields = {self._local_name(child.tag): (child.text or '').strip() for child in item}
+                loc = fields.get('loc')
+                if not loc:
+                    continue
+                if tag == 'sitemapindex':
+                    pending.append(loc)
+                elif tag == 'urlset':
+                    entries.append(SitemapEntry(
+                        url=loc,
+                        priority=self._parse_priority(fields.get('priority')),
+                        lastmod=self._parse_lastmod(fields.get('lastmod'))
+                    ))
+                    if len(entries) >= self.max_urls:
+                        break
+
+        logger.info(f"Из sitemap {root_url} получено {len(entries)} URL")
+        return entries
+
+    async def _fetch(self, url: str) -> Optional[bytes]:
+        """Скачивает sitemap, распаковывая gzip при необходимости"""
+        try:
+            async with self.session.get(url) as response:
+                if response.status != 200:
+                    return None
+                content = await response.read()
+        except Exception as e:
+            logger.warning(f"Ошибка загрузки sitemap {url}: {e}")
+            return None
+
+        if content[:2] == b'\x1f\x8b':
+            try:
+                content = gzip.decompress(content)
+            except OSError:
+                return None
+        return content
+
+    @staticmethod
+    def _local_name(tag: str) -> str:
+        """Имя тега без пространства имен"""
+        return tag.rsplit('}', 1)[-1]
+
+    @staticmethod
+    def _parse_priority(value: Optional[str]) -> Optional[float]:
+        try:
+            return min(max(float(value), 0.0), 1.0) if value else None
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _parse_lastmod(value: Optional[str]) -> Optional[float]:
+        """W3C Datetime (2024-05-01 или 2024-05-01T10:00:00+03:00) в timestamp"""
+        if not value:
+            return None
+        try:
+            moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment.timestamp()
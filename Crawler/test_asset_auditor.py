@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Тесты аудита ресурсов: запрашиваются только ресурсы по http(s),
+вес страницы считается по проверенным ресурсам.
+
+Ресурсы отдает локальный aiohttp-сервер, внешняя сеть не нужна.
+
+Запуск: python -m pytest Crawler/test_asset_auditor.py
+"""
+import asyncio
+
+from aiohttp import web
+
+from Crawler.asset_auditor import AssetAuditor
+from Crawler.data_storage import DataStorage
+from Crawler.site_tree_builder import SiteTree
+
+ROOT = 'https://example.com/'
+INLINE = [
+    'data:image/png;base64,iVBORw0KGgo=',
+    'blob:https://example.com/550e8400-e29b-41d4-a716-446655440000',
+    'javascript:void(0)',
+]
+
+def audit(storage, crawl_id, asset_paths):
+    """
+    Сохраняет ресурсы главной страницы и проверяет их против локального сервера
+
+    :return: Пара (сводка аудита, пути запросов к серверу)
+    """
+    requested = []
+
+    async def handler(request):
+        requested.append(request.path)
+        return web.Response(body=b'x' * 500, content_type='image/png',
+                            headers={'Cache-Control': 'max-age=60'})
+
+    async def run():
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', 0).start()
+        port = runner.addresses[0][1]
+        assets = [f'http://127.0.0.1:{port}{path}' for path in asset_paths] + INLINE
+        storage.save_page_assets(crawl_id, [(ROOT, url, 'img') for url in assets])
+        try:
+            return await AssetAuditor(storage, {'timeout': 5}).audit(crawl_id)
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(run()), requested
+
+def test_only_http_assets_are_probed(tmp_path):
+    storage = DataStorage(str(tmp_path))
+    tree = SiteTree(ROOT)
+    tree.root.status_code = 200
+    tree.root.content_length = 1000
+    crawl_id = storage.save_tree(tree)
+
+    summary, requested = audit(storage, crawl_id, ['/logo.png', '/photo.png'])
+
+    assert sorted(requested) == ['/logo.png', '/photo.png']
+    assert summary.unique_assets == 5
+    assert summary.skipped == 3
+    assert summary.probed == 2
+    report = storage.get_page_weight_report(crawl_id)
+    assert [(row['url'], row['page_weight']) for row in report] == [(ROOT, 2000)]
+
+def test_fresh_checks_are_not_repeated(tmp_path):
+    storage = DataStorage(str(tmp_path))
+    crawl_id = storage.save_tree(SiteTree(ROOT))
+
+    audit(storage, crawl_id, ['/logo.png'])
+    summary, requested = audit(storage, crawl_id, ['/logo.png'])
+    # Порт сервера новый, поэтому новый URL проверяется, а первый — из кэша
+    assert requested == ['/logo.png']
+    assert summary.cached == 1
+    assert summary.probed == 1
+    assert summary.skipped == 3
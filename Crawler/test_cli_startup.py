@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Проверка времени запуска CLI.
+
+Запускает `python -X importtime -c "import Crawler.cli"` в отдельном процессе
+и проверяет, что тяжелые зависимости не импортируются при старте, а суммарное
+время импорта Crawler.cli укладывается в бюджет. Бюджет можно переопределить
+переменной окружения CRAWLER_IMPORT_BUDGET_MS.
+
+Запуск: python -m pytest Crawler/test_cli_startup.py или python Crawler/test_cli_startup.py
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Модули, которые должны загружаться только командами, которым они нужны
+HEAVY_MODULES = ['aiohttp', 'bs4', 'lxml', 'sqlite3', 'asyncio', 'numpy', 'scipy']
+
+IMPORT_BUDGET_MS = float(os.environ.get('CRAWLER_IMPORT_BUDGET_MS', 150))
+
+def measure_imports(statement: str = 'import Crawler.cli') -> Dict[str, int]:
+    """
+    Выполняет импорт в новом интерпретаторе с -X importtime
+
+    :param statement: Код для выполнения
+    :return: Словарь модуль -> суммарное время импорта в микросекундах
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, _, cumulative, name = (part.strip() for part in line.replace('import time:', '|').split('|'))
+        modules[name] = int(cumulative)
+    return modules
+
+def test_heavy_modules_not_imported():
+    modules = measure_imports()
+    loaded = [name for name in HEAVY_MODULES if name in modules]
+    assert not loaded, f"При импорте Crawler.cli загружены тяжелые модули: {loaded}"
+
+def test_import_time_budget():
+    # Лучший из трех замеров, чтобы не зависеть от прогрева диска
+    cumulative = min(measure_imports()['Crawler.cli'] for _ in range(3)) / 1000
+    assert cumulative <= IMPORT_BUDGET_MS, \
+        f"Импорт Crawler.cli занял {cumulative:.1f} мс (бюджет {IMPORT_BUDGET_MS:.0f} мс)"
+
+def test_help_runs():
+    result = subprocess.run(
+        [sys.executable, '-m', 'Crawler', '--help'],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert 'crawl' in result.stdout
+
+if __name__ == '__main__':
+    modules = measure_imports()
+    print(f"Crawler.cli: {modules['Crawler.cli'] / 1000:.1f} мс (бюджет {IMPORT_BUDGET_MS:.0f} мс)")
+    for name, cumulative in sorted(modules.items(), key=lambda item: -item[1])[:15]:
+        print(f"  {cumulative / 1000:8.1f} мс  {name}")
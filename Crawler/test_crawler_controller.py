@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Тесты конвейера краулера: остановка выдачи URL по max_pages и бюджету
+и ожидание загрузок в работе (drain_timeout).
+
+Сеть не используется: WebFetcher заменяется загрузчиком, который отдает
+бесконечное бинарное дерево страниц с заданной задержкой.
+
+Запуск: python -m pytest Crawler/test_crawler_controller.py
+"""
+import asyncio
+import time
+
+import pytest
+
+from Crawler import crawler_controller
+from Crawler.budget import STOP_MAX_DURATION, STOP_MAX_REQUESTS
+from Crawler.crawler_controller import CrawlerConfig, CrawlerController
+from Crawler.data_storage import DataStorage
+from Crawler.scheduler import load_seeds
+from Crawler.web_fetcher import FetchResult
+
+ROOT = 'https://example.com/'
+
+class FakeFetcher:
+    """
+    Загрузчик без сети: страница /pN ссылается на /p(2N+1) и /p(2N+2)
+    
+    Главная отдается сразу, остальные страницы — через delay секунд.
+    """
+    delay = 0.0
+    started = []
+    finished = []
+    cancelled = []
+
+    def __init__(self, config):
+        self.rate_limiter = self
+        self.session = None
+
+    @classmethod
+    def reset(cls, delay):
+        cls.delay = delay
+        cls.started, cls.finished, cls.cancelled = [], [], []
+
+    def is_ready(self, domain):
+        return True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def fetch_page(self, url):
+        self.started.append(url)
+        try:
+            await asyncio.sleep(self.delay if url != ROOT else 0)
+        except asyncio.CancelledError:
+            self.cancelled.append(url)
+            raise
+        self.finished.append(url)
+
+        number = int(url.rsplit('/p', 1)[1]) if '/p' in url else 0
+        links = ''.join(f'<a href="/p{child}">p{child}</a>' for child in (2 * number + 1, 2 * number + 2))
+        result = FetchResult(url)
+        result.status_code = 200
+        result.content_type = 'text/html'
+        result.content = f'<html><head><title>p{number}</title></head><body>{links}</body></html>'
+        result.content_length = len(result.content)
+        return result
+
+@pytest.fixture
+def crawl(tmp_path, monkeypatch):
+    """Запускает сканирование ROOT с поддельным загрузчиком"""
+    monkeypatch.setattr(crawler_controller, 'WebFetcher', FakeFetcher)
+
+    def run(delay=0.0, **options):
+        FakeFetcher.reset(delay)
+        config = CrawlerConfig(
+            request_delay=0,
+            respect_robots_txt=False,
+            loop_lag_threshold=0,
+            db_url=f'sqlite:///{tmp_path}',
+            **{'concurrent_requests': 2, 'max_depth': 50, **options}
+        )
+        controller = CrawlerController(config)
+        started = time.monotonic()
+        asyncio.run(controller.start_crawling(ROOT))
+        return controller, time.monotonic() - started
+
+    return run
+
+def test_max_pages_stops_dispatch(crawl):
+    controller, _ = crawl(max_pages=5, concurrent_requests=3)
+    assert len(FakeFetcher.started) == 5
+    assert len(controller.site_tree.nodes) == 5
+    # Лимит страниц — не исчерпание бюджета: сканирование завершено полностью
+    stats = DataStorage(controller.storage.storage.storage_path).get_crawl_stats(controller.crawl_id)
+    assert stats['status'] == 'completed'
+
+def test_max_duration_stops_dispatch(crawl):
+    controller, elapsed = crawl(delay=0.05, max_duration=0.3, drain_timeout=1.0)
+    assert controller.stop_reason == STOP_MAX_DURATION
+    assert elapsed < 1.0
+    # Две загрузки одновременно по 0.05 с: за 0.3 с — порядка 12 страниц
+    assert 0 < len(FakeFetcher.started) <= 16
+    assert FakeFetcher.cancelled == []
+
+    storage = DataStorage(controller.storage.storage.storage_path)
+    stats = storage.get_crawl_stats(controller.crawl_id)
+    assert stats['status'] == 'partial'
+    assert stats['stop_reason'] == STOP_MAX_DURATION
+    assert stats['frontier_size'] > 0
+
+def test_in_flight_fetches_finish_within_drain_timeout(crawl):
+    controller, _ = crawl(delay=0.2, max_requests=3, drain_timeout=5.0)
+    assert controller.stop_reason == STOP_MAX_REQUESTS
+    # Загрузки, выданные до исчерпания бюджета, дожидаются и сохраняются
+    assert FakeFetcher.cancelled == []
+    assert sorted(FakeFetcher.finished) == sorted(FakeFetcher.started)
+    assert len(controller.site_tree.nodes) == len(FakeFetcher.finished)
+
+def test_fetches_past_drain_timeout_are_cancelled_and_requeued(crawl):
+    controller, elapsed = crawl(delay=30, max_requests=2, drain_timeout=0.2)
+    assert controller.stop_reason == STOP_MAX_REQUESTS
+    assert elapsed < 5
+    assert FakeFetcher.finished == [ROOT]
+    assert FakeFetcher.cancelled
+    assert set(FakeFetcher.cancelled) == set(FakeFetcher.started) - {ROOT}
+
+    frontier = DataStorage(controller.storage.storage.storage_path).get_frontier(controller.crawl_id)
+    assert {entry['url'] for entry in frontier} >= set(FakeFetcher.cancelled)
+
+def test_seed_max_duration_may_be_fractional(tmp_path):
+    seeds_file = tmp_path / 'sites.txt'
+    seeds_file.write_text('https://example.com max_duration=1.5 max_pages=10\n', encoding='utf-8')
+    seed, = load_seeds(str(seeds_file))
+    assert seed.max_duration == 1.5
+    assert seed.max_pages == 10
+
+    seeds_file.write_text('https://example.com max_pages=1.5\n', encoding='utf-8')
+    with pytest.raises(ValueError):
+        load_seeds(str(seeds_file))
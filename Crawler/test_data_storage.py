@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Тесты хранилища сканирований: сводная статистика, сравнение сканирований
+и кэш ID URL.
+
+Запуск: python -m pytest Crawler/test_data_storage.py
+"""
+import sqlite3
+
+from click.testing import CliRunner
+
+from Crawler.cli import cli
+from Crawler.data_storage import DataStorage
+from Crawler.monitor_crawler import check_crawler_status
+from Crawler.site_tree_builder import SiteTree
+
+ROOT = 'https://example.com/'
+
+def make_tree(pages):
+    """Дерево сайта из словаря URL -> поля узла"""
+    tree = SiteTree(ROOT)
+    for url, fields in pages.items():
+        node = tree.root if url == ROOT else tree.add_node(url)
+        for key, value in fields.items():
+            if key == 'title':
+                node.metadata['title'] = value
+            else:
+                setattr(node, key, value)
+    return tree
+
+def save_two_crawls(storage):
+    old = storage.save_tree(make_tree({
+        ROOT: {'status_code': 200, 'title': 'Главная', 'content_hash': 'a'},
+        ROOT + 'same': {'status_code': 200, 'title': 'Та же', 'content_hash': 'b'},
+        ROOT + 'removed': {'status_code': 200, 'title': 'Удалена'},
+        ROOT + 'broken': {'status_code': 200, 'title': 'Сломана'},
+        ROOT + 'renamed': {'status_code': 200, 'title': 'Старый title'},
+        ROOT + 'edited': {'status_code': 200, 'title': 'Правка', 'content_hash': 'c'},
+    }))
+    new = storage.save_tree(make_tree({
+        ROOT: {'status_code': 200, 'title': 'Главная', 'content_hash': 'a'},
+        ROOT + 'same': {'status_code': 200, 'title': 'Та же', 'content_hash': 'b'},
+        ROOT + 'added': {'status_code': 200, 'title': 'Новая'},
+        ROOT + 'broken': {'status_code': 404, 'title': 'Сломана'},
+        ROOT + 'renamed': {'status_code': 200, 'title': 'Новый title'},
+        ROOT + 'edited': {'status_code': 200, 'title': 'Правка', 'content_hash': 'd'},
+    }))
+    return old, new
+
+def save_stats_crawl(storage):
+    return storage.save_tree(make_tree({
+        ROOT: {'status_code': 200, 'content_type': 'text/html', 'content_length': 1000, 'response_time': 0.1},
+        ROOT + 'a': {'status_code': 200, 'content_type': 'text/html', 'content_length': 3000, 'response_time': 0.3},
+        ROOT + 'gone': {'status_code': 404, 'content_type': 'text/html', 'content_length': 100, 'response_time': 0.2},
+        ROOT + 'fail': {'status_code': 503},
+        ROOT + 'timeout': {},
+    }))
+
+def drop_stats(storage, crawl_id):
+    """Сканирование в виде, сохраненном до появления crawl_stats"""
+    with sqlite3.connect(storage.db_path) as conn:
+        conn.execute("DELETE FROM crawl_stats WHERE crawl_id = ?", (crawl_id,))
+
+def test_crawl_stats_written_with_pages(tmp_path):
+    storage = DataStorage(str(tmp_path))
+    crawl_id = save_stats_crawl(storage)
+    
+    stats = storage.get_crawl_stats(crawl_id)
+    assert stats['domain'] == 'example.com'
+    assert stats['total_pages'] == 5
+    assert [stats[f'status_{name}'] for name in ('2xx', '3xx', '4xx', '5xx', 'no_response')] == [2, 0, 1, 1, 1]
+    assert stats['depth_histogram'] == {'0': 1, '1': 4}
+    assert stats['content_types'] == {'text/html': 3, 'unknown': 2}
+    assert stats['total_bytes'] == 4100
+    assert stats['latency_max'] == 0.3
+    assert storage.get_crawl_stats(crawl_id + 1) is None
+
+def test_crawl_stats_rebuilt_for_legacy_crawl(tmp_path):
+    storage = DataStorage(str(tmp_path))
+    crawl_id = save_stats_crawl(storage)
+    expected = storage.get_crawl_stats(crawl_id)
+    drop_stats(storage, crawl_id)
+    
+    rebuilt = storage.get_crawl_stats(crawl_id)
+    assert {key: rebuilt[key] for key in expected if key != 'updated_at'} == \
+        {key: expected[key] for key in expected if key != 'updated_at'}
+
+def test_list_sites(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    storage = DataStorage()
+    save_stats_crawl(storage)
+    last = save_stats_crawl(storage)
+    other = storage.save_tree(SiteTree('https://other.org/'))
+    drop_stats(storage, other)
+    
+    sites = {site['domain']: site for site in storage.list_sites()}
+    assert (sites['example.com']['crawls'], sites['example.com']['crawl_id']) == (2, last)
+    assert (sites['example.com']['status_4xx'], sites['example.com']['status_5xx']) == (1, 1)
+    assert sites['other.org']['status_4xx'] is None
+    
+    result = CliRunner().invoke(cli, ['list-sites'])
+    assert result.exit_code == 0, result.output
+    assert [line.split()[0] for line in result.output.splitlines()[1:]] == ['other.org', 'example.com']
+
+def test_monitor_falls_back_to_pages_without_stats(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    storage = DataStorage()
+    crawl_id = save_stats_crawl(storage)
+    drop_stats(storage, crawl_id)
+    
+    check_crawler_status()
+    output = capsys.readouterr().out
+    assert 'Всего: 5' in output
+    assert 'Успешно: 2' in output
+    assert 'Ошибки: 2' in output
+
+def test_diff_crawls_classifies_changes(tmp_path):
+    storage = DataStorage(str(tmp_path))
+    old, new = save_two_crawls(storage)
+    
+    changes = {row['url']: row['changes'] for row in storage.diff_crawls(old, new)}
+    assert changes == {
+        ROOT + 'added': ['added'],
+        ROOT + 'removed': ['removed'],
+        ROOT + 'broken': ['status'],
+        ROOT + 'renamed': ['title'],
+    }
+    
+    rows = {row['url']: row for row in storage.diff_crawls(old, new, include_content=True)}
+    assert rows[ROOT + 'edited']['changes'] == ['content']
+    assert (rows[ROOT + 'edited']['old_hash'], rows[ROOT + 'edited']['new_hash']) == ('c', 'd')
+    assert (rows[ROOT + 'broken']['old_status'], rows[ROOT + 'broken']['new_status']) == (200, 404)
+    assert rows[ROOT + 'added']['old_status'] is None
+    assert ROOT + 'same' not in rows
+
+def test_get_crawl_ids_before(tmp_path):
+    storage = DataStorage(str(tmp_path))
+    ids = [storage.save_tree(make_tree({ROOT: {'status_code': 200}})) for _ in range(4)]
+    assert storage.get_crawl_ids('example.com', limit=2) == ids[:1:-1]
+    assert storage.get_crawl_ids('example.com', limit=1, before=ids[2]) == [ids[1]]
+    assert storage.get_crawl_ids('example.com', before=ids[0]) == []
+
+def test_cli_diff_new_compares_with_previous_crawl(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    storage = DataStorage()
+    old, new = save_two_crawls(storage)
+    storage.save_tree(make_tree({ROOT: {'status_code': 500}}))
+    
+    # Без --old берется сканирование, предшествующее --new, а не два последних
+    result = CliRunner().invoke(cli, ['diff', 'example.com', '--new', str(new), '--output', 'diff.json'])
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / 'diff.json').read_text(encoding='utf-8').count('"url"') == 4
+    
+    result = CliRunner().invoke(cli, ['diff', 'example.com', '--new', str(old)])
+    assert result.exit_code != 0
+    assert 'минимум два сканирования' in result.output
+
+def test_url_id_cache_is_bounded(tmp_path):
+    storage = DataStorage(str(tmp_path), url_id_cache_size=3)
+    urls = [f'{ROOT}page{i}' for i in range(10)]
+    storage.save_links(1, [(ROOT, url, 'a') for url in urls])
+    assert len(storage._url_ids) == 3
+    
+    # Вытесненные из кэша URL получают прежние ID из справочника, а не новые
+    with sqlite3.connect(storage.db_path) as conn:
+        expected = dict(conn.execute("SELECT url, id FROM urls"))
+        resolved = storage._resolve_url_ids(conn.cursor(), urls + [ROOT])
+    assert resolved == expected
+    assert len(storage._url_ids) == 3
+    
+    storage.save_links(2, [(ROOT, url, 'a') for url in urls])
+    with sqlite3.connect(storage.db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0] == 11
+        assert conn.execute(
+            "SELECT COUNT(DISTINCT target_id) FROM links GROUP BY crawl_id"
+        ).fetchall() == [(10,), (10,)]
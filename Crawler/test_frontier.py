@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Тесты очереди URL: индексированная куча и пересчет приоритета URL в очереди.
+
+Запуск: python -m pytest Crawler/test_frontier.py
+"""
+import asyncio
+import random
+
+from Crawler.frontier import Frontier, ImportanceScorer, IndexedHeap, URLSignals
+from Crawler.url_manager import URLManager
+
+def drain(heap):
+    items = []
+    while len(heap):
+        items.append(heap.pop())
+    return items
+
+def test_heap_pops_by_priority_then_insertion_order():
+    heap = IndexedHeap()
+    for key, priority in [('a', 1), ('b', 3), ('c', 2), ('d', 3)]:
+        heap.push(key, priority)
+    assert drain(heap) == [('b', 3), ('d', 3), ('c', 2), ('a', 1)]
+
+def test_heap_update_moves_key_both_ways():
+    heap = IndexedHeap()
+    for key, priority in [('a', 5), ('b', 4), ('c', 3), ('d', 2)]:
+        heap.push(key, priority)
+    heap.update('d', 10)
+    heap.update('a', 1)
+    # Повторный push обновляет приоритет, а не добавляет дубликат
+    heap.push('c', 0)
+    assert len(heap) == 4
+    assert heap.priority('d') == 10
+    assert drain(heap) == [('d', 10), ('b', 4), ('a', 1), ('c', 0)]
+    assert 'd' not in heap
+
+def test_heap_matches_sorting_under_random_updates():
+    rng = random.Random(7)
+    heap = IndexedHeap()
+    priorities = {}
+    for step in range(2000):
+        key = rng.randrange(200)
+        if key in priorities and rng.random() < 0.2:
+            assert heap.pop()[1] == max(priorities.values())
+            priorities = {k: p for k, p in priorities.items() if k in heap}
+        else:
+            priorities[key] = rng.randrange(50)
+            heap.push(key, priorities[key])
+    assert [priority for _, priority in drain(heap)] == sorted(priorities.values(), reverse=True)
+
+def test_frontier_in_link_raises_queued_url():
+    frontier = Frontier(ImportanceScorer())
+    frontier.push('https://example.com/a', URLSignals(depth=2, in_links=1))
+    frontier.push('https://example.com/b', URLSignals(depth=2, in_links=1))
+    before = frontier.signals['https://example.com/b']
+    score = frontier.add_in_link('https://example.com/b', depth=1, anchor_text='Каталог отелей')
+    assert (before.in_links, before.depth) == (2, 1)
+    assert frontier.pop() == ('https://example.com/b', score)
+    assert frontier.qsize() == 1
+
+def test_url_manager_repeated_links_reorder_queue():
+    async def run():
+        manager = URLManager(scorer=ImportanceScorer())
+        root = 'https://example.com/'
+        await manager.add_url(root)
+        assert await manager.add_url('https://example.com/rare', 1, root)
+        assert await manager.add_url('https://example.com/popular', 1, root)
+        for page in range(3):
+            parent = f'https://example.com/page{page}'
+            assert not await manager.add_url('https://example.com/popular', 2, parent, 'Популярные направления')
+        # Повторная ссылка не сбрасывает меньшую глубину и первого родителя
+        assert manager.url_info['https://example.com/popular'].depth == 1
+        assert manager.url_info['https://example.com/popular'].parent_url == root
+        assert manager.pending_queue.qsize() == 3
+        return [(await manager.get_next_url()).url for _ in range(3)]
+    
+    assert asyncio.run(run()) == ['https://example.com/', 'https://example.com/popular', 'https://example.com/rare']
+
+def test_requeue_keeps_in_links():
+    async def run():
+        manager = URLManager(scorer=ImportanceScorer())
+        root = 'https://example.com/'
+        await manager.add_url(root)
+        await manager.add_url('https://example.com/rare', 1, root)
+        await manager.add_url('https://example.com/popular', 1, root, 'Отели')
+        for page in range(3):
+            await manager.add_url('https://example.com/popular', 1, f'https://example.com/page{page}')
+        assert (await manager.get_next_url()).url == root
+        await manager.mark_completed(root)
+        
+        popular = await manager.get_next_url()
+        score = popular.score
+        # Загрузка прервана (бюджет, отмена): URL возвращается с теми же сигналами
+        manager.requeue(popular.url)
+        signals = manager.pending_queue.signals[popular.url]
+        assert (signals.in_links, signals.anchor_texts) == (4, ['Отели'])
+        assert manager.url_info[popular.url].score == score
+        assert [info.url for info in manager.get_unfinished()] == [popular.url, 'https://example.com/rare']
+        
+        # Обработанный URL больше не хранит сигналы
+        assert (await manager.get_next_url()).url == popular.url
+        await manager.mark_completed(popular.url)
+        assert not manager.pending_queue._taken
+    
+    asyncio.run(run())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Тесты проверки ссылок: повтор HEAD ranged GET-запросом только для серверов
+без поддержки HEAD, без повтора при таймауте и ошибке соединения.
+
+Проверка идет против локального aiohttp-сервера, внешняя сеть не нужна.
+
+Запуск: python -m pytest Crawler/test_link_checker.py
+"""
+import asyncio
+import socket
+from collections import Counter
+
+from aiohttp import web
+
+from Crawler.link_checker import LinkChecker
+
+def free_port():
+    """Порт, на котором сейчас никто не слушает"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def run_checks(urls_by_path, timeout=5):
+    """
+    Запускает локальный сервер и проверяет URL
+
+    :param urls_by_path: Пути на локальном сервере или полные URL
+    :param timeout: Таймаут запроса LinkChecker
+    :return: Пара (результаты по URL, Counter запросов (метод, путь))
+    """
+    requests = Counter()
+
+    async def handler(request):
+        requests[request.method, request.path] += 1
+        if request.path == '/no-head' and request.method == 'HEAD':
+            return web.Response(status=405)
+        if request.path == '/slow':
+            await asyncio.sleep(timeout * 3)
+        if request.path == '/missing':
+            return web.Response(status=404)
+        if request.path == '/moved':
+            raise web.HTTPFound('/ok')
+        return web.Response(text='ok')
+
+    async def run():
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        urls = [url if '://' in url else f'http://127.0.0.1:{port}{url}' for url in urls_by_path]
+        try:
+            async with LinkChecker({'timeout': timeout, 'per_host': 4}) as checker:
+                results = await checker.check_many(urls)
+        finally:
+            await runner.cleanup()
+        return {result.url.split(str(port), 1)[-1]: result for result in results}
+
+    return asyncio.run(run()), requests
+
+def test_head_success_needs_no_get():
+    results, requests = run_checks(['/ok', '/missing', '/moved'])
+    assert results['/ok'].status_code == 200
+    assert results['/ok'].method == 'HEAD'
+    assert results['/missing'].is_broken
+    assert results['/moved'].final_url.endswith('/ok')
+    assert results['/moved'].redirect_chain[0].endswith('/moved')
+    assert not any(method == 'GET' for method, _ in requests)
+
+def test_head_not_allowed_falls_back_to_get():
+    results, requests = run_checks(['/no-head'])
+    result = results['/no-head']
+    assert result.method == 'GET'
+    assert result.status_code == 200
+    assert not result.is_broken
+    assert requests == Counter({('HEAD', '/no-head'): 1, ('GET', '/no-head'): 1})
+
+def test_timeout_is_not_retried_with_get():
+    results, requests = run_checks(['/slow'], timeout=0.2)
+    result = results['/slow']
+    assert result.error == 'timeout'
+    assert result.method == 'HEAD'
+    assert requests == Counter({('HEAD', '/slow'): 1})
+
+def test_connection_error_is_not_retried_with_get():
+    url = f'http://127.0.0.1:{free_port()}/down'
+    results, _ = run_checks([url])
+    result = results[url]
+    assert result.is_broken
+    assert result.status_code is None
+    assert result.method == 'HEAD'
+
+def test_duplicates_checked_once():
+    results, requests = run_checks(['/ok', '/ok', '/missing'])
+    assert len(results) == 2
+    assert requests[('HEAD', '/ok')] == 1
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Тесты аналитики графа ссылок на небольшом графе: in-degree, страницы-сироты,
+глубина клика, сильно связные компоненты.
+
+Нужны numpy и scipy (pip install 'web-crawler[analytics]'), без них тесты пропускаются.
+
+Запуск: python -m pytest Crawler/test_link_graph.py
+"""
+import sqlite3
+
+import pytest
+
+pytest.importorskip('scipy')
+
+from Crawler.data_storage import DataStorage
+from Crawler.link_graph import LinkGraphAnalyzer
+from Crawler.site_tree_builder import SiteTree
+
+ROOT = 'https://example.com/'
+A, B, C, D = (ROOT + name for name in 'abcd')
+ORPHAN = ROOT + 'orphan'
+EXTERNAL = 'https://other.org/'
+
+#  ROOT → a → c → d → a (цикл a, c, d), ROOT → b → c, c → внешний URL;
+#  orphan сохранена как страница, но ссылок на нее нет
+EDGES = [
+    (ROOT, A, 'a'), (ROOT, B, 'a'), (A, C, 'a'), (B, C, 'a'), (C, D, 'a'), (D, A, 'a'),
+    (C, EXTERNAL, 'a'),
+    # Петля и повторная ссылка не учитываются
+    (A, A, 'a'), (ROOT, A, 'a'),
+]
+
+@pytest.fixture
+def graph(tmp_path):
+    """Сохраненное сканирование с графом EDGES и сводка анализа"""
+    storage = DataStorage(str(tmp_path))
+    tree = SiteTree(ROOT)
+    for url, depth in [(A, 1), (B, 1), (C, 2), (D, 3), (ORPHAN, 1)]:
+        tree.add_node(url).depth = depth
+    crawl_id = storage.save_tree(tree)
+    storage.save_links(crawl_id, EDGES)
+
+    metrics = LinkGraphAnalyzer(storage).analyze(crawl_id, top=3)
+    with sqlite3.connect(storage.db_path) as conn:
+        rows = conn.execute("""
+            SELECT u.url, p.in_degree, p.click_depth, p.scc_id, p.pagerank
+            FROM pages p JOIN urls u ON u.id = p.url_id
+            WHERE p.crawl_id = ?
+        """, (crawl_id,)).fetchall()
+    return metrics, {url: row for url, *row in rows}
+
+def test_graph_summary(graph):
+    metrics, _ = graph
+    assert metrics.pages == 6
+    assert metrics.nodes == 7  # страницы и внешний URL
+    assert metrics.edges == 7
+    assert metrics.orphan_pages == 1
+    assert metrics.unreachable_pages == 1
+    assert metrics.largest_scc == 3
+
+def test_in_degree(graph):
+    _, pages = graph
+    assert {url: row[0] for url, row in pages.items()} == {
+        ROOT: 0, A: 2, B: 1, C: 2, D: 1, ORPHAN: 0,
+    }
+
+def test_click_depth(graph):
+    _, pages = graph
+    assert {url: row[1] for url, row in pages.items()} == {
+        ROOT: 0, A: 1, B: 1, C: 2, D: 3, ORPHAN: None,
+    }
+
+def test_cycle_is_one_component(graph):
+    _, pages = graph
+    assert pages[A][2] == pages[C][2] == pages[D][2]
+    assert len({pages[url][2] for url in (ROOT, A, B, ORPHAN)}) == 4
+
+def test_pagerank(graph):
+    metrics, pages = graph
+    assert sum(row[3] for row in pages.values()) < 1.0  # часть ранга у внешнего URL
+    # Больше всего входящих ссылок в цикле a → c → d → a
+    assert {url for url, _, _ in metrics.top_pages} == {A, C, D}
+    assert metrics.top_pages[0][1] >= metrics.top_pages[-1][1]
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Тесты монитора задержки event loop: ограниченное окно замеров и сводка
+по всему сканированию.
+
+Запуск: python -m pytest Crawler/test_loop_monitor.py
+"""
+import asyncio
+import time
+
+from Crawler.utils.loop_monitor import LoopLagMonitor
+
+def test_samples_window_is_bounded():
+    monitor = LoopLagMonitor(threshold=0.5, max_samples=100)
+    for i in range(1000):
+        monitor.add_sample(0.9 if i == 10 else i / 10000)
+    assert len(monitor.samples) == 100
+    
+    stats = monitor.get_stats()
+    # Число, среднее и максимум — по всем замерам, перцентили — по последним
+    assert stats['samples'] == 1000
+    assert stats['max'] == 0.9
+    assert stats['over_threshold'] == 1
+    assert abs(stats['mean'] - (sum(i / 10000 for i in range(1000)) - 0.001 + 0.9) / 1000) < 1e-9
+    assert stats['p50'] == 0.095
+
+def test_monitor_measures_blocked_loop():
+    async def run():
+        monitor = LoopLagMonitor(interval=0.01, threshold=0.05)
+        monitor.start()
+        await asyncio.sleep(0.03)
+        # Синхронная работа блокирует loop
+        time.sleep(0.1)
+        await asyncio.sleep(0.03)
+        await monitor.stop()
+        return monitor.get_stats()
+    
+    stats = asyncio.run(run())
+    assert stats['samples'] >= 2
+    assert stats['max'] >= 0.05
+    assert stats['over_threshold'] >= 1
+
+def test_no_samples():
+    assert LoopLagMonitor().get_stats() == {'samples': 0}
@@ -1,9 +1,10 @@
 import asyncio
-from typing import Dict, Optional, Set
+from typing import Dict, List, Optional, Set
 from enum import IntEnum
 from dataclasses import dataclass
 from urllib.parse import urlparse
 from .utils.url_normalizer import URLNormalizer
+from .frontier import Frontier, Scorer, URLSignals
 from .exceptions import InvalidURL, MaxPagesExceeded
 
 class URLPriority(IntEnum):
@@ -21,13 +22,14 @@ class URLInfo:
     parent_url: Optional[str] = None
     retry_count: int = 0
     last_error: Optional[str] = None
+    score: float = 0.0
 
 class URLManager:
     """Класс для управления очередью URL и отслеживания состояния"""
     
-    def __init__(self, max_pages: int = 1000):
+    def __init__(self, max_pages: int = 1000, scorer: Optional[Scorer] = None):
         self.max_pages = max_pages
-        self.pending_queue = asyncio.PriorityQueue()
+        self.pending_queue = Frontier(scorer)
         self.processing: Set[str] = set()
         self.completed: Set[str] = set()
         self.failed: Set[str] = set()
@@ -35,13 +37,21 @@ class URLManager:
         self.lock = asyncio.Lock()
         self.total_processed = 0
         
-    async def add_url(self, url: str, depth: int = 0, parent_url: str = None) -> bool:
+    async def add_url(self, url: str, depth: int = 0, parent_url: str = None,
+                      anchor_text: str = None, sitemap_priority: float = None,
+                      lastmod: float = None) -> bool:
         """
         Добавляет URL в очередь на обработку
         
+        Если URL уже ждет в очереди, новая ссылка на него учитывается
+        как входящая, и его место в очереди пересчитывается.
+        
         :param url: URL для добавления
         :param depth: Глубина вложенности URL
         :param parent_url: Родительский URL
+        :param anchor_text: Текст ссылки, по которой найден URL
+        :param sitemap_priority: priority из sitemap.xml (0..1)
+        :param lastmod: lastmod из sitemap.xml (Unix timestamp)
         :return: True если URL добавлен, False если уже существует
         """
         if not URLNormalizer.is_valid_url(url):
@@ -54,7 +64,20 @@ class URLManager:
             if self.total_processed >= self.max_pages:
                 raise MaxPagesExceeded(f"Достигнут лимит в {self.max_pages} страниц")
                 
-            # Проверка, что URL еще не был обработан или не в очереди
+            # URL уже в очереди: обновляем его сигналы и приоритет
+            if normalized_url in self.pending_queue:
+                if sitemap_priority is not None or lastmod is not None:
+                    score = self.pending_queue.update_signals(normalized_url, sitemap_priority, lastmod)
+                else:
+                    score = self.pending_queue.add_in_link(normalized_url, depth, anchor_text)
+                    url_info = self.url_info[normalized_url]
+                    if depth < url_info.depth:
+                        url_info.depth = depth
+                        url_info.parent_url = parent_url
+                self.url_info[normalized_url].score = score
+                return False
+                
+            # Проверка, что URL еще не был обработан
             if (normalized_url in self.url_info or 
                 normalized_url in self.processing or 
                 normalized_url in self.completed or 
@@ -66,6 +89,14 @@ class URLManager:
                 URLPriority.MEDIUM if depth < 3 else URLPriority.LOW
             )
             
+            signals = URLSignals(
+                depth=depth,
+                in_links=1 if parent_url else 0,
+                sitemap_priority=sitemap_priority,
+                lastmod=lastmod
+            )
+            signals.add_anchor(anchor_text)
+            
             # Добавление в очередь
             url_info = URLInfo(
                 url=normalized_url,
@@ -73,8 +104,7 @@ class URLManager:
                 depth=depth,
                 parent_url=parent_url
             )
-            
-            await self.pending_queue.put((priority.value, normalized_url))
+            url_info.score = self.pending_queue.push(normalized_url, signals)
             self.url_info[normalized_url] = url_info
             return True
             
@@ -88,7 +118,7 @@ class URLManager:
             if self.pending_queue.empty():
                 return None
                 
-            _, url = await self.pending_queue.get()
+            url, _ = self.pending_queue.pop()
             url_info = self.url_info[url]
             self.processing.add(url)
             return url_info
@@ -97,6 +127,7 @@ class URLManager:
         """Помечает URL как успешно обработанный"""
         async with self.lock:
             self.processing.discard(url)
+            self.pending_queue.release(url)
             self.completed.add(url)
             self.total_processed += 1
             
@@ -104,6 +135,7 @@ class URLManager:
         """Помечает URL как обработанный с ошибкой"""
         async with self.lock:
             self.processing.discard(url)
+            self.pending_queue.release(url)
             self.failed.add(url)
             self.total_processed += 1
             
@@ -111,6 +143,30 @@ class URLManager:
                 self.url_info[url].last_error = error
                 self.url_info[url].retry_count += 1
                 
+    def requeue(self, url: str) -> None:
+        """
+        Возвращает в очередь URL, выданный загрузчику, но не загруженный
+        
+        Метод синхронный и не ждет блокировку: его можно вызывать из
+        обработчика отмены задачи, а между await он выполняется атомарно.
+        Входящие ссылки, тексты ссылок и данные sitemap сохраняются.
+        """
+        if url not in self.processing:
+            return
+        self.processing.discard(url)
+        self.url_info[url].score = self.pending_queue.requeue(url)
+        
+    def get_unfinished(self) -> List[URLInfo]:
+        """
+        Возвращает необработанные URL: сначала те, что были в работе,
+        затем очередь в порядке убывания оценки
+        
+        :return: Список URLInfo
+        """
+        pending = [self.url_info[url] for url in self.pending_queue.signals]
+        pending.sort(key=lambda info: -info.score)
+        return [self.url_info[url] for url in self.processing] + pending
+        
     def get_stats(self) -> Dict[str, int]:
         """Возвращает статистику обработки URL"""
         return {
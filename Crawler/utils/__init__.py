@@ -1,5 +1,22 @@
-from .url_normalizer import URLNormalizer
-from .rate_limiter import RateLimiter
-from .robots_checker import RobotsChecker
+import importlib
 
-__all__ = ['URLNormalizer', 'RateLimiter', 'RobotsChecker']
\ No newline at end of file
+# Модули подгружаются при первом обращении (PEP 562): импорт
+# utils.url_normalizer не должен тянуть aiohttp через robots_checker
+_LAZY_ATTRS = {
+    'URLNormalizer': '.url_normalizer',
+    'RateLimiter': '.rate_limiter',
+    'RobotsChecker': '.robots_checker',
+}
+
+__all__ = ['URLNormalizer', 'RateLimiter', 'RobotsChecker']
+
+def __getattr__(name):
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,58 @@
+import asyncio
+import logging
+import sys
+from typing import Awaitable, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LOOP_CHOICES = ['auto', 'asyncio', 'uvloop']
+
+def get_loop_factory(name: str = 'auto') -> Tuple[Optional[Callable[[], asyncio.AbstractEventLoop]], str]:
+    """
+    Выбирает реализацию event loop
+
+    :param name: 'asyncio', 'uvloop' или 'auto' (uvloop, если установлен)
+    :return: (фабрика loop или None для стандартного, фактическое имя реализации)
+    :raises ImportError: Если запрошен uvloop, но он не установлен
+    """
+    if name not in LOOP_CHOICES:
+        raise ValueError(f"Unknown event loop: {name}")
+    if name == 'asyncio':
+        return None, 'asyncio'
+    try:
+        import uvloop
+    except ImportError:
+        if name == 'uvloop':
+            raise ImportError("uvloop не установлен: pip install uvloop") from None
+        return None, 'asyncio'
+    return uvloop.new_event_loop, 'uvloop'
+
+def run(coro: Awaitable, loop: str = 'auto'):
+    """
+    Аналог asyncio.run() с выбором реализации event loop
+
+    :param coro: Корутина для выполнения
+    :param loop: 'asyncio', 'uvloop' или 'auto'
+    :return: Результат корутины
+    """
+    try:
+        factory, name = get_loop_factory(loop)
+    except (ImportError, ValueError):
+        coro.close()
+        raise
+    logger.info("Event loop: %s", name)
+
+    if factory is None:
+        return asyncio.run(coro)
+    if sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=factory) as runner:
+            return runner.run(coro)
+
+    # До Python 3.11 нет asyncio.Runner: подменяем политику на время запуска
+    import uvloop
+    previous = asyncio.get_event_loop_policy()
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    try:
+        return asyncio.run(coro)
+    finally:
+        asyncio.set_event_loop_policy(previous)
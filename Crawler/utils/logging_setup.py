@@ -0,0 +1,128 @@
+import atexit
+import json
+import logging
+import queue
+import sys
+import zlib
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Optional
+
+DEFAULT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Атрибуты LogRecord, которые не считаются пользовательскими полями extra
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """
+    Форматирует запись в одну строку JSON.
+
+    Поля, переданные через extra (url, status, elapsed и т.п.),
+    попадают в объект как есть.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает только часть событий по отдельным URL.
+
+    Решение принимается по crc32 от поля extra `url`, поэтому для одного URL
+    сохраняются либо все его события, либо ни одного. Предупреждения, ошибки
+    и записи без URL (сводки, статистика) проходят всегда.
+    """
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+        self._threshold = int(max(0.0, min(rate, 1.0)) * 0xFFFFFFFF)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate >= 1.0:
+            return True
+        url = getattr(record, 'url', None)
+        if url is None:
+            return True
+        return zlib.crc32(url.encode('utf-8', 'replace')) <= self._threshold
+
+class LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler, который не форматирует запись в вызывающем потоке.
+
+    Стандартный prepare() подставляет аргументы в сообщение и форматирует
+    traceback до постановки в очередь. Здесь очередь живет в том же процессе,
+    поэтому запись передается как есть, а вся работа по форматированию
+    и записи выполняется в потоке QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+_listener: Optional[QueueListener] = None
+
+def setup_logging(level: str = 'INFO', log_file: Optional[str] = None,
+                  log_format: str = 'text', sample_rate: float = 1.0) -> QueueListener:
+    """
+    Настраивает логирование краулера через очередь и фоновый поток
+
+    :param level: Уровень логирования
+    :param log_file: Файл для записи логов (по умолчанию stderr)
+    :param log_format: 'text' или 'json'
+    :param sample_rate: Доля URL, события по которым попадают в лог (0..1)
+    :return: Запущенный QueueListener
+    """
+    shutdown_logging()
+
+    if log_format == 'json':
+        formatter = JsonFormatter()
+    elif log_format == 'text':
+        formatter = logging.Formatter(DEFAULT_FORMAT)
+    else:
+        raise ValueError(f"Unknown log format: {log_format}")
+
+    handlers: List[logging.Handler] = [
+        logging.FileHandler(log_file, encoding='utf-8') if log_file
+        else logging.StreamHandler(sys.stderr)
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = LazyQueueHandler(queue.SimpleQueue())
+    # Фильтр стоит до очереди: отброшенные записи не стоят ничего, кроме проверки
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    global _listener
+    _listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def shutdown_logging() -> None:
+    """Дописывает накопленные записи и останавливает фоновый поток"""
+    global _listener
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, LazyQueueHandler):
+            root.removeHandler(handler)
+
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+atexit.register(shutdown_logging)
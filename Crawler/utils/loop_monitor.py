@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import re
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class LoopActivity:
+    """
+    Текущая синхронная работа в event loop.
+
+    Стадии конвейера оборачивают синхронные участки (парсинг, обновление
+    дерева, запись в SQLite) в track(stage, url). Участок дольше threshold
+    сразу попадает в лог с названием стадии и URL — это и есть callback,
+    который блокировал loop. Участки не вкладываются друг в друга:
+    в однопоточном loop синхронный код не прерывается.
+    """
+
+    def __init__(self, threshold: float = 0.1):
+        """
+        :param threshold: Длительность участка, начиная с которой пишется предупреждение
+        """
+        self.threshold = threshold
+        self.stage: Optional[str] = None
+        self.url: Optional[str] = None
+        self.slow_count = 0
+        self.slow_sections: Dict[str, Dict] = {}
+        self._started = 0.0
+
+    def track(self, stage: str, url: Optional[str] = None) -> 'LoopActivity':
+        """Отмечает начало синхронного участка; используется как контекстный менеджер"""
+        self.stage = stage
+        self.url = url
+        return self
+
+    def __enter__(self) -> 'LoopActivity':
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        duration = time.perf_counter() - self._started
+        if duration >= self.threshold:
+            self._record_slow(duration)
+        self.stage = None
+        self.url = None
+
+    def _record_slow(self, duration: float) -> None:
+        self.slow_count += 1
+        entry = self.slow_sections.setdefault(self.stage, {'count': 0, 'total': 0.0, 'max': 0.0, 'url': None})
+        entry['count'] += 1
+        entry['total'] += duration
+        if duration > entry['max']:
+            entry['max'] = duration
+            entry['url'] = self.url
+        logger.warning("Стадия %s блокировала event loop %.3f с: %s", self.stage, duration, self.url,
+                       extra={'url': self.url, 'stage': self.stage})
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Медленные участки по стадиям: число, суммарное и максимальное время, самый медленный URL"""
+        return {stage: dict(entry) for stage, entry in self.slow_sections.items()}
+
+class LoopLagMonitor:
+    """
+    Измеряет задержку event loop.
+
+    Фоновая задача засыпает на interval секунд и замеряет, насколько позже
+    она проснулась. Задержка означает, что loop был занят синхронной работой
+    (парсинг, SQLite, логирование) и не обслуживал сетевые операции.
+
+    Число замеров, среднее и максимум считаются по всему сканированию,
+    перцентили — по последним max_samples замерам.
+    """
+
+    def __init__(self, interval: float = 0.05, threshold: float = 0.1,
+                 activity: Optional[LoopActivity] = None, max_samples: int = 10000):
+        """
+        :param interval: Период измерения в секундах
+        :param threshold: Задержка, начиная с которой замер считается проблемным
+        :param activity: Отслеживаемые участки стадий; если задано, задержки вне
+                         этих участков пишутся в лог как предупреждения
+        :param max_samples: Сколько последних замеров хранить для перцентилей
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.activity = activity
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.over_threshold = 0
+        self._task: Optional[asyncio.Task] = None
+        self._reported_slow = 0
+
+    def start(self) -> None:
+        """Запускает измерения в текущем event loop"""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает измерения"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.add_sample(max(0.0, loop.time() - started - self.interval))
+
+    def add_sample(self, lag: float) -> None:
+        """Учитывает один замер задержки"""
+        self.samples.append(lag)
+        self.count += 1
+        self.total += lag
+        self.max = max(self.max, lag)
+        if lag >= self.threshold:
+            self.over_threshold += 1
+            self.on_lag(lag)
+
+    def on_lag(self, lag: float) -> None:
+        """Вызывается для каждого замера выше порога"""
+        if self.activity is None:
+            logger.debug("Задержка event loop %.3f с", lag)
+            return
+        if self.activity.slow_count != self._reported_slow:
+            # Блокировку уже записал медленный участок стадии
+            self._reported_slow = self.activity.slow_count
+            return
+        # Задержку дали неотслеживаемый код или много коротких участков подряд
+        logger.warning("Задержка event loop %.3f с, ни один участок стадий не превысил порог", lag)
+
+    def get_stats(self) -> Dict:
+        """Сводка по задержкам: среднее, перцентили, максимум"""
+        samples = sorted(self.samples)
+        if not self.count:
+            return {'samples': 0}
+
+        def percentile(q: float) -> float:
+            return samples[min(len(samples) - 1, int(q / 100 * len(samples)))]
+
+        return {
+            'samples': self.count,
+            'interval': self.interval,
+            'threshold': self.threshold,
+            'mean': self.total / self.count,
+            'p50': percentile(50),
+            'p95': percentile(95),
+            'p99': percentile(99),
+            'max': self.max,
+            'over_threshold': self.over_threshold,
+        }
+
+class SlowCallbackCollector(logging.Handler):
+    """
+    Собирает предупреждения asyncio о медленных callback'ах.
+
+    В отладочном режиме loop пишет в логгер asyncio сообщения вида
+    «Executing <Task ...> took 0.250 seconds». Обработчик группирует их
+    по описанию callback'а без адресов объектов.
+    """
+
+    MESSAGE = re.compile(r'Executing (?P<handle>.*) took (?P<seconds>[\d.]+) seconds', re.DOTALL)
+    NOISE = re.compile(r' at 0x[0-9a-f]+| created at \S+| wait_for=<[^>]*>|cb=\[[^\]]*\]')
+
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+        self.callbacks: Dict[str, Dict] = {}
+
+    def emit(self, record: logging.LogRecord) -> None:
+        match = self.MESSAGE.match(record.getMessage())
+        if not match:
+            return
+        handle = self.NOISE.sub('', match.group('handle'))[:300]
+        seconds = float(match.group('seconds'))
+        entry = self.callbacks.setdefault(handle, {'count': 0, 'total': 0.0, 'max': 0.0})
+        entry['count'] += 1
+        entry['total'] += seconds
+        entry['max'] = max(entry['max'], seconds)
+
+    def get_stats(self, top: int = 20) -> List[Dict]:
+        """Самые затратные callback'и по суммарному времени"""
+        ranked = sorted(self.callbacks.items(), key=lambda item: -item[1]['total'])
+        return [dict(callback=handle, **entry) for handle, entry in ranked[:top]]
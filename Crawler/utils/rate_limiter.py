@@ -17,7 +17,9 @@ class RateLimiter:
         """
         self.delay = delay
         self.domain_timers: Dict[str, float] = defaultdict(float)
-        self.lock = asyncio.Lock()
+        # Отдельная блокировка на домен: ожидание одного хоста
+        # не задерживает запросы к другим
+        self.locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
 
     async def wait_if_needed(self, domain: str) -> None:
         """
@@ -25,7 +27,7 @@ class RateLimiter:
         
         :param domain: Домен, к которому планируется запрос
         """
-        async with self.lock:
+        async with self.locks[domain]:
             last_request = self.domain_timers.get(domain, 0)
             elapsed = time.time() - last_request
             wait_time = max(0, self.delay - elapsed)
@@ -35,6 +37,17 @@ class RateLimiter:
                 
             self.domain_timers[domain] = time.time()
 
+    def is_ready(self, domain: str) -> bool:
+        """
+        Проверяет, можно ли отправить запрос к домену без ожидания
+        
+        :param domain: Домен для проверки
+        :return: True если задержка для домена уже истекла
+        """
+        if self.locks[domain].locked():
+            return False
+        return time.time() - self.domain_timers.get(domain, 0) >= self.delay
+
     def update_delay(self, new_delay: float) -> None:
         """
         Обновляет задержку между запросами
@@ -54,4 +67,5 @@ class RateLimiter:
 
     def clear(self) -> None:
         """Очищает историю запросов"""
-        self.domain_timers.clear()
\ No newline at end of file
+        self.domain_timers.clear()
+        self.locks.clear()
\ No newline at end of file
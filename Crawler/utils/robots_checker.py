@@ -2,6 +2,7 @@ from urllib.parse import urlparse
 from urllib.robotparser import RobotFileParser
 import asyncio
 import aiohttp
+from collections import defaultdict
 from typing import Dict, Optional
 from ..exceptions import RobotsTxtDisallowed
 
@@ -11,9 +12,16 @@ class RobotsChecker:
     Реализует кэширование и асинхронную загрузку robots.txt
     """
 
-    def __init__(self):
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
+        """
+        :param session: Общая HTTP-сессия; если не задана, для каждой
+                        загрузки robots.txt создается временная сессия
+        """
+        self.session = session
         self.robots_cache: Dict[str, RobotFileParser] = {}
-        self.lock = asyncio.Lock()
+        # Блокировка на домен: медленный robots.txt одного сайта
+        # не останавливает проверки для остальных
+        self.locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
 
     async def can_fetch(self, url: str, user_agent: str) -> bool:
         """
@@ -27,12 +35,13 @@ class RobotsChecker:
         if not domain:
             return False
 
-        async with self.lock:
-            if domain not in self.robots_cache:
-                await self._load_robots_txt(domain, url, user_agent)
+        if domain not in self.robots_cache:
+            async with self.locks[domain]:
+                if domain not in self.robots_cache:
+                    await self._load_robots_txt(domain, url, user_agent)
 
-            rp = self.robots_cache.get(domain)
-            return rp.can_fetch(user_agent, url) if rp else True
+        rp = self.robots_cache.get(domain)
+        return rp.can_fetch(user_agent, url) if rp else True
 
     async def _load_robots_txt(self, domain: str, base_url: str, user_agent: str) -> None:
         """
@@ -45,18 +54,27 @@ class RobotsChecker:
         robots_url = f"{urlparse(base_url).scheme}://{domain}/robots.txt"
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(robots_url, headers={'User-Agent': user_agent}) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        rp = RobotFileParser()
-                        rp.parse(content.splitlines())
-                        self.robots_cache[domain] = rp
-                    else:
-                        self.robots_cache[domain] = None
+            if self.session is not None and not self.session.closed:
+                await self._fetch_robots_txt(self.session, domain, robots_url, user_agent)
+            else:
+                async with aiohttp.ClientSession() as session:
+                    await self._fetch_robots_txt(session, domain, robots_url, user_agent)
         except Exception:
             self.robots_cache[domain] = None
 
+    async def _fetch_robots_txt(self, session: aiohttp.ClientSession, domain: str,
+                                robots_url: str, user_agent: str) -> None:
+        """Загружает robots.txt через указанную сессию и кладет его в кэш"""
+        async with session.get(robots_url, headers={'User-Agent': user_agent}) as response:
+            if response.status == 200:
+                content = await response.text()
+                rp = RobotFileParser()
+                rp.parse(content.splitlines())
+                self.robots_cache[domain] = rp
+            else:
+                self.robots_cache[domain] = None
+
     def clear_cache(self) -> None:
         """Очищает кэш robots.txt"""
-        self.robots_cache.clear()
\ No newline at end of file
+        self.robots_cache.clear()
+        self.locks.clear()
\ No newline at end of file
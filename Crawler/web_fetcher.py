@@ -1,13 +1,12 @@
 import aiohttp
 import asyncio
+import hashlib
 import logging
 from typing import Dict, Optional
 from urllib.parse import urlparse
 from .exceptions import FetchError, RobotsTxtDisallowed
 from .utils import RateLimiter, RobotsChecker
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class FetchResult:
@@ -18,6 +17,8 @@ class FetchResult:
         self.status_code: Optional[int] = None
         self.content: Optional[str] = None
         self.content_type: Optional[str] = None
+        self.content_length: int = 0
+        self.content_hash: Optional[str] = None
         self.headers: Dict[str, str] = {}
         self.error: Optional[str] = None
         self.redirected_from: Optional[str] = None
@@ -35,10 +36,17 @@ class WebFetcher:
     async def __aenter__(self):
         """Инициализация HTTP-сессии"""
         timeout = aiohttp.ClientTimeout(total=self.config.get('timeout', 30))
+        connector = aiohttp.TCPConnector(
+            limit=self.config.get('connection_limit', 100),
+            ttl_dns_cache=300
+        )
         self.session = aiohttp.ClientSession(
+            connector=connector,
             timeout=timeout,
             headers={'User-Agent': self.config.get('user_agent')}
         )
+        # robots.txt загружается через тот же пул соединений
+        self.robots_checker.session = self.session
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -54,55 +62,62 @@ class WebFetcher:
         :return: Объект FetchResult с результатами
         """
         result = FetchResult(url)
-        logger.info(f"Начинаем загрузку: {url}")
+        logger.debug("Начинаем загрузку: %s", url, extra={'url': url})
         
         if not urlparse(url).scheme:
             url = 'https://' + url
-            logger.info(f"Добавлена схема https: {url}")
+            logger.debug("Добавлена схема https: %s", url, extra={'url': url})
             
         # Проверка robots.txt
         if self.config.get('respect_robots_txt', True):
-            logger.info(f"Проверяем robots.txt для {url}")
+            logger.debug("Проверяем robots.txt для %s", url, extra={'url': url})
             can_fetch = await self.robots_checker.can_fetch(url, self.config.get('user_agent'))
             if not can_fetch:
-                logger.warning(f"URL {url} запрещен в robots.txt")
+                logger.warning("URL %s запрещен в robots.txt", url, extra={'url': url})
                 raise RobotsTxtDisallowed(f"URL {url} запрещен в robots.txt")
-            logger.info(f"robots.txt разрешает сканирование {url}")
+            logger.debug("robots.txt разрешает сканирование %s", url, extra={'url': url})
                 
         try:
             # Ожидание соблюдения rate limit
-            domain = urlparse(url).netloc
-            logger.info(f"Применяем rate limiting для домена {domain}")
+            domain = urlparse(url).netloc.lower()
+            logger.debug("Применяем rate limiting для домена %s", domain, extra={'url': url})
             await self.rate_limiter.wait_if_needed(domain)
             
             start_time = asyncio.get_event_loop().time()
-            logger.info(f"Отправляем HTTP запрос к {url}")
+            logger.debug("Отправляем HTTP запрос к %s", url, extra={'url': url})
             
             async with self.session.get(url, allow_redirects=self.config.get('follow_redirects', True)) as response:
                 result.status_code = response.status
                 result.content_type = response.headers.get('Content-Type')
                 result.headers = dict(response.headers)
                 
-                logger.info(f"Получен ответ {response.status} для {url}, Content-Type: {result.content_type}")
+                logger.debug("Получен ответ %s для %s, Content-Type: %s", response.status, url, result.content_type,
+                             extra={'url': url, 'status': response.status})
                 
                 if response.history:
                     result.redirected_from = str(response.history[0].url)
-                    logger.info(f"Редирект с {result.redirected_from} на {url}")
+                    logger.debug("Редирект с %s на %s", result.redirected_from, url, extra={'url': url})
                     
                 # Загружаем только текстовый контент
                 if 'text/html' in (result.content_type or ''):
-                    result.content = await response.text()
-                    logger.info(f"Загружен HTML контент для {url}, размер: {len(result.content)} символов")
+                    body = await response.read()
+                    result.content_length = len(body)
+                    result.content_hash = hashlib.sha1(body).hexdigest()
+                    result.content = body.decode(response.get_encoding(), errors='replace')
+                    logger.debug("Загружен HTML контент для %s, размер: %d символов", url, len(result.content),
+                                 extra={'url': url})
                 else:
                     result.content = None
-                    logger.info(f"Пропускаем не-HTML контент для {url}")
+                    result.content_length = response.content_length or 0
+                    logger.debug("Пропускаем не-HTML контент для %s", url, extra={'url': url})
                     
             result.response_time = asyncio.get_event_loop().time() - start_time
-            logger.info(f"Загрузка {url} завершена за {result.response_time:.2f} сек")
+            logger.info("Загрузка %s завершена за %.2f сек", url, result.response_time,
+                        extra={'url': url, 'status': result.status_code, 'elapsed': result.response_time})
             
         except Exception as e:
             result.error = str(e)
-            logger.error(f"Ошибка при загрузке {url}: {e}")
+            logger.error("Ошибка при загрузке %s: %s", url, e, extra={'url': url})
             raise FetchError(f"Ошибка при загрузке {url}: {e}") from e
             
         return result
\ No newline at end of file
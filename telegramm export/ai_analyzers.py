@@ -6,6 +6,27 @@ from config import AISettings
 
 logger = logging.getLogger(__name__)
 
+def _api_error(status: int, error: str, headers) -> Dict[str, Any]:
+    """Ответ об ошибке API с кодом статуса и Retry-After для повторов"""
+    try:
+        retry_after = float(headers.get("Retry-After")) if headers.get("Retry-After") else None
+    except ValueError:
+        retry_after = None
+    return {
+        "status": "error",
+        "error": f"API error: {status} - {error}",
+        "status_code": status,
+        "retry_after": retry_after
+    }
+
+def _exception_error(e: Exception) -> Dict[str, Any]:
+    """Ответ об исключении; сетевые ошибки и таймауты можно повторить"""
+    return {
+        "status": "error",
+        "error": str(e),
+        "retryable": isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError))
+    }
+
 class ElizaAnalyzer:
     """Анализатор контента с использованием Eliza API"""
     
@@ -16,7 +37,7 @@ class ElizaAnalyzer:
         self.temperature = temperature
         self.session = aiohttp.ClientSession()
         
-    async def analyze_content(self, content: str, prompt: str) -> Dict[str, Any]:
+    async def analyze_content(self, content: str, prompt: str, max_tokens: int = None) -> Dict[str, Any]:
         """Анализ контента через Eliza API"""
         try:
             url = f"{self.base_url}/openai/v1/chat/completions"
@@ -41,7 +62,7 @@ class ElizaAnalyzer:
                     }
                 ],
                 "temperature": self.temperature,
-                "max_tokens": 1000
+                "max_tokens": max_tokens or AISettings.ELIZA['max_tokens']
             }
             
             async with self.session.post(url, json=payload, headers=headers) as response:
@@ -60,17 +81,11 @@ class ElizaAnalyzer:
                     }
                 else:
                     error = await response.text()
-                    return {
-                        "status": "error",
-                        "error": f"API error: {response.status} - {error}"
-                    }
+                    return _api_error(response.status, error, response.headers)
                     
         except Exception as e:
             logger.error(f"Eliza API error: {str(e)}")
-            return {
-                "status": "error",
-                "error": str(e)
-            }
+            return _exception_error(e)
             
     async def close(self):
         """Явное закрытие сессии"""
@@ -116,17 +131,11 @@ class ZelibobaAnalyzer:
                     }
                 else:
                     error = await response.text()
-                    return {
-                        "status": "error",
-                        "error": f"API error: {response.status} - {error}"
-                    }
+                    return _api_error(response.status, error, response.headers)
                     
         except Exception as e:
             logger.error(f"Zeliboba API error: {str(e)}")
-            return {
-                "status": "error",
-                "error": str(e)
-            }
+            return _exception_error(e)
             
     async def __del__(self):
         await self.session.close()
\ No newline at end of file
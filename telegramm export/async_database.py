@@ -0,0 +1,119 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
+
+from config import DATABASE_CONFIG, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE
+from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+
+def _fetchall(db, query, params=None):
+    db.cursor.execute(query, params)
+    return db.cursor.fetchall()
+
+
+def _fetchone(db, query, params=None):
+    db.cursor.execute(query, params)
+    return db.cursor.fetchone()
+
+
+class AsyncDatabaseManager:
+    """
+    Неблокирующий доступ к базе данных для корутин экспорта и саммари
+
+    Запросы выполняются в ограниченном пуле потоков, каждый вызов берет свое
+    соединение из ThreadedConnectionPool, поэтому event loop Telethon не ждет
+    PostgreSQL, а параллельные экспортеры и саммаризаторы не делят один курсор.
+    Методы DatabaseManager (save_channel, save_posts_batch, get_channel_stats
+    и т.д.) доступны под теми же именами как корутины с теми же результатами.
+    """
+
+    def __init__(self, min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+        self.executor = None
+
+    def connect(self):
+        """Создание пула соединений с базой данных PostgreSQL"""
+        try:
+            self.pool = ThreadedConnectionPool(self.min_size, self.max_size, **DATABASE_CONFIG)
+        except psycopg2.Error as e:
+            logger.error(f"Ошибка подключения к базе данных: {e}")
+            return False
+        # Потоков столько же, сколько соединений: поток держит не больше одного
+        # соединения, поэтому getconn() никогда не упирается в лимит пула
+        self.executor = ThreadPoolExecutor(max_workers=self.max_size, thread_name_prefix='db')
+        logger.info(f"Успешное подключение к базе данных (пул до {self.max_size} соединений)")
+        return True
+
+    def disconnect(self):
+        """Отключение от базы данных: дожидается начатых запросов и закрывает пул"""
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        if self.pool:
+            self.pool.closeall()
+            self.pool = None
+            logger.info("Отключение от базы данных")
+
+    def _call(self, func, args, kwargs):
+        """Выполняет func(db, ...) в потоке пула на соединении из пула соединений"""
+        connection = self.pool.getconn()
+        db = DatabaseManager()
+        db.connection = connection
+        db.cursor = connection.cursor(cursor_factory=RealDictCursor)
+        try:
+            return func(db, *args, **kwargs)
+        finally:
+            db.cursor.close()
+            # SELECT-методы не завершают транзакцию: откатываем ее, чтобы не
+            # вернуть в пул соединение в состоянии "idle in transaction"
+            broken = bool(connection.closed)
+            if not broken:
+                try:
+                    connection.rollback()
+                except psycopg2.Error:
+                    broken = True
+            self.pool.putconn(connection, close=broken)
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Выполняет синхронную работу с БД вне event loop
+
+        Args:
+            func: функция func(db, *args, **kwargs), где db — DatabaseManager
+                  на соединении из пула
+
+        Returns:
+            Результат func
+        """
+        if self.pool is None:
+            raise RuntimeError("Нет подключения к базе данных")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(self._call, func, args, kwargs))
+
+    async def fetchall(self, query, params=None):
+        """Выполнение произвольного SELECT, все строки как словари"""
+        return await self.run(_fetchall, query, params)
+
+    async def fetchone(self, query, params=None):
+        """Выполнение произвольного SELECT, первая строка как словарь или None"""
+        return await self.run(_fetchone, query, params)
+
+    def __getattr__(self, name):
+        method = getattr(DatabaseManager, name, None)
+        if name.startswith('_') or not callable(method):
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        @functools.wraps(method)
+        async def call(*args, **kwargs):
+            return await self.run(method, *args, **kwargs)
+
+        return call
@@ -0,0 +1,271 @@
+"""
+Пакетные запросы к LLM: несколько постов в одном запросе
+
+Длинный промпт отправляется один раз на пакет, а не на каждый пост. Посты
+помечаются строкой "### ID <номер>", модель отвечает JSON-массивом объектов
+с теми же ID. Если ответ не разбирается целиком, недостающие посты
+отправляются пакетами вдвое меньше; то, что не удалось получить пакетом,
+вызывающий код обрабатывает своим обычным запросом на один пост.
+"""
+
+import asyncio
+import json
+import logging
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import AISettings
+from llm_cache import make_cache_key
+from llm_pool import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Поля ответа и их описание для модели
+FIELDS = {
+    'main_idea': 'главная мысль одним предложением',
+    'summary': 'краткое саммари',
+    'importance': 'важность для Яндекс Путешествий, число от 1 до 10',
+    'analysis': 'краткое обоснование важности',
+}
+
+_OBJECT = re.compile(r'\{[^{}]*\}', re.DOTALL)
+
+
+def format_request(prompt: str, fields: Sequence[str]) -> str:
+    """Промпт пакета: инструкция и формат ответа"""
+    example = ', '.join(f'"{field}": <{FIELDS[field]}>' for field in fields)
+    return (f'{prompt}\n\n'
+            f'Ниже несколько текстов, каждый начинается со строки "### ID <номер>". '
+            f'Обработай каждый текст отдельно. Ответь только JSON-массивом без пояснений, '
+            f'по одному объекту на каждый текст:\n[{{"id": <номер>, {example}}}]')
+
+
+def format_content(batch: Sequence[Tuple[int, str]]) -> str:
+    """Тексты пакета с метками ID"""
+    return '\n\n'.join(f'### ID {item_id}\n{text.strip()}' for item_id, text in batch)
+
+
+def format_analysis(result: Dict[str, Any]) -> str:
+    """Текст анализа из разобранного ответа в формате одиночных запросов"""
+    parts = []
+    if result.get('main_idea'):
+        parts.append(f"ГЛАВНАЯ МЫСЛЬ: {result['main_idea']}")
+    if result.get('summary'):
+        parts.append(f"САММАРИ: {result['summary']}")
+    if result.get('analysis'):
+        parts.append(f"АНАЛИЗ: {result['analysis']}")
+    if result.get('importance') is not None:
+        parts.append(f"ВАЖНОСТЬ: {result['importance']:g}/10")
+    return '\n\n'.join(parts)
+
+
+def _validate(obj: Any, fields: Sequence[str]) -> Optional[Dict[str, Any]]:
+    """Поля одного объекта ответа или None, если объект неполный"""
+    if not isinstance(obj, dict):
+        return None
+    result = {}
+    for field in fields:
+        value = obj.get(field)
+        if field == 'importance':
+            try:
+                result[field] = max(1.0, min(10.0, float(value)))
+            except (TypeError, ValueError):
+                return None
+        elif isinstance(value, str) and value.strip():
+            result[field] = value.strip()
+        else:
+            return None
+    return result
+
+
+def _find_array(text: str) -> Optional[List[Any]]:
+    """Первый JSON-массив с объектами в тексте или None"""
+    decoder = json.JSONDecoder()
+    start = text.find('[')
+    while start != -1:
+        try:
+            value, _ = decoder.raw_decode(text, start)
+        except ValueError:
+            value = None
+        # Квадратные скобки встречаются и в пояснениях модели ("[1]", "[ID]")
+        if isinstance(value, list) and any(isinstance(obj, dict) for obj in value):
+            return value
+        start = text.find('[', start + 1)
+    return None
+
+
+def parse_batch_response(text: str, ids: Sequence[int], fields: Sequence[str]) -> Dict[int, Dict[str, Any]]:
+    """
+    Разбирает ответ на пакет
+
+    Сначала в ответе ищется JSON-массив объектов (в ```json-блоке, после
+    пояснений модели). Если такого нет (обрезанный по max_tokens ответ),
+    разбираются отдельные объекты, чтобы сохранить хотя бы часть пакета.
+
+    Args:
+        text: ответ модели
+        ids: ID постов пакета
+        fields: обязательные поля объекта
+
+    Returns:
+        dict: {ID: поля} только для постов пакета с полным ответом
+    """
+    objects = _find_array(text)
+    if objects is None:
+        objects = []
+        for match in _OBJECT.finditer(text):
+            try:
+                objects.append(json.loads(match.group(0)))
+            except ValueError:
+                continue
+
+    expected = set(ids)
+    results = {}
+    for obj in objects:
+        try:
+            item_id = int(obj.get('id')) if isinstance(obj, dict) else None
+        except (TypeError, ValueError):
+            continue
+        if item_id not in expected or item_id in results:
+            continue
+        fields_values = _validate(obj, fields)
+        if fields_values:
+            results[item_id] = fields_values
+    return results
+
+
+class BatchPrompter:
+    """
+    Пакетная обработка постов одним промптом
+
+    Пример:
+        prompter = BatchPrompter(request, prompt, 'eliza', model, temperature)
+        for batch in prompter.pack(items):
+            results = await prompter.run(batch)
+    """
+
+    def __init__(self, request: Callable[[str, str, int], Awaitable[Dict[str, Any]]], prompt: str,
+                 provider: str, model: str, temperature: float,
+                 fields: Sequence[str] = ('main_idea', 'summary', 'importance'), cache=None,
+                 max_items: int = AISettings.BATCH_MAX_POSTS, token_budget: int = AISettings.BATCH_TOKEN_BUDGET,
+                 response_tokens: int = AISettings.BATCH_RESPONSE_TOKENS, max_splits: int = AISettings.BATCH_MAX_SPLITS):
+        """
+        Args:
+            request: функция (промпт, текст, max_tokens), возвращающая корутину запроса
+                     к API (с лимитером провайдера) с ответом в формате анализатора
+            prompt: инструкция для каждого поста
+            provider: имя провайдера для кэша и логов
+            model: модель
+            temperature: температура
+            fields: поля ответа на каждый пост (ключи FIELDS)
+            cache: LLMCache для ответов на отдельные посты или None
+            max_items: максимум постов в пакете
+            token_budget: бюджет токенов на запрос вместе с ответом
+            response_tokens: токены ответа на один пост
+            max_splits: сколько раз пакет делится пополам при неразобранном ответе
+        """
+        self.request = request
+        self.provider = provider
+        self.model = model
+        self.temperature = temperature
+        self.fields = tuple(fields)
+        self.cache = cache
+        self.max_items = max(1, max_items)
+        self.token_budget = token_budget
+        self.response_tokens = response_tokens
+        self.max_splits = max_splits
+        self.prompt = format_request(prompt, self.fields)
+        self.stats = {'requests': 0, 'items': 0, 'parsed': 0, 'cached': 0, 'splits': 0, 'unparsed': 0}
+
+    def pack(self, items: Sequence[Tuple[int, str]]) -> List[List[Tuple[int, str]]]:
+        """
+        Раскладывает посты по пакетам в пределах max_items и бюджета токенов
+
+        Args:
+            items: пары (ID, текст)
+
+        Returns:
+            list: пакеты; пост больше бюджета попадает в пакет один
+        """
+        batches = []
+        batch, used = [], estimate_tokens(self.prompt)
+        for item in items:
+            cost = estimate_tokens(item[1], self.response_tokens)
+            if batch and (len(batch) >= self.max_items or used + cost > self.token_budget):
+                batches.append(batch)
+                batch, used = [], estimate_tokens(self.prompt)
+            batch.append(item)
+            used += cost
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _cache_key(self, text: str) -> str:
+        return make_cache_key(self.provider, self.model, self.temperature, self.prompt, text)
+
+    async def run(self, batch: Sequence[Tuple[int, str]]) -> Dict[int, Dict[str, Any]]:
+        """
+        Обрабатывает пакет
+
+        Args:
+            batch: пары (ID, текст)
+
+        Returns:
+            dict: {ID: поля ответа}; постов без ответа в словаре нет, их нужно
+                  обработать одиночным запросом
+        """
+        self.stats['items'] += len(batch)
+        results = {}
+        pending = []
+        for item_id, text in batch:
+            cached = await self.cache.get(self._cache_key(text)) if self.cache else None
+            if cached:
+                results[item_id] = json.loads(cached['analysis_text'])
+                self.stats['cached'] += 1
+            else:
+                pending.append((item_id, text))
+
+        if pending:
+            await self._run(pending, results, 0)
+        self.stats['unparsed'] += len(batch) - len(results)
+        return results
+
+    async def _run(self, batch, results, depth):
+        max_tokens = self.response_tokens * len(batch)
+        response = await self.request(self.prompt, format_content(batch), max_tokens)
+        self.stats['requests'] += 1
+
+        if not response or response.get('status') != 'success':
+            error = response.get('error') if response else 'нет ответа'
+            logger.warning(f"{self.provider}: пакет из {len(batch)} постов не обработан: {error}")
+            return
+
+        parsed = parse_batch_response(response.get('analysis_text') or '', [item_id for item_id, _ in batch],
+                                      self.fields)
+        texts = dict(batch)
+        for item_id, fields_values in parsed.items():
+            results[item_id] = fields_values
+            if self.cache:
+                await self.cache.put(self._cache_key(texts[item_id]), self.provider, self.model, {
+                    "status": "success",
+                    "analysis_text": json.dumps(fields_values, ensure_ascii=False),
+                    "usage": {}
+                })
+        self.stats['parsed'] += len(parsed)
+
+        missing = [item for item in batch if item[0] not in parsed]
+        if len(missing) > 1 and depth < self.max_splits:
+            self.stats['splits'] += 1
+            logger.info(f"{self.provider}: не разобраны ответы для {len(missing)} из {len(batch)} постов, "
+                        f"повторяем двумя пакетами")
+            middle = len(missing) // 2
+            await asyncio.gather(
+                self._run(missing[:middle], results, depth + 1),
+                self._run(missing[middle:], results, depth + 1)
+            )
+
+    def get_summary(self) -> str:
+        """Сводка пакетной обработки"""
+        return (f"Пакеты {self.provider}: {self.stats['items']} постов за {self.stats['requests']} запросов, "
+                f"из кэша {self.stats['cached']}, разбиений {self.stats['splits']}, "
+                f"на одиночные запросы {self.stats['unparsed']}")
@@ -0,0 +1,148 @@
+"""
+Параллельный экспорт списка каналов с общим ограничителем FloodWait
+"""
+
+import asyncio
+import logging
+import time
+
+from telethon.errors import FloodWaitError
+
+from config import EXPORT_PARALLELISM, EXPORT_FLOOD_RETRIES, EXPORT_MAX_FLOOD_WAIT
+
+logger = logging.getLogger(__name__)
+
+
+class ExportProgress:
+    """
+    Состояние экспорта канала, общее для попыток после FloodWait
+
+    Функция экспорта пишет сюда статистику, строки файла и ID последнего
+    сохраненного сообщения; повторная попытка продолжает с этого ID, а не
+    с начала канала, и дописывает ту же статистику.
+    """
+
+    def __init__(self):
+        self.stats = None
+        self.file_lines = []
+        self.last_message_id = 0
+
+    def start(self, stats_factory):
+        """
+        Статистика канала: новая при первой попытке, прежняя при повторе
+
+        Args:
+            stats_factory: класс статистики (ExportStats, SummaryExportStats)
+
+        Returns:
+            статистика экспорта канала
+        """
+        if self.stats is None:
+            self.stats = stats_factory()
+            self.stats.add_channel()
+        return self.stats
+
+
+class FloodWaitLimiter:
+    """
+    Ограничивает число одновременно экспортируемых каналов
+
+    FloodWait в Telegram относится ко всему аккаунту, поэтому ожидание общее:
+    после FloodWaitError в одном канале ни один экспорт не начинает новую
+    попытку, пока ожидание не истечет.
+    """
+
+    def __init__(self, parallelism=EXPORT_PARALLELISM, max_wait=EXPORT_MAX_FLOOD_WAIT):
+        self.parallelism = max(1, parallelism)
+        self.max_wait = max_wait
+        self.flood_waits = 0
+        self._semaphore = asyncio.Semaphore(self.parallelism)
+        self._resume_at = 0.0
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        try:
+            # Ожидание могло продлиться, пока мы спали
+            while (delay := self._resume_at - time.monotonic()) > 0:
+                await asyncio.sleep(delay)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+
+    def flood_wait(self, seconds):
+        """
+        Регистрирует FloodWaitError
+
+        Args:
+            seconds: ожидание, которого требует Telegram
+
+        Returns:
+            bool: можно ли повторить запрос (ожидание не больше max_wait)
+        """
+        self.flood_waits += 1
+        if seconds > self.max_wait:
+            logger.warning(f"Flood wait {seconds} сек больше допустимого ({self.max_wait} сек)")
+            return False
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+        logger.warning(f"Flood wait: экспорт всех каналов приостановлен на {seconds} секунд")
+        return True
+
+
+async def export_channels(client, channels, export_func, resolve_entity, stats, limiter=None, **export_kwargs):
+    """
+    Экспортирует каналы параллельно, ошибка одного канала не влияет на остальные
+
+    Args:
+        client: клиент Telethon
+        channels: список username или ID каналов
+        export_func: функция экспорта канала (export_chat_history, export_chat_with_summaries),
+                     принимающая progress=ExportProgress
+        resolve_entity: функция поиска канала (get_entity_by_name_or_id)
+        stats: общая статистика, в которую добавляется статистика каналов
+        limiter: FloodWaitLimiter (по умолчанию EXPORT_PARALLELISM каналов)
+        **export_kwargs: аргументы export_func
+
+    Returns:
+        dict: {канал: статистика экспорта или None, если экспорт не удался}
+    """
+    limiter = limiter or FloodWaitLimiter()
+
+    progresses = [ExportProgress() for _ in channels]
+
+    async def export_one(channel_name, progress):
+        for attempt in range(EXPORT_FLOOD_RETRIES + 1):
+            async with limiter:
+                try:
+                    logger.info(f"Экспорт из канала: {channel_name}")
+                    chat_entity = await resolve_entity(client, channel_name)
+                    if not chat_entity:
+                        logger.warning(f"Канал {channel_name} не найден")
+                        return None
+                    if progress.last_message_id:
+                        logger.info(f"Канал {channel_name}: продолжаем после FloodWait "
+                                    f"с сообщения {progress.last_message_id}")
+                    _, channel_stats = await export_func(client, chat_entity, progress=progress, **export_kwargs)
+                    return channel_stats
+                except FloodWaitError as e:
+                    if not limiter.flood_wait(e.seconds):
+                        break
+                except Exception as e:
+                    logger.error(f"Ошибка экспорта из канала {channel_name}: {e}")
+                    return None
+        logger.error(f"Канал {channel_name} пропущен из-за FloodWait")
+        return None
+
+    logger.info(f"Экспорт {len(channels)} каналов, одновременно до {limiter.parallelism}")
+    results = await asyncio.gather(*(
+        export_one(channel_name, progress) for channel_name, progress in zip(channels, progresses)
+    ))
+
+    # Сохраненное до пропуска канала тоже учитывается в общей статистике
+    for progress in progresses:
+        if progress.stats:
+            stats.merge(progress.stats)
+    return dict(zip(channels, results))
@@ -32,10 +32,34 @@ DATABASE_CONFIG: Dict[str, Any] = {
     'user': os.getenv('DB_USER', 'postgres'),
     'password': os.getenv('DB_PASSWORD', '')
 }
+# Пул соединений AsyncDatabaseManager: столько же потоков выполняют запросы
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '8'))
 
 # Export Settings
 DEFAULT_EXPORT_DIR = os.getenv('EXPORT_DIR', 'Chats')
 SUMMARY_CHANNEL_USERNAME = os.getenv('SUMMARY_CHANNEL_USERNAME')
+# Сколько сообщений копится перед пакетной записью в БД (одна транзакция на пачку)
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '500'))
+# Сколько каналов экспортируется одновременно за цикл
+EXPORT_PARALLELISM = int(os.getenv('EXPORT_PARALLELISM', '4'))
+# FloodWait: сколько раз повторять экспорт канала и какое максимальное ожидание (сек) допустимо
+EXPORT_FLOOD_RETRIES = int(os.getenv('EXPORT_FLOOD_RETRIES', '3'))
+EXPORT_MAX_FLOOD_WAIT = int(os.getenv('EXPORT_MAX_FLOOD_WAIT', '300'))
+# За сколько часов обновлять просмотры/репосты уже сохраненных постов при инкрементальном экспорте (0 — не обновлять)
+EXPORT_METRICS_REFRESH_HOURS = int(os.getenv('EXPORT_METRICS_REFRESH_HOURS', '24'))
+
+# Группировка почти одинаковых постов в сюжеты (MinHash/LSH): размер подписи, число полос,
+# порог сходства Жаккара и окно времени, в котором посты считаются одним сюжетом
+DEDUP_NUM_PERM = int(os.getenv('DEDUP_NUM_PERM', '64'))
+DEDUP_BANDS = int(os.getenv('DEDUP_BANDS', '16'))
+DEDUP_THRESHOLD = float(os.getenv('DEDUP_THRESHOLD', '0.5'))
+DEDUP_WINDOW_HOURS = int(os.getenv('DEDUP_WINDOW_HOURS', '48'))
+
+# Словарь ключевых слов и тем (JSON {"weights": {...}, "topics": {...}}; по умолчанию встроенный)
+KEYWORDS_PATH = os.getenv('KEYWORDS_PATH')
+# Минимальная важность по ключевым словам, чтобы пост отправлялся в LLM (0 — без фильтра)
+KEYWORD_PREFILTER_MIN_SCORE = float(os.getenv('KEYWORD_PREFILTER_MIN_SCORE', '0'))
 
 # AI API Settings
 class AISettings:
@@ -44,15 +68,39 @@ class AISettings:
         'base_url': os.getenv('ELIZA_BASE_URL', 'https://api.eliza.yandex.net'),
         'model': os.getenv('ELIZA_MODEL', 'gpt-4.1-nano'),
         'temperature': float(os.getenv('ELIZA_TEMPERATURE', '0.7')),
-        'max_tokens': int(os.getenv('ELIZA_MAX_TOKENS', '1000'))
+        'max_tokens': int(os.getenv('ELIZA_MAX_TOKENS', '1000')),
+        # Квоты провайдера (0 — без ограничения) и число одновременных запросов
+        'requests_per_minute': int(os.getenv('ELIZA_REQUESTS_PER_MINUTE', '60')),
+        'tokens_per_minute': int(os.getenv('ELIZA_TOKENS_PER_MINUTE', '100000')),
+        'max_concurrency': int(os.getenv('ELIZA_MAX_CONCURRENCY', '8'))
     }
     
     ZELIBOBA = {
         'api_token': os.getenv('ZELIBOBA_API_TOKEN'),
         'base_url': os.getenv('ZELIBOBA_BASE_URL'),
         'model': os.getenv('ZELIBOBA_MODEL', 'zeliboba-3.5'),
-        'temperature': float(os.getenv('ZELIBOBA_TEMPERATURE', '0.7'))
+        'temperature': float(os.getenv('ZELIBOBA_TEMPERATURE', '0.7')),
+        'max_tokens': int(os.getenv('ZELIBOBA_MAX_TOKENS', '1000')),
+        'requests_per_minute': int(os.getenv('ZELIBOBA_REQUESTS_PER_MINUTE', '60')),
+        'tokens_per_minute': int(os.getenv('ZELIBOBA_TOKENS_PER_MINUTE', '100000')),
+        'max_concurrency': int(os.getenv('ZELIBOBA_MAX_CONCURRENCY', '8'))
     }
+    
+    # Повторы запросов при 429/5xx и сетевых ошибках: экспоненциальная задержка с джиттером
+    MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '5'))
+    BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', '1.0'))
+    BACKOFF_MAX = float(os.getenv('LLM_BACKOFF_MAX', '60.0'))
+    
+    # Кэш ответов: срок хранения в БД (0 — бессрочно) и размер LRU в памяти процесса (0 — без LRU)
+    CACHE_TTL_HOURS = float(os.getenv('LLM_CACHE_TTL_HOURS', '720'))
+    CACHE_LRU_SIZE = int(os.getenv('LLM_CACHE_LRU_SIZE', '1000'))
+    
+    # Пакетные запросы: постов в одном запросе (1 — без пакетов), бюджет токенов запроса вместе с ответом,
+    # токены ответа на пост и сколько раз делить пакет пополам, если ответ не разобран
+    BATCH_MAX_POSTS = int(os.getenv('LLM_BATCH_MAX_POSTS', '10'))
+    BATCH_TOKEN_BUDGET = int(os.getenv('LLM_BATCH_TOKEN_BUDGET', '8000'))
+    BATCH_RESPONSE_TOKENS = int(os.getenv('LLM_BATCH_RESPONSE_TOKENS', '300'))
+    BATCH_MAX_SPLITS = int(os.getenv('LLM_BATCH_MAX_SPLITS', '2'))
 
 # Validate required settings
 def validate_sensitive_data():
@@ -1,11 +1,37 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values, Json
 import logging
 from config import DATABASE_CONFIG
 from typing import Optional, Dict, Any
 
 logger = logging.getLogger(__name__)
 
+# Подстроки типов реакций, которые считаются позитивными (начальное содержимое таблицы positive_reactions)
+POSITIVE_REACTIONS = ['👍', 'like', '❤️', 'heart', '🥰', 'love', '😁', 'laugh', '👏', 'clap', '🔥', 'fire', '💯', 'hundred']
+
+# Пересчет posts.importance_score одним запросом для постов, отобранных условием {condition}:
+# позитивные реакции агрегируются по всем постам сразу, а не запросом на пост
+IMPORTANCE_UPDATE_QUERY = """
+    UPDATE posts SET importance_score = ROUND(LEAST(10, GREATEST(1,
+        s.forwards_count * 0.5 +
+        s.replies_count * 0.3 +
+        s.positive_count * 0.2 +
+        s.views_count / 1000.0 * 0.1
+    ))::numeric, 2)
+    FROM (
+        SELECT
+            t.id, t.views_count, t.forwards_count, t.replies_count,
+            COALESCE(SUM(r.count) FILTER (WHERE EXISTS (
+                SELECT 1 FROM positive_reactions pr
+                WHERE strpos(lower(r.reaction_type), pr.pattern) > 0
+            )), 0) AS positive_count
+        FROM (SELECT * FROM posts WHERE {condition}) t
+        LEFT JOIN reactions r ON r.post_id = t.id
+        GROUP BY t.id, t.views_count, t.forwards_count, t.replies_count
+    ) s
+    WHERE posts.id = s.id;
+"""
+
 class DatabaseManager:
     def __init__(self):
         self.connection = None
@@ -122,9 +148,54 @@ class DatabaseManager:
                 );
             """)
             
+            # Сюжет поста: ID поста-представителя группы почти одинаковых постов
+            self.cursor.execute("""
+                ALTER TABLE posts ADD COLUMN IF NOT EXISTS cluster_id INTEGER;
+                
+                CREATE TABLE IF NOT EXISTS post_fingerprints (
+                    post_id INTEGER PRIMARY KEY,
+                    signature BIGINT[] NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (post_id) REFERENCES posts (id)
+                );
+                
+                CREATE TABLE IF NOT EXISTS post_lsh_bands (
+                    band SMALLINT NOT NULL,
+                    band_hash BIGINT NOT NULL,
+                    post_id INTEGER NOT NULL,
+                    FOREIGN KEY (post_id) REFERENCES posts (id),
+                    PRIMARY KEY (band, band_hash, post_id)
+                );
+            """)
+            
+            # Важность поста по метрикам и позитивным реакциям, пересчитывается при их изменении
+            self.cursor.execute("""
+                ALTER TABLE posts ADD COLUMN IF NOT EXISTS importance_score REAL;
+                
+                CREATE TABLE IF NOT EXISTS positive_reactions (
+                    pattern TEXT PRIMARY KEY
+                );
+            """)
+            execute_values(self.cursor, """
+                INSERT INTO positive_reactions (pattern) VALUES %s
+                ON CONFLICT (pattern) DO NOTHING;
+            """, [(pattern.lower(),) for pattern in POSITIVE_REACTIONS])
+            
+            # Последнее полученное сообщение канала для инкрементального экспорта
+            self.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS channel_export_state (
+                    channel_id INTEGER PRIMARY KEY,
+                    last_message_id BIGINT NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (channel_id) REFERENCES channels (id)
+                );
+            """)
+            
             self.cursor.execute("""
                 CREATE INDEX IF NOT EXISTS idx_posts_channel_id ON posts(channel_id);
                 CREATE INDEX IF NOT EXISTS idx_posts_date_published ON posts(date_published);
+                CREATE INDEX IF NOT EXISTS idx_posts_cluster_id ON posts(cluster_id);
+                CREATE INDEX IF NOT EXISTS idx_posts_importance_score ON posts(importance_score DESC);
                 CREATE INDEX IF NOT EXISTS idx_post_summaries_channel_id ON post_summaries(channel_id);
                 CREATE INDEX IF NOT EXISTS idx_post_summaries_date_published ON post_summaries(date_published);
                 CREATE INDEX IF NOT EXISTS idx_reactions_post_id ON reactions(post_id);
@@ -153,6 +224,25 @@ class DatabaseManager:
                 CREATE INDEX IF NOT EXISTS idx_analysis_status ON analysis(status);
             """)
             
+            # Кэш ответов LLM по хэшу нормализованного текста, промпта, модели и температуры
+            self.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    model TEXT,
+                    response_text TEXT NOT NULL,
+                    usage JSONB,
+                    hits INTEGER DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_hit_at TIMESTAMP,
+                    expires_at TIMESTAMP
+                );
+                CREATE INDEX IF NOT EXISTS idx_llm_cache_expires_at ON llm_cache(expires_at);
+            """)
+            
+            # Посты, сохраненные до появления importance_score
+            self._refresh_importance(condition="importance_score IS NULL")
+            
             self.connection.commit()
             logger.info("Таблицы успешно созданы")
             return True
@@ -208,6 +298,7 @@ class DatabaseManager:
                   content, date_published, views_count, forwards_count, replies_count))
             
             post_id = self.cursor.fetchone()['id']
+            self._refresh_importance([post_id])
             self.connection.commit()
             logger.debug(f"Пост сохранен: ID {post_id}")
             return post_id
@@ -217,6 +308,210 @@ class DatabaseManager:
             self.connection.rollback()
             return None
     
+    def save_posts_batch(self, posts, reactions=None, page_size=1000, high_water_marks=None):
+        """Пакетное сохранение постов и их реакций одной транзакцией
+        
+        Посты вставляются через execute_values (INSERT ... ON CONFLICT на
+        page_size строк за запрос), реакции всех постов — одним запросом,
+        commit выполняется один раз на пачку.
+        
+        Args:
+            posts: список объектов Post одного канала или нескольких
+            reactions: словарь (channel_id, telegram_message_id) -> {тип реакции: количество}
+            page_size: количество строк в одном INSERT
+            high_water_marks: словарь channel_id -> ID последнего полученного сообщения;
+                              сохраняется в той же транзакции, что и посты
+        
+        Returns:
+            dict: (channel_id, telegram_message_id) -> ID поста в БД или None при ошибке
+        """
+        if not posts and not high_water_marks:
+            return {}
+        
+        # Повтор сообщения в пачке сломал бы ON CONFLICT DO UPDATE: оставляем последнюю версию
+        unique_posts = {(post.channel_id, post.telegram_message_id): post for post in posts}
+        
+        try:
+            rows = [] if not unique_posts else execute_values(self.cursor, """
+                INSERT INTO posts (
+                    channel_id, telegram_message_id, sender_name, sender_id,
+                    content, date_published, views_count, forwards_count, replies_count
+                )
+                VALUES %s
+                ON CONFLICT (channel_id, telegram_message_id)
+                DO UPDATE SET
+                    content = EXCLUDED.content,
+                    views_count = EXCLUDED.views_count,
+                    forwards_count = EXCLUDED.forwards_count,
+                    replies_count = EXCLUDED.replies_count,
+                    updated_at = CURRENT_TIMESTAMP
+                RETURNING id, channel_id, telegram_message_id;
+            """, [
+                (post.channel_id, post.telegram_message_id, post.sender_name, post.sender_id,
+                 post.content, post.date_published, post.views_count, post.forwards_count,
+                 post.replies_count)
+                for post in unique_posts.values()
+            ], page_size=page_size, fetch=True)
+            
+            post_ids = {(row['channel_id'], row['telegram_message_id']): row['id'] for row in rows}
+            
+            if reactions:
+                self._upsert_reactions({
+                    post_ids[key]: reactions_data
+                    for key, reactions_data in reactions.items()
+                    if key in post_ids and reactions_data
+                }, page_size)
+            
+            self._refresh_importance(list(post_ids.values()))
+            
+            if high_water_marks:
+                execute_values(self.cursor, """
+                    INSERT INTO channel_export_state (channel_id, last_message_id)
+                    VALUES %s
+                    ON CONFLICT (channel_id)
+                    DO UPDATE SET
+                        last_message_id = GREATEST(channel_export_state.last_message_id, EXCLUDED.last_message_id),
+                        updated_at = CURRENT_TIMESTAMP;
+                """, list(high_water_marks.items()))
+            
+            self.connection.commit()
+            logger.debug(f"Пачка постов сохранена: {len(post_ids)}")
+            return post_ids
+            
+        except psycopg2.Error as e:
+            logger.error(f"Ошибка пакетного сохранения постов: {e}")
+            self.connection.rollback()
+            return None
+    
+    def get_last_message_id(self, channel_id):
+        """ID последнего сохраненного сообщения канала (0, если экспорта еще не было)"""
+        try:
+            self.cursor.execute("""
+                SELECT last_message_id FROM channel_export_state WHERE channel_id = %s;
+            """, (channel_id,))
+            row = self.cursor.fetchone()
+            return row['last_message_id'] if row else 0
+        except psycopg2.Error as e:
+            logger.error(f"Ошибка получения состояния экспорта канала: {e}")
+            return None
+    
+    def get_recent_message_ids(self, channel_id, hours=24, max_message_id=None):
+        """ID сообщений канала, опубликованных за последние hours часов"""
+        try:
+            self.cursor.execute("""
+                SELECT telegram_message_id FROM posts
+                WHERE channel_id = %s
+                AND date_published >= NOW() - %s * INTERVAL '1 hour'
+                AND (%s IS NULL OR telegram_message_id <= %s)
+                ORDER BY telegram_message_id;
+            """, (channel_id, hours, max_message_id, max_message_id))
+            return [row['telegram_message_id'] for row in self.cursor.fetchall()]
+        except psycopg2.Error as e:
+            logger.error(f"Ошибка получения недавних постов: {e}")
+            return []
+    
+    def update_post_metrics(self, channel_id, metrics, page_size=1000):
+        """Обновление просмотров, репостов и ответов уже сохраненных постов одним UPDATE
+        
+        Args:
+            channel_id: ID канала в БД
+            metrics: список (telegram_message_id, views, forwards, replies)
+            page_size: количество строк в одном UPDATE
+        
+        Returns:
+            int: количество обновленных постов или None при ошибке
+        """
+        if not metrics:
+            return 0
+        try:
+            rows = execute_values(self.cursor, """
+                UPDATE posts SET
+                    views_count = m.views,
+                    forwards_count = m.forwards,
+                    replies_count = m.replies,
+                    updated_at = CURRENT_TIMESTAMP
+                FROM (VALUES %s) AS m (channel_id, telegram_message_id, views, forwards, replies)
+                WHERE posts.channel_id = m.channel_id
+                AND posts.telegram_message_id = m.telegram_message_id
+                RETURNING posts.id;
+            """, [(channel_id,) + tuple(row) for row in metrics],
+               template="(%s::integer, %s::bigint, %s::integer, %s::integer, %s::integer)",
+               page_size=page_size, fetch=True)
+            self._refresh_importance([row['id'] for row in rows])
+            self.connection.commit()
+            return len(rows)
+        except psycopg2.Error as e:
+            logger.error(f"Ошибка обновления метрик постов: {e}")
+            self.connection.rollback()
+            return None
+    
+    def save_reactions_batch(self, reactions, page_size=1000):
+        """Сохранение реакций нескольких постов одним запросом
+        
+        Args:
+            reactions: словарь post_id -> {тип реакции: количество}
+            page_size: количество строк в одном INSERT
+        """
+        try:
+            self._upsert_reactions(reactions, page_size)
+            self._refresh_importance(list(reactions))
+            self.connection.commit()
+            return True
+        except psycopg2.Error as e:
+            logger.error(f"Ошибка пакетного сохранения реакций: {e}")
+            self.connection.rollback()
+            return False
+    
+    def _upsert_reactions(self, reactions, page_size=1000):
+        """INSERT ... ON CONFLICT для реакций без commit"""
+        rows = [
+            (post_id, reaction_type, count)
+            for post_id, reactions_data in reactions.items()
+            for reaction_type, count in reactions_data.items()
+        ]
+        if not rows:
+            return
+        execute_values(self.cursor, """
+            INSERT INTO reactions (post_id, reaction_type, count)
+            VALUES %s
+            ON CONFLICT (post_id, reaction_type)
+            DO UPDATE SET
+                count = EXCLUDED.count,
+                updated_at = CURRENT_TIMESTAMP;
+        """, rows, page_size=page_size)
+    
+    def _refresh_importance(self, post_ids=None, condition=None, params=()):
+        """Пересчет importance_score постов post_ids (или по условию condition) без commit"""
+        if post_ids is not None:
+            if not post_ids:
+                return 0
+            condition, params = "id = ANY(%s)", (list(post_ids),)
+        self.cursor.execute(IMPORTANCE_UPDATE_QUERY.format(condition=condition or "TRUE"), params)
+        return self.cursor.rowcount
+    
+    def refresh_importance_scores(self, hours=None):
+        """Пересчет важности всех постов (или опубликованных за последние hours часов) одним запросом
+        
+        Нужен после изменения positive_reactions: при сохранении постов,
+        реакций и метрик важность пересчитывается автоматически.
+        
+        Returns:
+            int: количество пересчитанных постов или None при ошибке
+        """
+        try:
+            if hours:
+                count = self._refresh_importance(condition="date_published >= NOW() - %s * INTERVAL '1 hour'",
+                                                 params=(hours,))
+            else:
+                count = self._refresh_importance(condition="TRUE")
+            self.connection.commit()
+            logger.info(f"Важность пересчитана для {count} постов")
+            return count
+        except psycopg2.Error as e:
+            logger.error(f"Ошибка пересчета важности постов: {e}")
+            self.connection.rollback()
+            return None
+    
     def save_post_summary(self, channel_id, telegram_message_id, sender_name, sender_id,
                          summary, main_idea, date_published, views_count=0, forwards_count=0, replies_count=0, channel_name=None):
         """Сохранение саммари поста"""
@@ -313,6 +608,7 @@ class DatabaseManager:
                         updated_at = CURRENT_TIMESTAMP;
                 """, (post_id, reaction_type, count))
             
+            self._refresh_importance([post_id])
             self.connection.commit()
             logger.debug(f"Реакции сохранены для поста {post_id}")
             return True
@@ -432,51 +728,6 @@ class DatabaseManager:
             return []
             
     
-    def calculate_post_importance_score(self, post_data):
-        """Упрощенный расчет важности поста на основе метрик"""
-        try:
-            views_count = post_data.get('views_count', 0)
-            forwards_count = post_data.get('forwards_count', 0)
-            replies_count = post_data.get('replies_count', 0)
-            
-            # Получаем реакции для поста
-            self.cursor.execute("""
-                SELECT reaction_type, count FROM reactions
-                WHERE post_id = %s
-            """, (post_data['id'],))
-            reactions = self.cursor.fetchall()
-            
-            # Подсчитываем позитивные реакции
-            positive_reactions = ['👍', 'like', '❤️', 'heart', '🥰', 'love', '😁', 'laugh', '👏', 'clap', '🔥', 'fire', '💯', 'hundred']
-            positive_reaction_count = 0
-            total_reaction_count = 0
-            
-            for reaction in reactions:
-                total_reaction_count += reaction['count']
-                if any(pos in reaction['reaction_type'].lower() for pos in positive_reactions):
-                    positive_reaction_count += reaction['count']
-            
-            # Упрощенный расчет важности (1-10)
-            importance_score = min(10, max(1,
-                (forwards_count * 0.5) +
-                (replies_count * 0.3) +
-                (positive_reaction_count * 0.2) +
-                (views_count / 1000 * 0.1)
-            ))
-            
-            return {
-                'final_score': round(importance_score, 2),
-                'forwards': forwards_count,
-                'replies': replies_count,
-                'positive_reactions': positive_reaction_count,
-                'total_reactions': total_reaction_count,
-                'views': views_count
-            }
-            
-        except Exception as e:
-            logger.error(f"Ошибка расчета важности поста: {e}")
-            return {'final_score': 5.0}
-    
     def get_top_important_summaries_for_publication(self, limit=5):
         """Получение топ саммари для публикации на основе метрик"""
         try:
@@ -484,13 +735,28 @@ class DatabaseManager:
                 SELECT
                     ps.id, ps.summary, ps.main_idea, ps.date_published, ps.telegram_message_id,
                     ps.views_count, ps.forwards_count, ps.replies_count,
-                    COALESCE(ps.channel_name, c.title) as channel_title, c.username as channel_username
+                    COALESCE(ps.channel_name, c.title) as channel_title, c.username as channel_username,
+                    COALESCE(s.cluster_size, 1) as cluster_size
                 FROM post_summaries ps
                 JOIN channels c ON ps.channel_id = c.id
+                -- Саммари представителя сюжета ранжируется по вовлеченности всех копий сюжета
+                LEFT JOIN posts p ON p.channel_id = ps.channel_id
+                    AND p.telegram_message_id = ps.telegram_message_id
+                LEFT JOIN (
+                    SELECT
+                        cluster_id,
+                        COUNT(*) AS cluster_size,
+                        SUM(views_count) AS views_count,
+                        SUM(forwards_count) AS forwards_count,
+                        SUM(replies_count) AS replies_count
+                    FROM posts
+                    WHERE cluster_id IS NOT NULL
+                    GROUP BY cluster_id
+                ) s ON s.cluster_id = p.id
                 ORDER BY
-                    ps.forwards_count DESC,
-                    ps.replies_count DESC,
-                    ps.views_count DESC,
+                    COALESCE(s.forwards_count, ps.forwards_count) DESC,
+                    COALESCE(s.replies_count, ps.replies_count) DESC,
+                    COALESCE(s.views_count, ps.views_count) DESC,
                     ps.date_published DESC
                 LIMIT %s;
             """
@@ -508,18 +774,35 @@ class DatabaseManager:
     def get_top_important_posts_for_publication(self, limit=5):
         """Получение топ постов для публикации на основе метрик"""
         try:
+            # Один пост на сюжет (представитель), вовлеченность сюжета суммируется по всем его копиям
             query = """
+                WITH stories AS (
+                    SELECT
+                        COALESCE(cluster_id, id) AS story_id,
+                        COUNT(*) AS cluster_size,
+                        MAX(importance_score) AS importance_score,
+                        SUM(views_count) AS cluster_views,
+                        SUM(forwards_count) AS cluster_forwards,
+                        SUM(replies_count) AS cluster_replies
+                    FROM posts
+                    WHERE date_published >= NOW() - INTERVAL '24 hours'
+                    GROUP BY COALESCE(cluster_id, id)
+                )
                 SELECT
                     p.id, p.content, p.date_published, p.telegram_message_id,
                     p.views_count, p.forwards_count, p.replies_count,
+                    s.cluster_size, s.importance_score, s.cluster_views, s.cluster_forwards, s.cluster_replies,
                     c.title as channel_title, c.username as channel_username
-                FROM posts p
+                FROM stories s
+                JOIN posts p ON p.id = s.story_id
                 JOIN channels c ON p.channel_id = c.id
-                WHERE p.date_published >= NOW() - INTERVAL '24 hours'
+                -- Сначала вовлеченность всего сюжета; importance_score (максимум по копиям,
+                -- ограничен 10) только различает сюжеты с равной вовлеченностью
                 ORDER BY
-                    p.forwards_count DESC,
-                    p.replies_count DESC,
-                    p.views_count DESC,
+                    s.cluster_forwards DESC,
+                    s.cluster_replies DESC,
+                    s.cluster_views DESC,
+                    s.importance_score DESC NULLS LAST,
                     p.date_published DESC
                 LIMIT %s;
             """
@@ -534,6 +817,148 @@ class DatabaseManager:
             logger.error(f"Ошибка получения постов: {e}")
             return []
 
+    def get_posts_without_fingerprint(self, limit=None):
+        """Посты с текстом, еще не отнесенные к сюжету, в порядке публикации"""
+        try:
+            self.cursor.execute("""
+                SELECT p.id, p.content, p.date_published FROM posts p
+                LEFT JOIN post_fingerprints f ON f.post_id = p.id
+                WHERE f.post_id IS NULL
+                AND p.content IS NOT NULL
+                AND p.content != ''
+                ORDER BY p.date_published, p.id
+                LIMIT %s;
+            """, (limit,))
+            return self.cursor.fetchall()
+        except psycopg2.Error as e:
+            logger.error(f"Ошибка получения постов без подписи: {e}")
+            return []
+    
+    def find_lsh_candidates(self, bands, since):
+        """Проиндексированные посты, опубликованные после since и совпавшие хотя бы по одной полосе LSH
+        
+        Args:
+            bands: список пар (номер полосы, хэш полосы)
+            since: нижняя граница даты публикации
+        """
+        if not bands:
+            return []
+        try:
+            self.cursor.execute("""
+                SELECT b.band, b.band_hash, b.post_id, f.signature, p.cluster_id, p.date_published
+                FROM post_lsh_bands b
+                JOIN post_fingerprints f ON f.post_id = b.post_id
+                JOIN posts p ON p.id = b.post_id
+                WHERE (b.band, b.band_hash) IN (
+                    SELECT * FROM unnest(%s::smallint[], %s::bigint[])
+                )
+                AND p.date_published >= %s;
+            """, ([band for band, _ in bands], [band_hash for _, band_hash in bands], since))
+            return self.cursor.fetchall()
+        except psycopg2.Error as e:
+            logger.error(f"Ошибка поиска кандидатов в дубликаты: {e}")
+            return []
+    
+    def save_post_fingerprints(self, fingerprints, page_size=1000):
+        """Сохранение подписей, полос LSH и сюжетов постов одной транзакцией
+        
+        Args:
+            fingerprints: список (post_id, подпись, cluster_id, [(полоса, хэш), ...])
+            page_size: количество строк в одном запросе
+        """
+        try:
+            execute_values(self.cursor, """
+                INSERT INTO post_fingerprints (post_id, signature) VALUES %s
+                ON CONFLICT (post_id) DO NOTHING;
+            """, [(post_id, signature) for post_id, signature, _, _ in fingerprints], page_size=page_size)
+            execute_values(self.cursor, """
+                INSERT INTO post_lsh_bands (band, band_hash, post_id) VALUES %s
+                ON CONFLICT DO NOTHING;
+            """, [
+                (band, band_hash, post_id)
+                for post_id, _, _, bands in fingerprints
+                for band, band_hash in bands
+            ], page_size=page_size)
+            execute_values(self.cursor, """
+                UPDATE posts SET cluster_id = c.cluster_id
+                FROM (VALUES %s) AS c (post_id, cluster_id)
+                WHERE posts.id = c.post_id;
+            """, [(post_id, cluster_id) for post_id, _, cluster_id, _ in fingerprints], page_size=page_size)
+            self.connection.commit()
+            return True
+        except psycopg2.Error as e:
+            logger.error(f"Ошибка сохранения подписей постов: {e}")
+            self.connection.rollback()
+            return False
+    
+    def get_llm_cache(self, cache_key):
+        """Ответ LLM из кэша, если срок не истек (попадания учитывает record_llm_cache_hits)"""
+        try:
+            self.cursor.execute("""
+                SELECT response_text, usage, EXTRACT(EPOCH FROM expires_at - CURRENT_TIMESTAMP) AS ttl
+                FROM llm_cache
+                WHERE cache_key = %s
+                AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP);
+            """, (cache_key,))
+            return self.cursor.fetchone()
+        except psycopg2.Error as e:
+            logger.error(f"Ошибка чтения кэша LLM: {e}")
+            self.connection.rollback()
+            return None
+    
+    def record_llm_cache_hits(self, hits):
+        """Учет попаданий в кэш LLM одним запросом
+        
+        Args:
+            hits: словарь cache_key -> число попаданий
+        """
+        if not hits:
+            return True
+        try:
+            self.cursor.execute("""
+                UPDATE llm_cache SET hits = llm_cache.hits + h.hits, last_hit_at = CURRENT_TIMESTAMP
+                FROM unnest(%s::text[], %s::int[]) AS h(cache_key, hits)
+                WHERE llm_cache.cache_key = h.cache_key;
+            """, (list(hits), list(hits.values())))
+            self.connection.commit()
+            return True
+        except psycopg2.Error as e:
+            logger.error(f"Ошибка учета попаданий в кэш LLM: {e}")
+            self.connection.rollback()
+            return False
+    
+    def save_llm_cache(self, cache_key, provider, model, response_text, usage=None, ttl_seconds=None):
+        """Сохранение ответа LLM в кэш (ttl_seconds=None — без срока)"""
+        try:
+            self.cursor.execute("""
+                INSERT INTO llm_cache (cache_key, provider, model, response_text, usage, expires_at)
+                VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP + %s * INTERVAL '1 second')
+                ON CONFLICT (cache_key)
+                DO UPDATE SET
+                    response_text = EXCLUDED.response_text,
+                    usage = EXCLUDED.usage,
+                    created_at = CURRENT_TIMESTAMP,
+                    expires_at = EXCLUDED.expires_at;
+            """, (cache_key, provider, model, response_text, Json(usage or {}), ttl_seconds))
+            self.connection.commit()
+            return True
+        except psycopg2.Error as e:
+            logger.error(f"Ошибка сохранения кэша LLM: {e}")
+            self.connection.rollback()
+            return False
+    
+    def purge_llm_cache(self):
+        """Удаление просроченных ответов LLM из кэша"""
+        try:
+            self.cursor.execute("DELETE FROM llm_cache WHERE expires_at <= CURRENT_TIMESTAMP;")
+            deleted = self.cursor.rowcount
+            self.connection.commit()
+            return deleted
+        except psycopg2.Error as e:
+            logger.error(f"Ошибка очистки кэша LLM: {e}")
+            self.connection.rollback()
+            return 0
+    
     def clear_all_tables(self):
         """Очистка всех таблиц в базе данных"""
         try:
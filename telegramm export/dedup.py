@@ -0,0 +1,145 @@
+"""
+Группировка почти одинаковых постов разных каналов в сюжеты (MinHash + LSH)
+
+Каждый пост получает MinHash-подпись по шинглам из слов. Подпись режется
+на полосы (LSH), хэши полос хранятся в post_lsh_bands: кандидаты в дубликаты —
+посты, совпавшие хотя бы по одной полосе. Пост с оценкой Жаккара не ниже
+порога попадает в сюжет кандидата (posts.cluster_id), иначе открывает свой
+сюжет. Саммари и анализ делаются только для представителя сюжета
+(cluster_id = id), а вовлеченность сюжета суммируется при ранжировании.
+"""
+
+import datetime
+import hashlib
+import logging
+import random
+import re
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from config import DEDUP_NUM_PERM, DEDUP_BANDS, DEDUP_THRESHOLD, DEDUP_WINDOW_HOURS
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+SHINGLE_SIZE = 3
+
+# Фиксированное зерно: подписи должны совпадать между запусками
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+                 for _ in range(DEDUP_NUM_PERM)]
+
+
+def _hash32(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=4).digest(), 'little')
+
+
+def shingles(text: str) -> set:
+    """Шинглы из SHINGLE_SIZE подряд идущих слов нормализованного текста"""
+    words = _WORD.findall(text.lower().replace('ё', 'е'))
+    if len(words) < SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text: str) -> List[int]:
+    """MinHash-подпись текста из DEDUP_NUM_PERM значений; пустая, если в тексте нет слов"""
+    hashes = [_hash32(shingle) for shingle in shingles(text)]
+    if not hashes:
+        return []
+    return [min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def lsh_bands(signature: List[int]) -> List[Tuple[int, int]]:
+    """Пары (номер полосы, 64-битный хэш полосы) для поиска кандидатов"""
+    if not signature:
+        return []
+    rows = len(signature) // DEDUP_BANDS
+    bands = []
+    for band in range(DEDUP_BANDS):
+        chunk = ','.join(map(str, signature[band * rows:(band + 1) * rows]))
+        digest = hashlib.blake2b(chunk.encode('ascii'), digest_size=8).digest()
+        bands.append((band, int.from_bytes(digest, 'little', signed=True)))
+    return bands
+
+
+def similarity(first: List[int], second: List[int]) -> float:
+    """Оценка коэффициента Жаккара по двум подписям (0 для текстов без слов)"""
+    if not first or not second:
+        return 0.0
+    return sum(1 for a, b in zip(first, second) if a == b) / len(first)
+
+
+def _naive(date: datetime.datetime) -> datetime.datetime:
+    return date.replace(tzinfo=None) if date.tzinfo else date
+
+
+async def cluster_new_posts(db_manager, limit=None, threshold=DEDUP_THRESHOLD, window_hours=DEDUP_WINDOW_HOURS):
+    """
+    Считает подписи новых постов и относит их к сюжетам
+
+    Args:
+        db_manager: AsyncDatabaseManager
+        limit: максимальное количество постов за вызов
+        threshold: минимальная оценка Жаккара для попадания в сюжет
+        window_hours: в пределах скольких часов посты считаются одним сюжетом
+
+    Returns:
+        tuple: (обработано постов, из них попало в существующие сюжеты) или None при ошибке записи
+    """
+    posts = await db_manager.get_posts_without_fingerprint(limit)
+    if not posts:
+        return 0, 0
+
+    signatures = {post['id']: minhash(post['content']) for post in posts}
+    bands = {post_id: lsh_bands(signature) for post_id, signature in signatures.items()}
+    window = datetime.timedelta(hours=window_hours)
+    oldest = min(_naive(post['date_published']) for post in posts) - window
+
+    # Кандидаты из уже проиндексированных постов
+    index: Dict[Tuple[int, int], set] = defaultdict(set)
+    known: Dict[int, Tuple[List[int], int, datetime.datetime]] = {}
+    all_bands = {band for post_bands in bands.values() for band in post_bands}
+    for row in await db_manager.find_lsh_candidates(list(all_bands), oldest):
+        index[(row['band'], row['band_hash'])].add(row['post_id'])
+        known[row['post_id']] = (row['signature'], row['cluster_id'] or row['post_id'], _naive(row['date_published']))
+
+    fingerprints = []
+    duplicates = 0
+    for post in posts:
+        post_id = post['id']
+        signature = signatures[post_id]
+        published = _naive(post['date_published'])
+
+        # Пост без слов (только эмодзи или знаки) не сравним с другими: отдельный сюжет
+        if not signature:
+            fingerprints.append((post_id, signature, post_id, []))
+            continue
+
+        best_id, best_score = None, threshold
+        candidates = set().union(*(index[band] for band in bands[post_id]))
+        for candidate_id in candidates:
+            candidate_signature, _, candidate_published = known[candidate_id]
+            if abs(published - candidate_published) > window:
+                continue
+            score = similarity(signature, candidate_signature)
+            if score >= best_score:
+                best_id, best_score = candidate_id, score
+
+        cluster_id = known[best_id][1] if best_id else post_id
+        if best_id:
+            duplicates += 1
+            logger.debug(f"Пост {post_id} — дубликат поста {best_id} (сходство {best_score:.2f}), сюжет {cluster_id}")
+
+        # Пост сразу участвует в поиске для следующих постов той же пачки
+        known[post_id] = (signature, cluster_id, published)
+        for band in bands[post_id]:
+            index[band].add(post_id)
+        fingerprints.append((post_id, signature, cluster_id, bands[post_id]))
+
+    if not await db_manager.save_post_fingerprints(fingerprints):
+        return None
+    logger.info(f"Сюжеты: обработано {len(fingerprints)} постов, дубликатов {duplicates}")
+    return len(fingerprints), duplicates
@@ -0,0 +1,266 @@
+"""
+Оценка важности и тематики текстов по ключевым словам
+
+Словарь компилируется один раз в автомат Ахо–Корасик: все ключевые слова
+ищутся за один проход независимо от их числа. Текст разбивается на слова
+регулярным выражением, и автомат проходит только по словам, которых движок
+еще не видел, — новостная лексика повторяется, поэтому большинство слов
+берется из кэша. Ключевое слово совпадает, если оно встречается в тексте
+как подстрока (основы вроде "гостиниц", "авиакомпан"), а слово с окончанием
+("виза", "отель", "россия") совпадает еще и в других падежах и числах:
+"визы", "отелей", "россии". Ключевые фразы из нескольких слов ищутся
+отдельным автоматом по всему тексту.
+"""
+
+import json
+import logging
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from config import KEYWORDS_PATH
+
+logger = logging.getLogger(__name__)
+
+# Вес ключевого слова — важность текста (1-10), в котором оно встретилось
+DEFAULT_WEIGHTS = {
+    'авиа': 8, 'рейс': 8, 'аэропорт': 7, 'билет': 7, 'самолет': 7, 'авиакомпан': 8,
+    'отель': 9, 'гостиниц': 9, 'размещен': 8, 'бронирован': 8, 'номер': 7,
+    'туризм': 8, 'путешеств': 8, 'турист': 7, 'поездк': 7, 'отдых': 6,
+    'виза': 9, 'безвизов': 9, 'граница': 8, 'паспорт': 7, 'въезд': 8, 'выезд': 7,
+    'цена': 7, 'тариф': 7, 'скидка': 6, 'стоимост': 7, 'дорог': 6, 'дешев': 6,
+    'новый': 6, 'открыт': 7, 'запрет': 9, 'ограничен': 8, 'закрыт': 8,
+    'россия': 8, 'российск': 8, 'турция': 7, 'китай': 7, 'европа': 7, 'сша': 7,
+    'covid': 8, 'пандем': 8, 'карантин': 8, 'вакцин': 7, 'тест': 6,
+    'санкц': 9, 'блокир': 8, 'запрещ': 8, 'приостанов': 8
+}
+
+# Темы в порядке приоритета: тексту назначается первая тема с совпадением
+DEFAULT_TOPICS = {
+    'aviation': ['авиа', 'рейс', 'аэропорт', 'билет', 'самолет', 'авиакомпан'],
+    'hotels': ['отель', 'гостиниц', 'размещен', 'бронирован'],
+    'visa': ['виза', 'безвизов', 'граница', 'паспорт', 'въезд'],
+}
+
+DEFAULT_SCORE = 5.0
+
+# Окончания существительных, прилагательных и глаголов, после которых
+# слово словаря считается совпавшим в другой форме
+ENDINGS = {
+    '', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+    'ой', 'ей', 'ий', 'ый', 'ая', 'яя', 'ое', 'ее', 'ие', 'ые', 'ом', 'ем', 'ам', 'ям',
+    'ах', 'ях', 'ов', 'ев', 'ую', 'юю', 'ым', 'им', 'ых', 'их', 'ою', 'ею', 'ью',
+    'ами', 'ями', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ия', 'ии', 'ию', 'ией', 'иям', 'иях'
+}
+# Существительные на -й после гласной (китай, музей, трамвай) склоняются
+# со своими окончаниями: "китая", "китаю", но не "кита" и не "китов"
+NOUN_J_ENDINGS = {'й', 'я', 'ю', 'е', 'ем', 'и', 'ев', 'ям', 'ями', 'ях'}
+_NOUN_J = re.compile(r'[аеуэюя]й$')
+_MIN_STEM = 3
+_WORD = re.compile(r'\w+')
+# Сколько слов помнит кэш совпадений, прежде чем очиститься
+_WORD_CACHE_SIZE = 200000
+
+
+def normalize(text: str) -> str:
+    """Нижний регистр и "ё" → "е" """
+    return (text or '').lower().replace('ё', 'е')
+
+
+def stem(word: str) -> str:
+    """Основа слова: без самого длинного окончания из ENDINGS, не короче трех букв"""
+    if _NOUN_J.search(word) and len(word) > _MIN_STEM:
+        return word[:-1]
+    for size in (3, 2, 1):
+        if len(word) - size >= _MIN_STEM and word[-size:] in ENDINGS:
+            return word[:-size]
+    return word
+
+
+def endings(word: str) -> Set[str]:
+    """Окончания, с которыми основа stem(word) считается формой слова"""
+    return NOUN_J_ENDINGS if _NOUN_J.search(word) else ENDINGS
+
+
+class AhoCorasick:
+    """Автомат Ахо–Корасик: все вхождения набора строк за один проход по тексту"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        state = 0
+        for char in pattern:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._output[state].append(len(self.patterns))
+        self.patterns.append(pattern)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def iter(self, text: str) -> Iterable[Tuple[int, int]]:
+        """Пары (позиция конца вхождения, номер строки)"""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_id in output[state]:
+                yield position + 1, pattern_id
+
+
+@dataclass
+class KeywordMatch:
+    """Результат оценки текста"""
+    score: float = DEFAULT_SCORE
+    topic: Optional[str] = None
+    topics: List[str] = field(default_factory=list)
+    keywords: List[str] = field(default_factory=list)
+
+
+class KeywordEngine:
+    """
+    Оценка важности и тематики по словарю ключевых слов
+
+    Пример:
+        engine = KeywordEngine()
+        match = engine.score("Новые рейсы в Турцию")
+        match.score, match.topic  # 8, 'aviation'
+    """
+
+    def __init__(self, weights: Dict[str, float] = None, topics: Dict[str, Sequence[str]] = None,
+                 default_score: float = DEFAULT_SCORE):
+        """
+        Args:
+            weights: {ключевое слово: важность}
+            topics: {тема: ключевые слова} в порядке приоритета
+            default_score: важность текста без совпадений
+        """
+        self.weights = {normalize(keyword): weight for keyword, weight in (weights or DEFAULT_WEIGHTS).items()}
+        self.topics = {topic: [normalize(keyword) for keyword in keywords]
+                       for topic, keywords in (topics or DEFAULT_TOPICS).items()}
+        self.default_score = default_score
+        self._topic_order = {topic: i for i, topic in enumerate(self.topics)}
+
+        keywords = set(self.weights)
+        for topic_keywords in self.topics.values():
+            keywords.update(topic_keywords)
+        self._keyword_topics: Dict[str, List[str]] = {keyword: [] for keyword in keywords}
+        for topic, topic_keywords in self.topics.items():
+            for keyword in topic_keywords:
+                self._keyword_topics[keyword].append(topic)
+
+        # Образцы автомата: само слово (вхождение в любом месте) и основа
+        # слова с окончанием (вхождение в начале слова с допустимым окончанием)
+        patterns = []
+        phrases = []
+        for keyword in sorted(keywords):
+            if _WORD.fullmatch(keyword):
+                patterns.append((keyword, keyword, None))
+                keyword_stem = stem(keyword)
+                if keyword_stem != keyword:
+                    patterns.append((keyword_stem, keyword, endings(keyword)))
+            else:
+                phrases.append(keyword)
+        self._pattern_keywords = [(keyword, keyword_endings) for _, keyword, keyword_endings in patterns]
+        self._automaton = AhoCorasick(pattern for pattern, _, _ in patterns)
+        self._phrases = AhoCorasick(phrases) if phrases else None
+        self._word_cache: Dict[str, Tuple[str, ...]] = {}
+
+    @classmethod
+    def from_file(cls, path: str) -> 'KeywordEngine':
+        """Словарь из JSON-файла {"weights": {...}, "topics": {...}}"""
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data.get('weights'), data.get('topics'), data.get('default_score', DEFAULT_SCORE))
+
+    def _word_keywords(self, word: str) -> Tuple[str, ...]:
+        """Ключевые слова, совпавшие со словом текста"""
+        keywords = self._word_cache.get(word)
+        if keywords is None:
+            found = set()
+            for end, pattern_id in self._automaton.iter(word):
+                keyword, keyword_endings = self._pattern_keywords[pattern_id]
+                # Основа совпадает только в начале слова и только с окончанием
+                if keyword_endings is not None and (end != len(self._automaton.patterns[pattern_id])
+                                                    or word[end:] not in keyword_endings):
+                    continue
+                found.add(keyword)
+            keywords = tuple(found)
+            if len(self._word_cache) >= _WORD_CACHE_SIZE:
+                self._word_cache.clear()
+            self._word_cache[word] = keywords
+        return keywords
+
+    def _match(self, keywords: Iterable[str]) -> KeywordMatch:
+        keywords = sorted(set(keywords))
+        match = KeywordMatch(score=self.default_score, keywords=keywords)
+        for keyword in keywords:
+            if keyword in self.weights:
+                match.score = max(match.score, self.weights[keyword])
+        match.topics = sorted({topic for keyword in keywords for topic in self._keyword_topics[keyword]},
+                              key=self._topic_order.get)
+        match.topic = match.topics[0] if match.topics else None
+        return match
+
+    def score_batch(self, texts: Sequence[str]) -> List[KeywordMatch]:
+        """
+        Оценивает пачку текстов
+
+        Args:
+            texts: тексты
+
+        Returns:
+            list: KeywordMatch для каждого текста в том же порядке
+        """
+        results = []
+        for text in texts:
+            text = normalize(text)
+            found = set()
+            for word in set(_WORD.findall(text)):
+                found.update(self._word_keywords(word))
+            if self._phrases:
+                found.update(self._phrases.patterns[pattern_id] for _, pattern_id in self._phrases.iter(text))
+            results.append(self._match(found))
+        return results
+
+    def score(self, text: str) -> KeywordMatch:
+        """Оценивает один текст"""
+        return self.score_batch([text])[0]
+
+
+_engine: Optional[KeywordEngine] = None
+
+
+def get_engine() -> KeywordEngine:
+    """Общий для процесса движок: словарь из KEYWORDS_PATH или встроенный"""
+    global _engine
+    if _engine is None:
+        if KEYWORDS_PATH:
+            _engine = KeywordEngine.from_file(KEYWORDS_PATH)
+            logger.info(f"Словарь ключевых слов загружен из {KEYWORDS_PATH}")
+        else:
+            _engine = KeywordEngine()
+    return _engine
@@ -0,0 +1,186 @@
+"""
+Кэш ответов LLM по содержимому запроса
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config import AISettings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+# Сколько попаданий копится в памяти до записи счетчиков в llm_cache
+HIT_FLUSH_SIZE = 100
+
+
+def normalize_content(text: str) -> str:
+    """Нормализация текста для ключа: Unicode NFKC и схлопнутые пробелы"""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', text or '')).strip()
+
+
+def make_cache_key(provider: str, model: str, temperature: float, prompt: str, content: str) -> str:
+    """sha256 от провайдера, модели, температуры, промпта и нормализованного текста"""
+    payload = json.dumps(
+        [provider, model, temperature, normalize_content(prompt), normalize_content(content)],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """
+    Кэш успешных ответов LLM: LRU в памяти процесса перед таблицей llm_cache
+
+    Одинаковый текст (репосты одной новости в разных каналах, повторная
+    обработка после сбоя) отправляется в API один раз: ответ берется из
+    кэша, а одновременные запросы с одним ключом ждут первый из них.
+    """
+
+    def __init__(self, db_manager=None, ttl_hours: float = AISettings.CACHE_TTL_HOURS,
+                 lru_size: int = AISettings.CACHE_LRU_SIZE):
+        """
+        Args:
+            db_manager: AsyncDatabaseManager или None (только кэш в памяти)
+            ttl_hours: срок хранения ответа (0 — бессрочно)
+            lru_size: размер LRU в памяти (0 — без LRU)
+        """
+        self.db = db_manager
+        self.ttl_seconds = ttl_hours * 3600 if ttl_hours else None
+        self.lru_size = lru_size
+        self.stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'coalesced': 0, 'stores': 0}
+        self._lru: OrderedDict = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._hits: Counter = Counter()
+
+    def _remember(self, key: str, result: Dict[str, Any], ttl: Optional[float]):
+        if not self.lru_size:
+            return
+        self._lru[key] = (result, time.monotonic() + ttl if ttl is not None else None)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Ответ из LRU в памяти или None"""
+        entry = self._lru.get(key)
+        if entry:
+            result, expires = entry
+            if expires is None or expires > time.monotonic():
+                self._lru.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                self._count_hit(key)
+                return result
+            del self._lru[key]
+        return None
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Ответ из кэша в формате анализатора или None"""
+        result = self._lookup(key)
+        if result:
+            await self._flush_if_full()
+            return result
+
+        if self.db:
+            row = await self.db.get_llm_cache(key)
+            if row:
+                result = {
+                    "status": "success",
+                    "analysis_text": row['response_text'],
+                    "usage": row['usage'] or {},
+                    "cached": True
+                }
+                self._remember(key, result, float(row['ttl']) if row['ttl'] is not None else None)
+                self.stats['db_hits'] += 1
+                self._count_hit(key)
+                await self._flush_if_full()
+                return result
+        return None
+
+    def _count_hit(self, key: str):
+        if self.db:
+            self._hits[key] += 1
+
+    async def _flush_if_full(self):
+        if sum(self._hits.values()) >= HIT_FLUSH_SIZE:
+            await self.flush_hits()
+
+    async def flush_hits(self):
+        """Записывает накопленные счетчики попаданий в llm_cache одним запросом"""
+        if self.db and self._hits:
+            hits, self._hits = dict(self._hits), Counter()
+            await self.db.record_llm_cache_hits(hits)
+
+    async def put(self, key: str, provider: str, model: str, result: Dict[str, Any]):
+        """Сохраняет успешный ответ анализатора"""
+        cached = dict(result, cached=True)
+        self._remember(key, cached, self.ttl_seconds)
+        if self.db:
+            await self.db.save_llm_cache(key, provider, model, result.get("analysis_text", ""),
+                                         result.get("usage"), self.ttl_seconds)
+        self.stats['stores'] += 1
+
+    async def get_or_call(self, provider: str, model: str, temperature: float, prompt: str, content: str,
+                          request: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Ответ из кэша или результат request() с сохранением в кэш
+
+        Args:
+            provider: имя провайдера ('eliza', 'zeliboba')
+            model: модель
+            temperature: температура
+            prompt: промпт (или имя операции, если промпт задает API)
+            content: текст запроса
+            request: функция без аргументов, возвращающая корутину запроса к API
+
+        Returns:
+            dict: ответ анализатора; у ответов из кэша "cached": True
+        """
+        key = make_cache_key(provider, model, temperature, prompt, content)
+
+        cached = await self.get(key)
+        if cached:
+            return cached
+        # Пока ответ искался в БД, первый запрос с этим ключом мог завершиться
+        cached = self._lookup(key)
+        if cached:
+            return cached
+
+        pending = self._pending.get(key)
+        if pending:
+            self.stats['coalesced'] += 1
+            shared = await asyncio.shield(pending)
+            if shared is not None:
+                return shared
+            # Первый запрос завершился ошибкой: повторяем, одновременные повторы снова объединяются
+            return await self.get_or_call(provider, model, temperature, prompt, content, request)
+
+        self.stats['misses'] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        shared = None
+        try:
+            result = await request()
+            if result and result.get("status") == "success" and result.get("analysis_text"):
+                await self.put(key, provider, model, result)
+                shared = dict(result, cached=True)
+            return result
+        finally:
+            del self._pending[key]
+            # Ожидающим передается только сохраненный в кэш успешный ответ
+            future.set_result(shared)
+
+    def get_summary(self) -> str:
+        """Сводка попаданий в кэш"""
+        hits = self.stats['memory_hits'] + self.stats['db_hits'] + self.stats['coalesced']
+        total = hits + self.stats['misses']
+        rate = hits / total * 100 if total else 0.0
+        return (f"LLM кэш: попаданий {hits} из {total} ({rate:.1f}%; память {self.stats['memory_hits']}, "
+                f"БД {self.stats['db_hits']}, ожидание {self.stats['coalesced']}), промахов {self.stats['misses']}")
@@ -0,0 +1,194 @@
+"""
+Параллельные запросы к LLM в пределах квот провайдера
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from config import AISettings
+
+logger = logging.getLogger(__name__)
+
+# Коды ответа, после которых запрос имеет смысл повторить
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+# Грубая оценка токенов по длине текста (кириллица дробится сильнее латиницы)
+CHARS_PER_TOKEN = 3
+
+
+def estimate_tokens(text: str, max_tokens: int = 0) -> int:
+    """Оценка расхода токенов запроса: промпт плюс максимальный ответ"""
+    return len(text) // CHARS_PER_TOKEN + max_tokens
+
+
+def _field(result, name):
+    """Поле ответа анализатора: словарь или объект результата"""
+    if isinstance(result, dict):
+        return result.get(name)
+    return getattr(result, name, None)
+
+
+def is_retryable(result) -> bool:
+    """Можно ли повторить неуспешный запрос (429, 5xx, сетевая ошибка)"""
+    if result is None or _field(result, 'status') == 'success':
+        return False
+    return bool(_field(result, 'retryable')) or _field(result, 'status_code') in RETRY_STATUSES
+
+
+class TokenBucket:
+    """Корзина токенов: пополняется на per_minute единиц в минуту, вмещает не больше capacity"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        # Ожидающие обслуживаются по очереди, иначе крупные запросы голодали бы
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1):
+        """Ждет, пока в корзине наберется amount единиц, и списывает их"""
+        # Запрос больше корзины иначе не дождался бы никогда
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, amount: float):
+        """Возвращает (amount > 0) или доначисляет (amount < 0) единицы по фактическому расходу"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class ProviderLimiter:
+    """
+    Квоты одного провайдера LLM: запросы в минуту, токены в минуту и число
+    одновременных запросов, плюс повторы с экспоненциальной задержкой при
+    429/5xx и сетевых ошибках
+    """
+
+    def __init__(self, name: str, requests_per_minute: int = 0, tokens_per_minute: int = 0,
+                 max_concurrency: int = 8, max_retries: int = AISettings.MAX_RETRIES,
+                 backoff_base: float = AISettings.BACKOFF_BASE, backoff_max: float = AISettings.BACKOFF_MAX):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = {'requests': 0, 'retries': 0, 'errors': 0, 'tokens': 0}
+        self._in_flight = asyncio.Semaphore(self.max_concurrency)
+
+    @classmethod
+    def from_settings(cls, name: str, settings: Dict[str, Any]) -> 'ProviderLimiter':
+        """Лимитер по настройкам провайдера из AISettings"""
+        return cls(
+            name,
+            requests_per_minute=settings.get('requests_per_minute', 0),
+            tokens_per_minute=settings.get('tokens_per_minute', 0),
+            max_concurrency=settings.get('max_concurrency', 8),
+        )
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        delay *= random.uniform(0.5, 1.0)
+        return max(delay, retry_after or 0)
+
+    async def call(self, request: Callable[[], Awaitable[Any]], estimated_tokens: int = 0):
+        """
+        Выполняет запрос к провайдеру в пределах квот
+
+        Args:
+            request: функция без аргументов, возвращающая корутину запроса
+                     (например, lambda: analyzer.create_summary(text))
+            estimated_tokens: оценка токенов запроса (estimate_tokens)
+
+        Returns:
+            Ответ анализатора последней попытки
+        """
+        result = None
+        for attempt in range(self.max_retries + 1):
+            if self.requests:
+                await self.requests.acquire(1)
+            if self.tokens:
+                await self.tokens.acquire(estimated_tokens)
+            async with self._in_flight:
+                result = await request()
+            self.stats['requests'] += 1
+
+            usage = _field(result, 'usage') or {}
+            used = usage.get('total_tokens') if isinstance(usage, dict) else None
+            if used is not None:
+                self.stats['tokens'] += used
+                if self.tokens:
+                    self.tokens.adjust(estimated_tokens - used)
+
+            if not is_retryable(result) or attempt == self.max_retries:
+                break
+            delay = self._backoff(attempt, _field(result, 'retry_after'))
+            self.stats['retries'] += 1
+            logger.warning(f"{self.name}: {_field(result, 'error')}; повтор {attempt + 1}/{self.max_retries} "
+                           f"через {delay:.1f} сек")
+            await asyncio.sleep(delay)
+
+        if _field(result, 'status') != 'success':
+            self.stats['errors'] += 1
+        return result
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """
+    Общий лимитер провайдера ('eliza', 'zeliboba') для всего процесса
+
+    Квота провайдера одна на все вызывающие компоненты, поэтому лимитер
+    создается один раз по настройкам AISettings.
+    """
+    if provider not in _limiters:
+        _limiters[provider] = ProviderLimiter.from_settings(provider, getattr(AISettings, provider.upper()))
+    return _limiters[provider]
+
+
+async def run_pool(items: Iterable, worker: Callable[[Any], Awaitable[Any]], concurrency: int) -> List[Any]:
+    """
+    Обрабатывает items не более чем concurrency воркерами одновременно
+
+    worker сам записывает результат элемента, поэтому результаты сохраняются
+    по мере готовности, а не после обработки всего списка. Исключение одного
+    элемента не останавливает остальные.
+
+    Args:
+        items: элементы для обработки
+        worker: корутина-функция обработки элемента
+        concurrency: число воркеров
+
+    Returns:
+        list: результаты worker в порядке завершения (None для упавших элементов)
+    """
+    iterator = iter(items)
+    results = []
+
+    async def consume():
+        for item in iterator:
+            try:
+                results.append(await worker(item))
+            except Exception as e:
+                logger.error(f"Ошибка обработки элемента: {e}")
+                results.append(None)
+
+    await asyncio.gather(*(consume() for _ in range(max(1, concurrency))))
+    return results
@@ -181,28 +181,43 @@ class ExportStats:
         self.saved_to_file = 0
         self.errors = 0
         self.channels_processed = 0
+        self.metrics_refreshed = 0
         self.start_time = datetime.now()
     
     def add_message(self):
         """Увеличить счетчик обработанных сообщений"""
         self.total_messages += 1
     
-    def add_db_save(self):
+    def add_db_save(self, count: int = 1):
         """Увеличить счетчик сохраненных в БД"""
-        self.saved_to_db += 1
+        self.saved_to_db += count
     
     def add_file_save(self):
         """Увеличить счетчик сохраненных в файл"""
         self.saved_to_file += 1
     
-    def add_error(self):
+    def add_error(self, count: int = 1):
         """Увеличить счетчик ошибок"""
-        self.errors += 1
+        self.errors += count
+    
+    def add_metrics_refresh(self, count: int):
+        """Увеличить счетчик постов с обновленными метриками"""
+        self.metrics_refreshed += count
     
     def add_channel(self):
         """Увеличить счетчик обработанных каналов"""
         self.channels_processed += 1
     
+    def merge(self, other: 'ExportStats') -> 'ExportStats':
+        """Добавить счетчики другой статистики (например, отдельного канала)"""
+        self.total_messages += other.total_messages
+        self.saved_to_db += other.saved_to_db
+        self.saved_to_file += other.saved_to_file
+        self.errors += other.errors
+        self.channels_processed += other.channels_processed
+        self.metrics_refreshed += other.metrics_refreshed
+        return self
+    
     def get_duration(self) -> float:
         """Получить длительность экспорта в секундах"""
         return (datetime.now() - self.start_time).total_seconds()
@@ -216,6 +231,7 @@ class ExportStats:
 - Всего сообщений: {self.total_messages}
 - Сохранено в БД: {self.saved_to_db}
 - Сохранено в файлы: {self.saved_to_file}
+- Обновлено метрик постов: {self.metrics_refreshed}
 - Ошибок: {self.errors}
 - Время выполнения: {duration:.2f} сек
 - Скорость: {self.total_messages/duration:.2f} сообщений/сек
@@ -324,31 +340,14 @@ class ExportStats:
         Returns:
             tuple[str, float]: детальный анализ и оценка важности
         """
-        content_lower = content.lower()
-        
-        # Определяем важность на основе ключевых слов
-        importance_keywords = {
-            'авиа': 8, 'рейс': 8, 'аэропорт': 7, 'билет': 7, 'самолет': 7, 'авиакомпан': 8,
-            'отель': 9, 'гостиниц': 9, 'размещен': 8, 'бронирован': 8, 'номер': 7,
-            'туризм': 8, 'путешеств': 8, 'турист': 7, 'поездк': 7, 'отдых': 6,
-            'виза': 9, 'безвизов': 9, 'граница': 8, 'паспорт': 7, 'въезд': 8, 'выезд': 7,
-            'цена': 7, 'тариф': 7, 'скидка': 6, 'стоимост': 7, 'дорог': 6, 'дешев': 6,
-            'новый': 6, 'открыт': 7, 'запрет': 9, 'ограничен': 8, 'закрыт': 8,
-            'россия': 8, 'российск': 8, 'турция': 7, 'китай': 7, 'европа': 7, 'сша': 7,
-            'covid': 8, 'пандем': 8, 'карантин': 8, 'вакцин': 7, 'тест': 6,
-            'санкц': 9, 'блокир': 8, 'запрещ': 8, 'приостанов': 8
-        }
-        
-        importance_score = 5.0
-        matched_keywords = []
+        from keyword_engine import get_engine
         
-        for keyword, score in importance_keywords.items():
-            if keyword in content_lower:
-                importance_score = max(importance_score, score)
-                matched_keywords.append(keyword)
+        # Важность и тематика по словарю ключевых слов (автомат компилируется один раз на процесс)
+        match = get_engine().score(content)
+        importance_score = match.score
         
         # Определяем тематику и создаем специализированный анализ
-        if any(kw in content_lower for kw in ['авиа', 'рейс', 'аэропорт', 'билет', 'самолет', 'авиакомпан']):
+        if match.topic == 'aviation':
             analysis_focus = 'авиационной отрасли'
             opportunities = """- Интеграция API новых авиакомпаний для расширения предложений
 - Создание специального раздела "Новые маршруты" с детальной информацией
@@ -374,7 +373,7 @@ class ExportStats:
             
             competitiveness = f"""Aviasales может получить преимущество благодаря более быстрой адаптации к изменениям, но у Яндекс Путешествий есть возможность обойти конкурентов за счет интеграции с экосистемой Яндекса и персонализированных рекомендаций на основе поисковых запросов пользователей"""
             
-        elif any(kw in content_lower for kw in ['отель', 'гостиниц', 'размещен', 'бронирован']):
+        elif match.topic == 'hotels':
             analysis_focus = 'гостиничной индустрии'
             opportunities = """- Расширение партнерской сети на 500+ новых отелей в регионе
 - Создание системы динамического ценообразования на основе спроса
@@ -400,7 +399,7 @@ class ExportStats:
             
             competitiveness = f"""Booking.com сохранит лидерство по количеству объектов, но Яндекс Путешествия может выиграть за счет лучшей локализации, интеграции с Яндекс.Картами и персонализированных предложений на основе истории поездок пользователя"""
             
-        elif any(kw in content_lower for kw in ['виза', 'безвизов', 'граница', 'паспорт', 'въезд']):
+        elif match.topic == 'visa':
             analysis_focus = 'визового режима и пересечения границ'
             opportunities = """- Создание интерактивной карты визовых требований с real-time обновлениями
 - Партнерство с визовыми центрами для онлайн-подачи документов
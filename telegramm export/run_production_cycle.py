@@ -16,7 +16,8 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from config import (TELEGRAM_API_ID, TELEGRAM_API_HASH, SESSION_PATH,
                    SUMMARY_CHANNEL_USERNAME)
-from database import DatabaseManager
+from async_database import AsyncDatabaseManager
+from models import ExportStats
 from telegram_publisher import TelegramPublisher
 
 # Настройка логирования
@@ -34,6 +35,7 @@ logger = logging.getLogger(__name__)
 try:
     from telethon import TelegramClient
     from telegram_chat_exporter import export_chat_history, get_entity_by_name_or_id
+    from channel_export import export_channels
 except ImportError as e:
     logger.error(f"Ошибка импорта: {e}")
     sys.exit(1)
@@ -62,13 +64,13 @@ class ProductionCycle:
             return False
         
         # Инициализация базы данных
-        self.db_manager = DatabaseManager()
+        self.db_manager = AsyncDatabaseManager()
         if not self.db_manager.connect():
             logger.error("Не удалось подключиться к базе данных")
             return False
         
         # Создаем таблицы если их нет
-        self.db_manager.create_tables()
+        await self.db_manager.create_tables()
         
         # Инициализация Telegram клиента
         session_path = os.path.join(os.path.dirname(__file__), SESSION_PATH)
@@ -92,44 +94,33 @@ class ProductionCycle:
         return True
     
     async def export_from_channels(self, channels_list):
-        """Экспорт постов из списка каналов за последние 24 часа"""
+        """Параллельный экспорт новых постов из списка каналов (первый запуск — за последние 24 часа)"""
         logger.info(f"Начинаем экспорт из {len(channels_list)} каналов")
         
-        total_exported = 0
+        stats = ExportStats()
+        results = await export_channels(
+            self.client,
+            channels_list,
+            export_chat_history,
+            get_entity_by_name_or_id,
+            stats,
+            limit=None,  # Без ограничения количества
+            output_file=None,  # Автоматическое имя файла
+            save_to_db=True,
+            db_manager=self.db_manager,
+            last_24_hours_only=True,  # Окно первого экспорта канала
+            incremental=True  # Дальше только новые сообщения с прошлого цикла
+        )
         
-        for channel_name in channels_list:
-            try:
-                logger.info(f"Экспорт из канала: {channel_name}")
-                
-                # Получаем entity канала
-                chat_entity = await get_entity_by_name_or_id(self.client, channel_name)
-                if not chat_entity:
-                    logger.warning(f"Канал {channel_name} не найден")
-                    continue
-                
-                # Экспортируем только за последние 24 часа (по умолчанию)
-                filename, stats = await export_chat_history(
-                    self.client,
-                    chat_entity,
-                    limit=None,  # Без ограничения количества
-                    output_file=None,  # Автоматическое имя файла
-                    save_to_db=True,
-                    db_manager=self.db_manager,
-                    last_24_hours_only=True  # Только за последние 24 часа
-                )
-                
-                if stats:
-                    logger.info(f"Канал {channel_name}: экспортировано {stats.saved_to_db} сообщений")
-                    total_exported += stats.saved_to_db
-                else:
-                    logger.warning(f"Не удалось экспортировать из канала {channel_name}")
-                    
-            except Exception as e:
-                logger.error(f"Ошибка экспорта из канала {channel_name}: {e}")
-                continue
+        for channel_name, channel_stats in results.items():
+            if channel_stats:
+                logger.info(f"Канал {channel_name}: экспортировано {channel_stats.saved_to_db} сообщений")
+            else:
+                logger.warning(f"Не удалось экспортировать из канала {channel_name}")
         
-        logger.info(f"Общий экспорт завершен. Всего экспортировано: {total_exported} сообщений")
-        return total_exported
+        logger.info(stats.get_summary())
+        logger.info(f"Общий экспорт завершен. Всего экспортировано: {stats.saved_to_db} сообщений")
+        return stats.saved_to_db
     
     async def analyze_new_posts(self, limit=None):
         """Анализ новых постов в базе данных"""
@@ -150,7 +141,7 @@ class ProductionCycle:
         
         try:
             # Получаем топ постов по метрикам
-            top_posts = self.db_manager.get_top_important_posts_for_publication(limit)
+            top_posts = await self.db_manager.get_top_important_posts_for_publication(limit)
             
             if not top_posts:
                 logger.info("Нет новостей для публикации")
@@ -167,7 +158,7 @@ class ProductionCycle:
                     }
                     
                     # Получаем анализ поста из базы
-                    analysis = self.db_manager.get_post_analysis(row['id'])
+                    analysis = await self.db_manager.get_post_analysis(row['id'])
                     if not analysis:
                         logger.warning(f"Анализ для поста {row['id']} не найден")
                         continue
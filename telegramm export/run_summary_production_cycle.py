@@ -16,10 +16,14 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from config import (TELEGRAM_API_ID, TELEGRAM_API_HASH, SESSION_PATH,
                    ZELIBOBA_API_TOKEN, SUMMARY_CHANNEL_USERNAME,
-                   ZELIBOBA_ANALYSIS_PROMPT, ZELIBOBA_MODEL_NAME, ZELIBOBA_TEMPERATURE)
-from database import DatabaseManager
+                   ZELIBOBA_ANALYSIS_PROMPT, ZELIBOBA_MODEL_NAME, ZELIBOBA_TEMPERATURE,
+                   AISettings)
+from async_database import AsyncDatabaseManager
 from telegram_publisher import TelegramPublisher
 from models import ZelibobaAnalyzer
+from llm_pool import estimate_tokens, get_limiter, run_pool
+from llm_cache import LLMCache
+from batch_prompting import BatchPrompter, format_analysis
 
 # Настройка логирования
 logging.basicConfig(
@@ -35,7 +39,9 @@ logger = logging.getLogger(__name__)
 # Импорт Telethon
 try:
     from telethon import TelegramClient
-    from telegram_summary_exporter import export_chat_with_summaries, get_entity_by_name_or_id
+    from telegram_summary_exporter import (export_chat_with_summaries, get_entity_by_name_or_id,
+                                           SummaryExportStats)
+    from channel_export import export_channels
 except ImportError as e:
     logger.error(f"Ошибка импорта: {e}")
     sys.exit(1)
@@ -48,6 +54,7 @@ class SummaryProductionCycle:
         self.db_manager = None
         self.publisher = None
         self.analyzer = None
+        self.llm_cache = None
         
     async def initialize(self):
         """Инициализация всех компонентов"""
@@ -67,13 +74,16 @@ class SummaryProductionCycle:
             return False
         
         # Инициализация базы данных
-        self.db_manager = DatabaseManager()
+        self.db_manager = AsyncDatabaseManager()
         if not self.db_manager.connect():
             logger.error("Не удалось подключиться к базе данных")
             return False
         
         # Создаем таблицы если их нет
-        self.db_manager.create_tables()
+        await self.db_manager.create_tables()
+        
+        # Общий для всех каналов кэш саммари: репост новости не суммаризуется повторно
+        self.llm_cache = LLMCache(self.db_manager)
         
         # Инициализация Telegram клиента
         session_path = os.path.join(os.path.dirname(__file__), SESSION_PATH + "_summary")
@@ -103,53 +113,50 @@ class SummaryProductionCycle:
         return True
     
     async def export_summaries_from_channels(self, channels_list):
-        """Экспорт постов из списка каналов с созданием саммари за последние 24 часа"""
+        """Параллельный экспорт постов из списка каналов с созданием саммари за последние 24 часа"""
         logger.info(f"Начинаем экспорт с созданием саммари из {len(channels_list)} каналов")
         
-        total_summaries_created = 0
-        
-        for channel_name in channels_list:
-            try:
-                logger.info(f"Экспорт с созданием саммари из канала: {channel_name}")
-                
-                # Получаем entity канала
-                chat_entity = await get_entity_by_name_or_id(self.client, channel_name)
-                if not chat_entity:
-                    logger.warning(f"Канал {channel_name} не найден")
-                    continue
-                
-                # Экспортируем только за последние 24 часа с созданием саммари
-                filename, stats = await export_chat_with_summaries(
-                    self.client,
-                    chat_entity,
-                    limit=None,  # Без ограничения количества
-                    output_file=None,  # Автоматическое имя файла
-                    save_to_db=True,
-                    db_manager=self.db_manager,
-                    last_24_hours_only=True  # Только за последние 24 часа
-                )
-                
-                if stats:
-                    summaries_count = getattr(stats, 'summaries_created', 0)
-                    logger.info(f"Канал {channel_name}: создано {summaries_count} саммари")
-                    total_summaries_created += summaries_count
-                else:
-                    logger.warning(f"Не удалось экспортировать из канала {channel_name}")
-                    
-            except Exception as e:
-                logger.error(f"Ошибка экспорта из канала {channel_name}: {e}")
-                continue
+        stats = SummaryExportStats()
+        results = await export_channels(
+            self.client,
+            channels_list,
+            export_chat_with_summaries,
+            get_entity_by_name_or_id,
+            stats,
+            limit=None,  # Без ограничения количества
+            output_file=None,  # Автоматическое имя файла
+            save_to_db=True,
+            db_manager=self.db_manager,
+            last_24_hours_only=True,  # Только за последние 24 часа
+            llm_cache=self.llm_cache
+        )
         
-        logger.info(f"Общий экспорт завершен. Всего создано саммари: {total_summaries_created}")
-        return total_summaries_created
+        for channel_name, channel_stats in results.items():
+            if channel_stats:
+                logger.info(f"Канал {channel_name}: создано {channel_stats.summaries_created} саммари")
+            else:
+                logger.warning(f"Не удалось экспортировать из канала {channel_name}")
+        
+        logger.info(stats.get_summary())
+        await self.llm_cache.flush_hits()
+        logger.info(self.llm_cache.get_summary())
+        logger.info(f"Общий экспорт завершен. Всего создано саммари: {stats.summaries_created}")
+        return stats.summaries_created
     
-    async def analyze_summaries(self, limit=None, use_keyword_analysis=True):
-        """Анализ саммари для определения важности (Zeliboba API + анализ по ключевым словам)"""
+    async def analyze_summaries(self, limit=None, use_keyword_analysis=True, batch_size=AISettings.BATCH_MAX_POSTS):
+        """
+        Анализ саммари для определения важности (Zeliboba API + анализ по ключевым словам)
+        
+        Args:
+            limit: максимальное количество саммари
+            use_keyword_analysis: оценивать по ключевым словам, если API не ответил
+            batch_size: саммари в одном запросе к Zeliboba (1 — по одному на запрос)
+        """
         logger.info("Начинаем анализ саммари для определения важности")
         
         try:
             # Получаем саммари без анализа важности
-            summaries = self.db_manager.get_summaries_without_analysis(limit)
+            summaries = await self.db_manager.get_summaries_without_analysis(limit)
             
             if not summaries:
                 logger.info("Нет новых саммари для анализа")
@@ -157,17 +164,19 @@ class SummaryProductionCycle:
             
             logger.info(f"Найдено {len(summaries)} саммари для анализа")
             
-            success_count = 0
-            error_count = 0
+            # Запросы идут параллельно в пределах квот Zeliboba вместо фиксированных пауз
+            limiter = get_limiter('zeliboba')
+            max_tokens = AISettings.ZELIBOBA['max_tokens']
             
-            for i, summary in enumerate(summaries, 1):
+            async def analyze_one(numbered_summary):
+                i, summary = numbered_summary
                 try:
                     logger.info(f"Анализируем саммари {i}/{len(summaries)} (ID: {summary['id']})")
                     
                     # Проверяем, что у саммари есть контент
                     if not summary['summary'] or not summary['summary'].strip():
                         logger.warning(f"Саммари {summary['id']} не содержит текста, пропускаем")
-                        continue
+                        return None
                     
                     analysis_text = None
                     importance_score = 5.0
@@ -176,7 +185,10 @@ class SummaryProductionCycle:
                     # Сначала пробуем Zeliboba API
                     try:
                         logger.info(f"Пробуем анализ через Zeliboba API для саммари {summary['id']}")
-                        analysis_result = await self.analyzer.analyze_post_summary(summary['summary'])
+                        analysis_result = await limiter.call(
+                            lambda: self.analyzer.analyze_post_summary(summary['summary']),
+                            estimate_tokens((ZELIBOBA_ANALYSIS_PROMPT or '') + summary['summary'], max_tokens)
+                        )
                         
                         if analysis_result and analysis_result.status == "success":
                             analysis_text = analysis_result.analysis
@@ -206,30 +218,81 @@ class SummaryProductionCycle:
                         except Exception as keyword_error:
                             logger.error(f"❌ Ошибка анализа по ключевым словам для саммари {summary['id']}: {keyword_error}")
                     
-                    # Сохраняем результат анализа
+                    # Сохраняем результат анализа сразу по готовности
                     if analysis_successful and analysis_text:
-                        success = self.db_manager.update_summary_analysis(
+                        success = await self.db_manager.update_summary_analysis(
                             summary_id=summary['id'],
                             analysis=analysis_text,
                             importance_score=importance_score
                         )
                         
                         if success:
-                            success_count += 1
                             logger.info(f"✅ Анализ успешно сохранен для саммари {summary['id']}")
-                        else:
-                            logger.error(f"❌ Не удалось сохранить анализ для саммари {summary['id']}")
-                            error_count += 1
+                            return True
+                        logger.error(f"❌ Не удалось сохранить анализ для саммари {summary['id']}")
                     else:
                         logger.error(f"❌ Не удалось проанализировать саммари {summary['id']}")
-                        error_count += 1
-                    
-                    # Пауза между анализами
-                    await asyncio.sleep(0.5)
                     
                 except Exception as e:
                     logger.error(f"❌ Ошибка при анализе саммари {summary['id']}: {e}")
-                    error_count += 1
+                return False
+            
+            numbered_summaries = list(enumerate(summaries, 1))
+            if batch_size > 1:
+                # Оценка важности пакетами саммари; не разобранные в пакете анализируются по одному
+                prompter = BatchPrompter(
+                    # Ответ на пакет длиннее ответа на одно саммари: лимит растет с размером пакета
+                    lambda batch_prompt, content, batch_tokens: limiter.call(
+                        lambda: self.analyzer.analyze_content(content, batch_prompt,
+                                                              max_tokens=max(batch_tokens, max_tokens)),
+                        estimate_tokens(batch_prompt + content, max(batch_tokens, max_tokens))
+                    ),
+                    ZELIBOBA_ANALYSIS_PROMPT or '', 'zeliboba', ZELIBOBA_MODEL_NAME, ZELIBOBA_TEMPERATURE,
+                    fields=('importance', 'analysis'), cache=self.llm_cache, max_items=batch_size
+                )
+                by_id = {summary['id']: (i, summary) for i, summary in numbered_summaries}
+                
+                async def analyze_batch(batch):
+                    try:
+                        batch_results = await prompter.run(batch)
+                    except Exception as e:
+                        # Сбой пакета не должен терять саммари: анализируем их по одному
+                        logger.error(f"❌ Ошибка пакетного анализа {len(batch)} саммари: {e}, анализируем по одному")
+                        batch_results = {}
+                    outcomes = []
+                    for summary_id, _ in batch:
+                        result = batch_results.get(summary_id)
+                        if not result:
+                            outcomes.append(await analyze_one(by_id[summary_id]))
+                            continue
+                        success = await self.db_manager.update_summary_analysis(
+                            summary_id=summary_id,
+                            analysis=format_analysis(result),
+                            importance_score=result['importance']
+                        )
+                        if success:
+                            logger.info(f"✅ Анализ из пакета сохранен для саммари {summary_id}, важность: {result['importance']:g}/10")
+                        else:
+                            logger.error(f"❌ Не удалось сохранить анализ для саммари {summary_id}")
+                        outcomes.append(success)
+                    return outcomes
+                
+                # Пустые саммари analyze_one пропускает сам, в пакеты они не попадают
+                items = [(summary['id'], summary['summary']) for _, summary in numbered_summaries
+                         if summary['summary'] and summary['summary'].strip()]
+                batches = prompter.pack(items)
+                logger.info(f"Пакетный анализ: {len(items)} саммари в {len(batches)} пакетах")
+                batch_outcomes = await run_pool(batches, analyze_batch, limiter.max_concurrency)
+                results = [outcome for outcomes in batch_outcomes if outcomes for outcome in outcomes]
+                batched_ids = {summary_id for summary_id, _ in items}
+                results += await run_pool([numbered_summary for numbered_summary in numbered_summaries
+                                           if numbered_summary[1]['id'] not in batched_ids],
+                                          analyze_one, limiter.max_concurrency)
+                logger.info(prompter.get_summary())
+            else:
+                results = await run_pool(numbered_summaries, analyze_one, limiter.max_concurrency)
+            success_count = results.count(True)
+            error_count = results.count(False)
             
             logger.info(f"Анализ завершен. Успешно: {success_count}, Ошибок: {error_count}")
             return success_count
@@ -244,7 +307,7 @@ class SummaryProductionCycle:
         
         try:
             # Получаем топ важных саммари за последние 24 часа
-            important_summaries = self.db_manager.get_top_important_summaries_for_publication(limit)
+            important_summaries = await self.db_manager.get_top_important_summaries_for_publication(limit)
             
             if not important_summaries:
                 logger.info("Нет важных саммари для публикации")
@@ -296,22 +359,19 @@ class SummaryProductionCycle:
         """Получение статистики работы с саммари"""
         try:
             # Статистика по саммари
-            self.db_manager.cursor.execute("SELECT COUNT(*) as total_summaries FROM post_summaries")
-            summaries_stats = self.db_manager.cursor.fetchone()
+            summaries_stats = await self.db_manager.fetchone("SELECT COUNT(*) as total_summaries FROM post_summaries")
             
             # Статистика по анализам саммари
-            self.db_manager.cursor.execute("""
+            analyzed_stats = await self.db_manager.fetchone("""
                 SELECT COUNT(*) as analyzed_summaries FROM zeliboba_analysis 
                 WHERE analysis_type = 'summary_importance' AND status = 'success'
             """)
-            analyzed_stats = self.db_manager.cursor.fetchone()
             
             # Саммари за последние 24 часа
-            self.db_manager.cursor.execute("""
+            recent_stats = await self.db_manager.fetchone("""
                 SELECT COUNT(*) as recent_summaries FROM post_summaries 
                 WHERE date_published >= NOW() - INTERVAL '24 hours'
             """)
-            recent_stats = self.db_manager.cursor.fetchone()
             
             logger.info("📊 Статистика работы с саммари:")
             logger.info(f"   Всего саммари: {summaries_stats['total_summaries']}")
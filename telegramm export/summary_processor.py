@@ -12,16 +12,21 @@ import sys
 import logging
 import re
 from datetime import datetime
-from database import DatabaseManager
+from async_database import AsyncDatabaseManager
 from ai_analyzers import ZelibobaAnalyzer, ElizaAnalyzer
 from models_optimized import MessageProcessor
-from config import AISettings
+from config import AISettings, KEYWORD_PREFILTER_MIN_SCORE
+from llm_pool import estimate_tokens, get_limiter, run_pool
+from llm_cache import LLMCache
+from dedup import cluster_new_posts
+from batch_prompting import BatchPrompter, format_analysis
+from keyword_engine import get_engine as get_keyword_engine
 
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler('summary_processor.log'),
+        logging.FileHandler('summary_processor.log', delay=True),
         logging.StreamHandler()
     ]
 )
@@ -29,7 +34,7 @@ logger = logging.getLogger(__name__)
 
 class PostSummaryProcessor:
     def __init__(self):
-        self.db = DatabaseManager()
+        self.db = AsyncDatabaseManager()
         if not self.db.connect():
             logger.error("Не удалось подключиться к базе данных")
             sys.exit(1)
@@ -57,6 +62,16 @@ class PostSummaryProcessor:
         if not self.zeliboba_analyzer and not self.eliza_analyzer:
             logger.error("Не настроены API токены для Zeliboba или Eliza")
             sys.exit(1)
+        
+        # Квоты провайдеров общие для процесса; воркеров столько, сколько запросов провайдеры принимают одновременно
+        self.eliza_limiter = get_limiter('eliza')
+        self.zeliboba_limiter = get_limiter('zeliboba')
+        # Повторяющийся текст (репосты, повторная обработка) не отправляется в API повторно
+        self.llm_cache = LLMCache(self.db)
+        self.concurrency = max(
+            self.eliza_limiter.max_concurrency if self.eliza_analyzer else 0,
+            self.zeliboba_limiter.max_concurrency if self.zeliboba_analyzer else 0
+        )
             
         logger.info(f"Инициализирован процессор саммари (Zeliboba: {AISettings.ZELIBOBA['model'] if self.zeliboba_analyzer else 'нет'}, Eliza: {AISettings.ELIZA['model'] if self.eliza_analyzer else 'нет'})")
 
@@ -110,11 +125,20 @@ class PostSummaryProcessor:
             # В случае ошибки возвращаем исходный текст
             return analysis_text[:200] + "..." if len(analysis_text) > 200 else analysis_text, analysis_text
     
-    async def process_posts_to_summaries(self, limit=None):
-        """Обрабатывает посты из таблицы posts и создает саммари"""
+    async def process_posts_to_summaries(self, limit=None, batch_size=AISettings.BATCH_MAX_POSTS):
+        """
+        Обрабатывает посты из таблицы posts и создает саммари
+        
+        Args:
+            limit: максимальное количество постов
+            batch_size: постов в одном запросе к Eliza (1 — по одному посту на запрос)
+        """
         logger.info("Поиск постов для создания саммари")
         
         try:
+            # Относим новые посты к сюжетам: саммари нужно только представителю сюжета
+            await cluster_new_posts(self.db)
+            
             # Получаем посты, для которых еще нет саммари
             query = """
                 SELECT p.* FROM posts p
@@ -123,14 +147,14 @@ class PostSummaryProcessor:
                 WHERE ps.id IS NULL
                 AND p.content IS NOT NULL
                 AND p.content != ''
+                AND (p.cluster_id IS NULL OR p.cluster_id = p.id)
                 ORDER BY p.date_published DESC
             """
             
             if limit:
                 query += f" LIMIT {limit}"
             
-            self.db.cursor.execute(query)
-            posts = self.db.cursor.fetchall()
+            posts = await self.db.fetchall(query)
             
             if not posts:
                 logger.info("Все посты уже имеют саммари")
@@ -138,29 +162,50 @@ class PostSummaryProcessor:
             
             logger.info(f"Найдено {len(posts)} постов для создания саммари")
             
-            success_count = 0
-            error_count = 0
+            # Бесплатный фильтр до LLM: посты без значимых ключевых слов не отправляются в API
+            if KEYWORD_PREFILTER_MIN_SCORE:
+                matches = get_keyword_engine().score_batch([post['content'] for post in posts])
+                relevant = [post for post, match in zip(posts, matches) if match.score >= KEYWORD_PREFILTER_MIN_SCORE]
+                logger.info(f"Фильтр по ключевым словам: {len(relevant)} из {len(posts)} постов с важностью "
+                            f"от {KEYWORD_PREFILTER_MIN_SCORE:g}")
+                posts = relevant
+                if not posts:
+                    return
+            
+            prompt = "Создай краткое саммари новости для Яндекс Путешествий"
             
-            for i, post in enumerate(posts, 1):
+            async def process_post(numbered_post):
+                i, post = numbered_post
                 try:
                     logger.info(f"Создаем саммари для поста {i}/{len(posts)} (ID: {post['id']})")
                     
                     # Проверяем длину контента
                     if len(post['content']) < 50:
                         logger.warning(f"Пост {post['id']} слишком короткий для саммари, пропускаем")
-                        continue
+                        return None
                     
-                    # Создаем саммари через Eliza или Zeliboba
+                    # Создаем саммари через Eliza или Zeliboba; паузы между запросами задают квоты провайдеров
                     summary_result = None
                     if self.eliza_analyzer:
-                        summary_result = await self.eliza_analyzer.analyze_content(
-                            content=post['content'],
-                            prompt="Создай краткое саммари новости для Яндекс Путешествий"
+                        summary_result = await self.llm_cache.get_or_call(
+                            'eliza', AISettings.ELIZA['model'], AISettings.ELIZA['temperature'],
+                            prompt, post['content'],
+                            lambda: self.eliza_limiter.call(
+                                lambda: self.eliza_analyzer.analyze_content(content=post['content'], prompt=prompt),
+                                estimate_tokens(prompt + post['content'], AISettings.ELIZA['max_tokens'])
+                            )
                         )
                     
                     # Если Eliza не сработал или не настроен, пробуем Zeliboba
                     if (not summary_result or summary_result.get("status") != "success") and self.zeliboba_analyzer:
-                        summary_result = await self.zeliboba_analyzer.create_summary(post['content'])
+                        summary_result = await self.llm_cache.get_or_call(
+                            'zeliboba', AISettings.ZELIBOBA['model'], AISettings.ZELIBOBA['temperature'],
+                            'summarize', post['content'],
+                            lambda: self.zeliboba_limiter.call(
+                                lambda: self.zeliboba_analyzer.create_summary(post['content']),
+                                estimate_tokens(post['content'], AISettings.ZELIBOBA['max_tokens'])
+                            )
+                        )
                     
                     if summary_result and summary_result.get("status") == "success":
                         analysis_text = summary_result.get("analysis_text", "")
@@ -169,8 +214,8 @@ class PostSummaryProcessor:
                             # Извлекаем главную мысль и саммари
                             main_idea, summary = self.extract_summary_parts(analysis_text)
                             
-                            # Сохраняем саммари и полный анализ в базу данных
-                            summary_id = self.db.save_post_summary(
+                            # Сохраняем саммари и полный анализ в базу данных сразу по готовности
+                            summary_id = await self.db.save_post_summary(
                                 channel_id=post['channel_id'],
                                 telegram_message_id=post['telegram_message_id'],
                                 sender_name=post['sender_name'],
@@ -186,53 +231,130 @@ class PostSummaryProcessor:
                             
                             if summary_id:
                                 logger.info(f"✅ Саммари успешно создано для поста {post['id']} (Summary ID: {summary_id})")
-                                success_count += 1
                                 
                                 # Показываем краткую информацию о созданном саммари
                                 logger.debug(f"Главная мысль: {main_idea[:100]}...")
                                 logger.debug(f"Саммари: {summary[:200]}...")
-                            else:
-                                logger.error(f"❌ Не удалось сохранить саммари для поста {post['id']}")
-                                error_count += 1
+                                return True
+                            logger.error(f"❌ Не удалось сохранить саммари для поста {post['id']}")
                         else:
                             logger.error(f"❌ Получен пустой ответ от GPT для поста {post['id']}")
-                            error_count += 1
                     else:
                         error_message = summary_result.get("error", "Неизвестная ошибка") if summary_result else "Нет ответа от API"
                         logger.error(f"❌ Ошибка создания саммари для поста {post['id']}: {error_message}")
-                        error_count += 1
-                    
-                    # Небольшая пауза между запросами
-                    await asyncio.sleep(1.0)
                     
                 except Exception as e:
                     logger.error(f"❌ Исключение при обработке поста {post['id']}: {e}")
-                    error_count += 1
+                return False
+            
+            numbered_posts = list(enumerate(posts, 1))
+            if self.eliza_analyzer and batch_size > 1:
+                results = await self.process_batches(numbered_posts, prompt, process_post, batch_size)
+            else:
+                results = await run_pool(numbered_posts, process_post, self.concurrency)
+            success_count = results.count(True)
+            error_count = results.count(False)
             
             logger.info(f"Обработка завершена. Успешно: {success_count}, Ошибок: {error_count}")
+            await self.llm_cache.flush_hits()
+            logger.info(self.llm_cache.get_summary())
             
         except Exception as e:
             logger.error(f"Ошибка при получении постов для обработки: {e}")
     
+    async def process_batches(self, numbered_posts, prompt, process_post, batch_size):
+        """
+        Создает саммари и оценку важности пакетами постов в одном запросе к Eliza
+        
+        Посты, для которых пакетный ответ не разобран, обрабатываются process_post
+        по одному. Оценка важности сохраняется сразу, поэтому такие саммари не
+        требуют отдельного запроса на анализ важности.
+        
+        Returns:
+            list: результаты по постам (True, False или None для пропущенных)
+        """
+        max_tokens = AISettings.ELIZA['max_tokens']
+        prompter = BatchPrompter(
+            lambda batch_prompt, content, batch_tokens: self.eliza_limiter.call(
+                lambda: self.eliza_analyzer.analyze_content(content=content, prompt=batch_prompt,
+                                                            max_tokens=max(batch_tokens, max_tokens)),
+                estimate_tokens(batch_prompt + content, max(batch_tokens, max_tokens))
+            ),
+            prompt, 'eliza', AISettings.ELIZA['model'], AISettings.ELIZA['temperature'],
+            cache=self.llm_cache, max_items=batch_size
+        )
+        
+        by_id = {post['id']: (i, post) for i, post in numbered_posts}
+        # Короткие посты process_post пропускает сам, в пакеты они не попадают
+        items = [(post['id'], post['content']) for _, post in numbered_posts if len(post['content']) >= 50]
+        short_posts = [numbered_post for numbered_post in numbered_posts if len(numbered_post[1]['content']) < 50]
+        
+        async def process_batch(batch):
+            try:
+                batch_results = await prompter.run(batch)
+            except Exception as e:
+                # Сбой пакета не должен терять посты: обрабатываем их по одному
+                logger.error(f"❌ Ошибка пакетной обработки {len(batch)} постов: {e}, обрабатываем по одному")
+                batch_results = {}
+            outcomes = []
+            for item_id, _ in batch:
+                i, post = by_id[item_id]
+                result = batch_results.get(item_id)
+                if not result:
+                    outcomes.append(await process_post((i, post)))
+                    continue
+                
+                logger.info(f"Саммари из пакета для поста {i}/{len(numbered_posts)} (ID: {post['id']})")
+                summary_id = await self.db.save_post_summary(
+                    channel_id=post['channel_id'],
+                    telegram_message_id=post['telegram_message_id'],
+                    sender_name=post['sender_name'],
+                    sender_id=post['sender_id'],
+                    summary=result['summary'],
+                    main_idea=result['main_idea'],
+                    date_published=post['date_published'],
+                    views_count=post['views_count'],
+                    forwards_count=post['forwards_count'],
+                    replies_count=post['replies_count']
+                )
+                if summary_id and await self.db.update_summary_analysis(
+                        summary_id=summary_id,
+                        analysis=format_analysis(result),
+                        importance_score=result['importance']):
+                    logger.info(f"✅ Саммари успешно создано для поста {post['id']} (Summary ID: {summary_id}, "
+                                f"важность: {result['importance']:g}/10)")
+                    outcomes.append(True)
+                else:
+                    logger.error(f"❌ Не удалось сохранить саммари для поста {post['id']}")
+                    outcomes.append(False)
+            return outcomes
+        
+        batches = prompter.pack(items)
+        logger.info(f"Пакетная обработка: {len(items)} постов в {len(batches)} пакетах до {batch_size} постов")
+        batch_outcomes = await run_pool(batches, process_batch, self.eliza_limiter.max_concurrency)
+        results = [outcome for outcomes in batch_outcomes if outcomes for outcome in outcomes]
+        results += await run_pool(short_posts, process_post, self.concurrency)
+        
+        logger.info(prompter.get_summary())
+        return results
+    
     async def get_processing_statistics(self):
         """Получает статистику обработки"""
         try:
             # Статистика по постам
-            self.db.cursor.execute("SELECT COUNT(*) as total_posts FROM posts WHERE content IS NOT NULL")
-            posts_stats = self.db.cursor.fetchone()
+            posts_stats = await self.db.fetchone("SELECT COUNT(*) as total_posts FROM posts WHERE content IS NOT NULL")
             
             # Статистика по саммари
-            self.db.cursor.execute("SELECT COUNT(*) as total_summaries FROM post_summaries")
-            summaries_stats = self.db.cursor.fetchone()
+            summaries_stats = await self.db.fetchone("SELECT COUNT(*) as total_summaries FROM post_summaries")
             
             # Посты без саммари
-            self.db.cursor.execute("""
+            pending_stats = await self.db.fetchone("""
                 SELECT COUNT(*) as posts_without_summaries FROM posts p
                 LEFT JOIN post_summaries ps ON p.channel_id = ps.channel_id 
                     AND p.telegram_message_id = ps.telegram_message_id
                 WHERE ps.id IS NULL AND p.content IS NOT NULL AND p.content != ''
+                AND (p.cluster_id IS NULL OR p.cluster_id = p.id)
             """)
-            pending_stats = self.db.cursor.fetchone()
             
             logger.info("📊 Статистика обработки саммари:")
             logger.info(f"   Всего постов с контентом: {posts_stats['total_posts']}")
@@ -294,6 +416,8 @@ async def main():
     parser.add_argument("--stats", action="store_true", help="Показать статистику обработки")
     parser.add_argument("--test", action="store_true", help="Тестировать создание саммари")
     parser.add_argument("--limit", type=int, help="Ограничить количество постов для обработки")
+    parser.add_argument("--batch-size", type=int, default=AISettings.BATCH_MAX_POSTS,
+                        help="Постов в одном запросе к LLM (1 — без пакетов)")
     
     args = parser.parse_args()
     
@@ -308,13 +432,14 @@ async def main():
         await processor.get_processing_statistics()
     
     if args.process:
-        await processor.process_posts_to_summaries(args.limit)
+        await processor.process_posts_to_summaries(args.limit, args.batch_size)
     
     if not any([args.process, args.stats, args.test]):
         print("Использование:")
         print("  python summary_processor.py --test                    # Тестировать создание саммари")
         print("  python summary_processor.py --process                 # Обработать все посты")
         print("  python summary_processor.py --process --limit 10      # Обработать 10 постов")
+        print("  python summary_processor.py --process --batch-size 1  # Обработать посты без пакетных запросов")
         print("  python summary_processor.py --stats                   # Показать статистику")
 
 if __name__ == "__main__":
@@ -25,7 +25,7 @@ logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler('telegram_export.log'),
+        logging.FileHandler('telegram_export.log', delay=True),
         logging.StreamHandler()
     ]
 )
@@ -98,6 +98,8 @@ if not telethon_installed:
                 importlib.reload(site)
                 
                 from telethon import TelegramClient, events
+                from telethon.errors import FloodWaitError
+                from telethon.tl.functions.messages import GetMessagesViewsRequest
                 from telethon.tl.types import InputPeerChannel, InputPeerChat, InputPeerUser
                 print("Модуль telethon успешно импортирован!")
             except ImportError:
@@ -111,13 +113,17 @@ if not telethon_installed:
 else:
     # Импортируем telethon, если он установлен
     from telethon import TelegramClient, events
+    from telethon.errors import FloodWaitError
+    from telethon.tl.functions.messages import GetMessagesViewsRequest
     from telethon.tl.types import InputPeerChannel, InputPeerChat, InputPeerUser
 
 # Импорт наших модулей
 try:
-    from config import (TELEGRAM_API_ID, TELEGRAM_API_HASH, SESSION_PATH, DEFAULT_EXPORT_DIR)
-    from database import DatabaseManager
+    from config import (TELEGRAM_API_ID, TELEGRAM_API_HASH, SESSION_PATH, DEFAULT_EXPORT_DIR,
+                        EXPORT_BATCH_SIZE, EXPORT_METRICS_REFRESH_HOURS)
+    from async_database import AsyncDatabaseManager
     from models import (Channel, Post, ReactionParser, MessageProcessor, ExportStats)
+    from channel_export import ExportProgress
 except ImportError as e:
     logger.error(f"Ошибка импорта модулей: {e}")
     print("Убедитесь, что все необходимые файлы находятся в директории скрипта")
@@ -137,18 +143,56 @@ async def get_entity_by_name_or_id(client, chat_identifier):
             chat_id = int(chat_identifier)
             try:
                 return await client.get_entity(chat_id)
+            except FloodWaitError:
+                raise
             except Exception as e:
                 print(f"Не удалось найти чат по ID {chat_id}: {e}")
                 pass
         
         # Пробуем интерпретировать как юзернейм или название
         return await client.get_entity(chat_identifier)
+    except FloodWaitError:
+        # Ожидание решает вызывающий код (общий лимитер параллельного экспорта)
+        raise
     except Exception as e:
         print(f"Ошибка при поиске чата: {e}")
         return None
 
+# Сколько ID сообщений запрашивается за один GetMessagesViews
+METRICS_REFRESH_CHUNK = 100
+
+async def refresh_recent_metrics(client, chat_entity, channel_id, db_manager, hours=24, max_message_id=None):
+    """
+    Обновляет просмотры, репосты и ответы постов канала за последние hours часов
+    
+    Вместо повторного получения сообщений запрашивает только счетчики
+    (messages.getMessagesViews) и записывает их одним UPDATE.
+    
+    Args:
+        client: клиент Telethon
+        chat_entity: объект чата/канала
+        channel_id: ID канала в БД
+        db_manager: менеджер базы данных
+        hours: окно обновления в часах
+        max_message_id: обновлять только сообщения с ID не больше этого
+    
+    Returns:
+        int: количество обновленных постов или None при ошибке записи
+    """
+    message_ids = await db_manager.get_recent_message_ids(channel_id, hours, max_message_id)
+    metrics = []
+    for i in range(0, len(message_ids), METRICS_REFRESH_CHUNK):
+        chunk = message_ids[i:i + METRICS_REFRESH_CHUNK]
+        result = await client(GetMessagesViewsRequest(peer=chat_entity, id=chunk, increment=False))
+        for message_id, views in zip(chunk, result.views):
+            replies = views.replies.replies if views.replies else 0
+            metrics.append((message_id, views.views or 0, views.forwards or 0, replies))
+    return await db_manager.update_post_metrics(channel_id, metrics)
+
 async def export_chat_history(client, chat_entity, limit=None, offset_date=None, output_file=None,
-                             save_to_db=True, db_manager=None, last_24_hours_only=True):
+                             save_to_db=True, db_manager=None, last_24_hours_only=True,
+                             incremental=False, refresh_metrics_hours=EXPORT_METRICS_REFRESH_HOURS,
+                             progress=None):
     """
     Экспортирует историю сообщений из указанного чата в файл и базу данных
     
@@ -161,12 +205,18 @@ async def export_chat_history(client, chat_entity, limit=None, offset_date=None,
         save_to_db: сохранять ли в базу данных
         db_manager: менеджер базы данных
         last_24_hours_only: экспортировать только сообщения за последние 24 часа
+        incremental: продолжить с последнего сохраненного сообщения канала (min_id);
+                     окно last_24_hours_only применяется только к первому экспорту
+        refresh_metrics_hours: при инкрементальном экспорте обновить метрики постов
+                               за столько часов (0 — не обновлять)
+        progress: ExportProgress прошлых попыток; после FloodWait экспорт продолжается
+                  с последнего сохраненного сообщения с той же статистикой
     
     Returns:
         tuple: (путь к файлу, статистика экспорта)
     """
-    stats = ExportStats()
-    stats.add_channel()
+    progress = progress or ExportProgress()
+    stats = progress.start(ExportStats)
     
     # Анализ контента отключен
     logger.info("Анализ контента через Zeliboba отключен")
@@ -190,7 +240,7 @@ async def export_chat_history(client, chat_entity, limit=None, offset_date=None,
             username=chat_username,
             type=chat_type
         )
-        channel_id = db_manager.save_channel(
+        channel_id = await db_manager.save_channel(
             channel.telegram_id,
             channel.title,
             channel.username,
@@ -200,6 +250,23 @@ async def export_chat_history(client, chat_entity, limit=None, offset_date=None,
             logger.warning("Не удалось сохранить канал в БД, продолжаем без сохранения в БД")
             save_to_db = False
     
+    # Инкрементальный экспорт: запрашиваем только сообщения новее сохраненной отметки
+    min_id = 0
+    incremental = bool(incremental and save_to_db and channel_id)
+    if incremental:
+        min_id = await db_manager.get_last_message_id(channel_id)
+        if min_id is None:
+            logger.warning("Не удалось получить состояние экспорта канала, экспортируем без отметки")
+            incremental = False
+            min_id = 0
+        elif min_id:
+            logger.info(f"Инкрементальный экспорт с сообщения {min_id}")
+    
+    # Повтор после FloodWait: сообщения до отметки прошлой попытки уже обработаны
+    if progress.last_message_id > min_id:
+        min_id = progress.last_message_id
+        logger.info(f"Продолжаем экспорт с сообщения {min_id}")
+    
     # Создаем текущую дату для использования в имени файла и заголовке
     current_date = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M")
     
@@ -221,23 +288,49 @@ async def export_chat_history(client, chat_entity, limit=None, offset_date=None,
     print(f"Экспорт чата '{chat_title}' в файл '{filename}'...")
     
     # Вычисляем дату для фильтрации (24 часа назад)
-    if last_24_hours_only and not offset_date:
+    if last_24_hours_only and not offset_date and not min_id:
         offset_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=24)
         print(f"Экспортируем только сообщения за последние 24 часа (с {offset_date.strftime('%Y-%m-%d %H:%M:%S UTC')})")
     
     # Получаем сообщения
-    messages_for_file = []
+    messages_for_file = progress.file_lines
     processed_count = 0
     
+    # Посты и реакции пишутся в БД пачками: одна транзакция на EXPORT_BATCH_SIZE сообщений
+    pending_posts = []
+    pending_reactions = {}
+    # Отметка последнего полученного сообщения пишется в транзакции пачки:
+    # следующий запуск продолжит ровно с последней сохраненной пачки
+    last_seen_id = saved_mark = min_id
+    
+    async def flush_posts():
+        """Пишет накопленную пачку; False, если пачка потеряна"""
+        nonlocal incremental, saved_mark
+        marks = {channel_id: last_seen_id} if incremental and last_seen_id > saved_mark else None
+        if not pending_posts and not marks:
+            return True
+        post_ids = await db_manager.save_posts_batch(pending_posts, pending_reactions, high_water_marks=marks)
+        if post_ids is None:
+            stats.add_error(len(pending_posts))
+            # Не сдвигаем отметку за потерянную пачку: она будет получена повторно
+            incremental = False
+        else:
+            stats.add_db_save(len(post_ids))
+            saved_mark = last_seen_id
+        pending_posts.clear()
+        pending_reactions.clear()
+        return post_ids is not None
+    
     try:
         async for message in client.iter_messages(
             chat_entity,
             limit=limit,
             offset_date=offset_date,
+            min_id=min_id,
             reverse=True  # Сообщения в хронологическом порядке
         ):
             # Дополнительная проверка времени сообщения для точной фильтрации
-            if last_24_hours_only and message.date:
+            if last_24_hours_only and not min_id and message.date:
                 # Проверяем, что сообщение не старше 24 часов
                 now = datetime.datetime.now(datetime.timezone.utc)
                 message_time = message.date.replace(tzinfo=datetime.timezone.utc) if message.date.tzinfo is None else message.date
@@ -255,36 +348,21 @@ async def export_chat_history(client, chat_entity, limit=None, offset_date=None,
                 if save_to_db and db_manager and channel_id:
                     post = MessageProcessor.extract_message_data(message, channel_id)
                     if post:
-                        post_id = db_manager.save_post(
-                            post.channel_id,
-                            post.telegram_message_id,
-                            post.sender_name,
-                            post.sender_id,
-                            post.content,
-                            post.date_published,
-                            post.views_count,
-                            post.forwards_count,
-                            post.replies_count
-                        )
+                        pending_posts.append(post)
                         
-                        if post_id:
-                            stats.add_db_save()
-                            
-                            # Сохраняем реакции если есть
-                            if hasattr(message, 'reactions') and message.reactions:
-                                reactions_data = ReactionParser.parse_reactions(message.reactions)
-                                if reactions_data:
-                                    # Нормализуем типы реакций
-                                    normalized_reactions = {
-                                        ReactionParser.normalize_reaction_type(k): v
-                                        for k, v in reactions_data.items()
-                                    }
-                                    db_manager.save_reactions(post_id, normalized_reactions)
-                        else:
-                            stats.add_error()
+                        # Реакции сохраняются вместе с пачкой постов
+                        if hasattr(message, 'reactions') and message.reactions:
+                            reactions_data = ReactionParser.parse_reactions(message.reactions)
+                            if reactions_data:
+                                # Нормализуем типы реакций
+                                pending_reactions[(post.channel_id, post.telegram_message_id)] = {
+                                    ReactionParser.normalize_reaction_type(k): v
+                                    for k, v in reactions_data.items()
+                                }
                         
-                        # Анализ контента отключен
-                        logger.debug(f"Анализ контента для поста {post_id} отключен")
+                        if len(pending_posts) >= EXPORT_BATCH_SIZE:
+                            last_seen_id = message.id
+                            await flush_posts()
                 
                 # Обработка сообщения для сохранения в файл
                 sender = message.sender
@@ -301,11 +379,36 @@ async def export_chat_history(client, chat_entity, limit=None, offset_date=None,
                 formatted_message = MessageProcessor.format_message_for_file(message, sender_name)
                 messages_for_file.append(formatted_message)
                 stats.add_file_save()
+            
+            last_seen_id = max(last_seen_id, message.id)
                 
+    except FloodWaitError:
+        # Уже полученные сообщения сохраняем, ожидание решает вызывающий код;
+        # повторная попытка продолжит после последнего сохраненного сообщения
+        progress.last_message_id = last_seen_id if await flush_posts() else saved_mark
+        raise
     except Exception as e:
         logger.error(f"Ошибка при получении сообщений: {e}")
         stats.add_error()
     
+    # Дописываем неполную пачку, в том числе после ошибки получения сообщений
+    await flush_posts()
+    
+    # Метрики ранее сохраненных постов обновляем отдельным дешевым запросом
+    if incremental and min_id and refresh_metrics_hours:
+        try:
+            refreshed = await refresh_recent_metrics(client, chat_entity, channel_id, db_manager,
+                                                     refresh_metrics_hours, max_message_id=min_id)
+            if refreshed is None:
+                stats.add_error()
+            else:
+                stats.add_metrics_refresh(refreshed)
+        except FloodWaitError:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка обновления метрик постов: {e}")
+            stats.add_error()
+    
     # Записываем сообщения в файл
     if messages_for_file:
         try:
@@ -350,6 +453,7 @@ def parse_arguments():
     parser.add_argument("--db-only", action="store_true", help="Сохранять только в базу данных (без текстового файла)")
     parser.add_argument("--init-db", action="store_true", help="Инициализировать базу данных и выйти")
     parser.add_argument("--all-time", action="store_true", help="Экспортировать все сообщения (по умолчанию только за последние 24 часа)")
+    parser.add_argument("--incremental", action="store_true", help="Экспортировать только новые сообщения с прошлого запуска (нужна БД)")
     return parser.parse_args()
 
 async def main():
@@ -360,9 +464,9 @@ async def main():
     db_manager = None
     if args.init_db:
         print("Инициализация базы данных...")
-        db_manager = DatabaseManager()
+        db_manager = AsyncDatabaseManager(max_size=1)
         if db_manager.connect():
-            if db_manager.create_tables():
+            if await db_manager.create_tables():
                 print("База данных успешно инициализирована!")
             else:
                 print("Ошибка при создании таблиц")
@@ -380,13 +484,13 @@ async def main():
     # Подключение к базе данных (если не отключено)
     save_to_db = not args.no_db
     if save_to_db:
-        db_manager = DatabaseManager()
+        db_manager = AsyncDatabaseManager()
         if not db_manager.connect():
             print("Предупреждение: Не удалось подключиться к базе данных. Продолжаем без сохранения в БД.")
             save_to_db = False
         else:
             # Создаем таблицы если их нет
-            db_manager.create_tables()
+            await db_manager.create_tables()
     
     # Создаем клиент Telegram
     session_path = os.path.join(SCRIPT_DIR, SESSION_PATH)
@@ -471,7 +575,8 @@ async def main():
             output_file=output_file,
             save_to_db=save_to_db,
             db_manager=db_manager,
-            last_24_hours_only=last_24_hours_only
+            last_24_hours_only=last_24_hours_only,
+            incremental=args.incremental
         )
         
         # Выводим статистику
@@ -485,9 +590,9 @@ async def main():
             # Получаем статистику канала из БД
             try:
                 # Получаем ID канала по telegram_id
-                channel_info = db_manager.get_channel_by_telegram_id(chat_entity.id)
+                channel_info = await db_manager.get_channel_by_telegram_id(chat_entity.id)
                 if channel_info:
-                    channel_stats = db_manager.get_channel_stats(channel_info[0])  # channel_info[0] это ID канала
+                    channel_stats = await db_manager.get_channel_stats(channel_info[0])  # channel_info[0] это ID канала
                     if channel_stats:
                         print(f"Статистика канала в БД: {channel_stats}")
             except Exception as e:
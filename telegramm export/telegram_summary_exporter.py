@@ -46,16 +46,20 @@ if not telethon_installed:
 else:
     # Импортируем telethon, если он установлен
     from telethon import TelegramClient, events
+    from telethon.errors import FloodWaitError
     from telethon.tl.types import InputPeerChannel, InputPeerChat, InputPeerUser
 
 # Импорт наших модулей
 try:
     from config import (TELEGRAM_API_ID, TELEGRAM_API_HASH, SESSION_PATH, DEFAULT_EXPORT_DIR,
                        ZELIBOBA_API_TOKEN, ZELIBOBA_BASE_URL, ZELIBOBA_MODEL_NAME,
-                       ZELIBOBA_TEMPERATURE)
-    from database import DatabaseManager
+                       ZELIBOBA_TEMPERATURE, AISettings)
+    from async_database import AsyncDatabaseManager
     from models import (Channel, PostSummary, ReactionParser, MessageProcessor, ExportStats,
                        ZelibobaAnalyzer)
+    from llm_cache import LLMCache
+    from llm_pool import estimate_tokens, get_limiter
+    from channel_export import ExportProgress
 except ImportError as e:
     logger.error(f"Ошибка импорта модулей: {e}")
     print("Убедитесь, что все необходимые файлы находятся в директории скрипта")
@@ -86,6 +90,14 @@ class SummaryExportStats(ExportStats):
         """Увеличить счетчик слишком коротких постов"""
         self.posts_too_short += 1
     
+    def merge(self, other: ExportStats) -> 'SummaryExportStats':
+        """Добавить счетчики другой статистики, включая счетчики саммари"""
+        super().merge(other)
+        self.summaries_created += getattr(other, 'summaries_created', 0)
+        self.summaries_failed += getattr(other, 'summaries_failed', 0)
+        self.posts_too_short += getattr(other, 'posts_too_short', 0)
+        return self
+    
     def get_summary(self) -> str:
         """Получить сводку статистики с саммари"""
         base_summary = super().get_summary()
@@ -111,12 +123,17 @@ async def get_entity_by_name_or_id(client, chat_identifier):
             chat_id = int(chat_identifier)
             try:
                 return await client.get_entity(chat_id)
+            except FloodWaitError:
+                raise
             except Exception as e:
                 print(f"Не удалось найти чат по ID {chat_id}: {e}")
                 pass
         
         # Пробуем интерпретировать как юзернейм или название
         return await client.get_entity(chat_identifier)
+    except FloodWaitError:
+        # Ожидание решает вызывающий код (общий лимитер параллельного экспорта)
+        raise
     except Exception as e:
         print(f"Ошибка при поиске чата: {e}")
         return None
@@ -172,7 +189,8 @@ def extract_summary_parts(analysis_text: str) -> tuple:
         return analysis_text[:200] + "..." if len(analysis_text) > 200 else analysis_text, analysis_text
 
 async def export_chat_with_summaries(client, chat_entity, limit=None, offset_date=None, output_file=None,
-                                   save_to_db=True, db_manager=None, last_24_hours_only=True):
+                                   save_to_db=True, db_manager=None, last_24_hours_only=True, llm_cache=None,
+                                   progress=None):
     """
     Экспортирует историю сообщений из указанного чата, создавая саммари вместо сохранения полных текстов
     
@@ -185,12 +203,15 @@ async def export_chat_with_summaries(client, chat_entity, limit=None, offset_dat
         save_to_db: сохранять ли в базу данных
         db_manager: менеджер базы данных
         last_24_hours_only: экспортировать только сообщения за последние 24 часа
+        llm_cache: кэш ответов LLM (LLMCache), общий для нескольких каналов
+        progress: ExportProgress прошлых попыток; после FloodWait экспорт продолжается
+                  с последнего обработанного сообщения с той же статистикой
     
     Returns:
         tuple: (путь к файлу, статистика экспорта)
     """
-    stats = SummaryExportStats()
-    stats.add_channel()
+    progress = progress or ExportProgress()
+    stats = progress.start(SummaryExportStats)
     
     # Инициализация анализатора Zeliboba
     if not ZELIBOBA_API_TOKEN:
@@ -207,6 +228,11 @@ async def export_chat_with_summaries(client, chat_entity, limit=None, offset_dat
     
     logger.info(f"Zeliboba анализатор инициализирован с моделью: {ZELIBOBA_MODEL_NAME}")
     
+    # Одна и та же новость в разных каналах суммаризуется один раз
+    own_cache = llm_cache is None
+    if own_cache:
+        llm_cache = LLMCache(db_manager if save_to_db else None)
+    
     # Получаем информацию о чате
     chat_title = getattr(chat_entity, 'title', None) or getattr(chat_entity, 'first_name', None)
     if not chat_title:
@@ -226,7 +252,7 @@ async def export_chat_with_summaries(client, chat_entity, limit=None, offset_dat
             username=chat_username,
             type=chat_type
         )
-        channel_id = db_manager.save_channel(
+        channel_id = await db_manager.save_channel(
             channel.telegram_id,
             channel.title,
             channel.username,
@@ -262,16 +288,27 @@ async def export_chat_with_summaries(client, chat_entity, limit=None, offset_dat
         print(f"Экспортируем только сообщения за последние 24 часа (с {offset_date.strftime('%Y-%m-%d %H:%M:%S UTC')})")
     
     # Получаем сообщения
-    summaries_for_file = []
+    summaries_for_file = progress.file_lines
     processed_count = 0
     
+    # Повтор после FloodWait: сообщения до отметки прошлой попытки уже обработаны
+    min_id = progress.last_message_id
+    if min_id:
+        logger.info(f"Продолжаем экспорт с сообщения {min_id}")
+    last_seen_id = min_id
+    
     try:
         async for message in client.iter_messages(
             chat_entity,
             limit=limit,
             offset_date=offset_date,
+            min_id=min_id,
             reverse=True  # Сообщения в хронологическом порядке
         ):
+            # Сообщение обрабатывается целиком до следующего запроса к Telegram,
+            # поэтому FloodWait в iter_messages приходит уже после его сохранения
+            last_seen_id = message.id
+            
             # Дополнительная проверка времени сообщения для точной фильтрации
             if last_24_hours_only and message.date:
                 # Проверяем, что сообщение не старше 24 часов
@@ -314,7 +351,14 @@ async def export_chat_with_summaries(client, chat_entity, limit=None, offset_dat
                     # Создаем саммари через GPT
                     logger.debug(f"Создаем саммари для сообщения {message.id}")
                     
-                    summary_result = await zeliboba_analyzer.create_summary(message.text)
+                    # Каналы экспортируются параллельно: темп запросов задает общая квота Zeliboba
+                    summary_result = await llm_cache.get_or_call(
+                        'zeliboba', ZELIBOBA_MODEL_NAME, ZELIBOBA_TEMPERATURE, 'summarize', message.text,
+                        lambda: get_limiter('zeliboba').call(
+                            lambda: zeliboba_analyzer.create_summary(message.text),
+                            estimate_tokens(message.text, AISettings.ZELIBOBA['max_tokens'])
+                        )
+                    )
                     
                     if summary_result and summary_result.get("status") == "success":
                         analysis_text = summary_result.get("analysis_text", "")
@@ -325,7 +369,7 @@ async def export_chat_with_summaries(client, chat_entity, limit=None, offset_dat
                             
                             # Сохраняем саммари в базу данных
                             if save_to_db and db_manager and channel_id:
-                                summary_id = db_manager.save_post_summary(
+                                summary_id = await db_manager.save_post_summary(
                                     channel_id=channel_id,
                                     telegram_message_id=message.id,
                                     sender_name=sender_name,
@@ -350,7 +394,7 @@ async def export_chat_with_summaries(client, chat_entity, limit=None, offset_dat
                                                 ReactionParser.normalize_reaction_type(k): v
                                                 for k, v in reactions_data.items()
                                             }
-                                            db_manager.save_reactions(summary_id, normalized_reactions)
+                                            await db_manager.save_reactions(summary_id, normalized_reactions)
                                 else:
                                     stats.add_error()
                             
@@ -379,18 +423,24 @@ async def export_chat_with_summaries(client, chat_entity, limit=None, offset_dat
                         logger.error(f"❌ Ошибка создания саммари для сообщения {message.id}: {error_message}")
                         stats.add_summary_failed()
                     
-                    # Пауза между запросами к API
-                    await asyncio.sleep(1.0)
-                    
                 except Exception as e:
                     logger.error(f"❌ Исключение при создании саммари для сообщения {message.id}: {e}")
                     stats.add_summary_failed()
                     stats.add_error()
                 
+    except FloodWaitError:
+        # Сохраненные саммари уже в БД, ожидание решает вызывающий код;
+        # повторная попытка продолжит после последнего обработанного сообщения
+        progress.last_message_id = last_seen_id
+        raise
     except Exception as e:
         logger.error(f"Ошибка при получении сообщений: {e}")
         stats.add_error()
     
+    # Счетчики попаданий общего кэша записывает его владелец
+    if own_cache:
+        await llm_cache.flush_hits()
+    
     # Записываем саммари в файл
     if summaries_for_file:
         try:
@@ -445,9 +495,9 @@ async def main():
     db_manager = None
     if args.init_db:
         print("Инициализация базы данных...")
-        db_manager = DatabaseManager()
+        db_manager = AsyncDatabaseManager(max_size=1)
         if db_manager.connect():
-            if db_manager.create_tables():
+            if await db_manager.create_tables():
                 print("База данных успешно инициализирована!")
             else:
                 print("Ошибка при создании таблиц")
@@ -471,13 +521,13 @@ async def main():
     # Подключение к базе данных (если не отключено)
     save_to_db = not args.no_db
     if save_to_db:
-        db_manager = DatabaseManager()
+        db_manager = AsyncDatabaseManager()
         if not db_manager.connect():
             print("Предупреждение: Не удалось подключиться к базе данных. Продолжаем без сохранения в БД.")
             save_to_db = False
         else:
             # Создаем таблицы если их нет
-            db_manager.create_tables()
+            await db_manager.create_tables()
     
     # Создаем клиент Telegram
     session_path = os.path.join(SCRIPT_DIR, SESSION_PATH + "_summary")
@@ -576,9 +626,9 @@ async def main():
             # Получаем статистику канала из БД
             try:
                 # Получаем ID канала по telegram_id
-                channel_info = db_manager.get_channel_by_telegram_id(chat_entity.id)
+                channel_info = await db_manager.get_channel_by_telegram_id(chat_entity.id)
                 if channel_info:
-                    channel_stats = db_manager.get_channel_stats(channel_info[0])  # channel_info[0] это ID канала
+                    channel_stats = await db_manager.get_channel_stats(channel_info[0])  # channel_info[0] это ID канала
                     if channel_stats:
                         print(f"Статистика канала в БД: {channel_stats}")
             except Exception as e:
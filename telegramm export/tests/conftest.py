@@ -0,0 +1,21 @@
+"""
+Общая настройка тестов модулей экспорта и анализа
+
+Запуск: python -m pytest tests
+"""
+
+import logging
+import os
+import sys
+
+# Тестируемые модули лежат в каталоге выше и импортируются по имени (import config)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config требует эти переменные при импорте; БД, Telegram и API в тестах не используются
+for key in ('TELEGRAM_API_ID', 'TELEGRAM_API_HASH', 'ELIZA_API_TOKEN', 'SOY_TOKEN', 'DB_PASSWORD'):
+    os.environ.setdefault(key, '1')
+
+# Модули экспорта при импорте вызывают logging.basicConfig с записью в
+# telegram_export.log и summary_processor.log; если у корневого логгера уже есть
+# обработчик, basicConfig ничего не делает и тесты не пишут в логи проекта
+logging.getLogger().addHandler(logging.NullHandler())
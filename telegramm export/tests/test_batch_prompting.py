@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Тесты разбора пакетных ответов LLM и раскладки постов по пакетам (batch_prompting.py)
+
+Запуск: python -m pytest tests/test_batch_prompting.py
+"""
+
+import json
+
+from batch_prompting import BatchPrompter, parse_batch_response
+from llm_pool import estimate_tokens
+
+FIELDS = ('main_idea', 'summary', 'importance')
+
+
+def answer(item_id, importance=7):
+    return {'id': item_id, 'main_idea': f'мысль {item_id}', 'summary': f'саммари {item_id}', 'importance': importance}
+
+
+def make_prompter(**kwargs):
+    return BatchPrompter(None, 'Проанализируй посты', 'eliza', 'model', 0.3, **kwargs)
+
+
+def test_plain_array():
+    text = json.dumps([answer(1), answer(2, 15)], ensure_ascii=False)
+    results = parse_batch_response(text, [1, 2], FIELDS)
+    assert results[1] == {'main_idea': 'мысль 1', 'summary': 'саммари 1', 'importance': 7.0}
+    assert results[2]['importance'] == 10.0
+
+
+def test_fenced_json_after_brackets_in_prose():
+    text = ("Ответ на тексты [1] и [2]:\n```json\n"
+            + json.dumps([answer(1), answer(2)], ensure_ascii=False)
+            + "\n```\nСм. [примечание].")
+    assert sorted(parse_batch_response(text, [1, 2], FIELDS)) == [1, 2]
+
+
+def test_truncated_answer_keeps_complete_objects():
+    full = json.dumps([answer(1), answer(2), answer(3)], ensure_ascii=False)
+    truncated = full[:full.index('"id": 3') + 20]
+    assert sorted(parse_batch_response(truncated, [1, 2, 3], FIELDS)) == [1, 2]
+
+
+def test_duplicate_ids_keep_first_answer():
+    text = json.dumps([answer(1, 3), answer(1, 9)], ensure_ascii=False)
+    assert parse_batch_response(text, [1], FIELDS)[1]['importance'] == 3.0
+
+
+def test_out_of_batch_and_incomplete_answers_are_dropped():
+    incomplete = {'id': 2, 'main_idea': 'мысль', 'summary': '', 'importance': 'высокая'}
+    text = json.dumps([answer(1), incomplete, answer(42)], ensure_ascii=False)
+    assert list(parse_batch_response(text, [1, 2], FIELDS)) == [1]
+
+
+def test_unparseable_answer():
+    assert parse_batch_response("Не могу ответить [ошибка]", [1], FIELDS) == {}
+
+
+def test_pack_respects_max_items():
+    items = [(i, 'короткий пост') for i in range(7)]
+    batches = make_prompter(max_items=3).pack(items)
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert [item for batch in batches for item in batch] == items
+
+
+def test_pack_respects_token_budget():
+    prompter = make_prompter(max_items=100, response_tokens=100)
+    post = 'слово ' * 200
+    cost = estimate_tokens(post, 100)
+    prompter.token_budget = estimate_tokens(prompter.prompt) + 2 * cost
+    batches = prompter.pack([(i, post) for i in range(5)])
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+
+def test_pack_puts_oversized_post_alone():
+    prompter = make_prompter(max_items=10, token_budget=1000, response_tokens=10)
+    items = [(1, 'пост'), (2, 'огромный пост ' * 1000), (3, 'пост')]
+    assert prompter.pack(items) == [[(1, 'пост')], [items[1]], [(3, 'пост')]]
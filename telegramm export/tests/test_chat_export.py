@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Тесты инкрементального экспорта канала: отметка последнего сообщения (telegram_chat_exporter.py)
+и продолжение экспорта после FloodWait (channel_export.py)
+
+Запуск: python -m pytest tests/test_chat_export.py
+"""
+
+import asyncio
+import datetime
+from types import SimpleNamespace
+
+from telethon.errors import FloodWaitError
+
+import telegram_chat_exporter
+from channel_export import FloodWaitLimiter, export_channels
+from models import ExportStats
+from telegram_chat_exporter import export_chat_history
+
+CHANNEL_ID = 7
+CHAT = SimpleNamespace(id=1001, title='Тестовый канал', username='test', broadcast=True)
+
+
+class FakeClient:
+    def __init__(self, messages):
+        self.messages = messages
+        self.min_ids = []
+
+    async def iter_messages(self, entity, limit=None, offset_date=None, min_id=0, reverse=False):
+        self.min_ids.append(min_id)
+        for message in self.messages:
+            if message.id > min_id:
+                yield message
+
+
+class FakeDatabase:
+    """Сохраненная отметка канала и пачки постов; пачки с номерами из failing не сохраняются"""
+
+    def __init__(self, mark, failing=()):
+        self.mark = mark
+        self.failing = set(failing)
+        self.calls = []
+
+    async def save_channel(self, telegram_id, title, username, chat_type):
+        return CHANNEL_ID
+
+    async def get_last_message_id(self, channel_id):
+        return self.mark
+
+    async def save_posts_batch(self, posts, reactions, high_water_marks=None):
+        failed = len(self.calls) in self.failing
+        self.calls.append(([post.telegram_message_id for post in posts], high_water_marks, not failed))
+        if failed:
+            return None
+        if high_water_marks:
+            self.mark = high_water_marks[CHANNEL_ID]
+        return {(post.channel_id, post.telegram_message_id): i for i, post in enumerate(posts)}
+
+
+def message(message_id, text='Новость'):
+    return SimpleNamespace(id=message_id, text=text, date=datetime.datetime.now(datetime.timezone.utc),
+                           sender=None, views=0, forwards=0, replies=None, reactions=None)
+
+
+def export(client, db, tmp_path, monkeypatch):
+    monkeypatch.setattr(telegram_chat_exporter, 'EXPORT_BATCH_SIZE', 2)
+    return asyncio.run(export_chat_history(client, CHAT, output_file=str(tmp_path / 'chat.txt'), db_manager=db,
+                                           incremental=True, refresh_metrics_hours=0))
+
+
+def test_mark_is_written_with_each_batch(tmp_path, monkeypatch):
+    # Последнее сообщение без текста: поста нет, но отметка все равно сдвигается
+    client = FakeClient([message(i) for i in range(11, 16)] + [message(16, text=None)])
+    db = FakeDatabase(mark=10)
+    _, stats = export(client, db, tmp_path, monkeypatch)
+
+    assert client.min_ids == [10]
+    assert db.calls == [([11, 12], {CHANNEL_ID: 12}, True),
+                        ([13, 14], {CHANNEL_ID: 14}, True),
+                        ([15], {CHANNEL_ID: 16}, True)]
+    assert db.mark == 16
+    assert stats.saved_to_db == 5
+
+
+def test_mark_stops_at_last_committed_batch(tmp_path, monkeypatch):
+    client = FakeClient([message(i) for i in range(11, 18)])
+    db = FakeDatabase(mark=10, failing={1})
+    export(client, db, tmp_path, monkeypatch)
+
+    # После потерянной пачки отметка больше не передается, даже с успешными пачками
+    assert db.calls == [([11, 12], {CHANNEL_ID: 12}, True),
+                        ([13, 14], {CHANNEL_ID: 14}, False),
+                        ([15, 16], None, True),
+                        ([17], None, True)]
+    assert db.mark == 12
+
+    # Следующий запуск получает потерянную пачку повторно
+    db.failing.clear()
+    db.calls.clear()
+    export(client, db, tmp_path, monkeypatch)
+    assert client.min_ids == [10, 12]
+    assert db.mark == 17
+
+
+def test_no_new_messages_keeps_mark(tmp_path, monkeypatch):
+    db = FakeDatabase(mark=20)
+    export(FakeClient([message(i) for i in range(11, 21)]), db, tmp_path, monkeypatch)
+    assert db.calls == []
+    assert db.mark == 20
+
+
+class FloodingClient(FakeClient):
+    """Перед сообщениями из flood_before один раз отвечает FloodWait на wait секунд"""
+
+    def __init__(self, messages, flood_before, wait=0):
+        super().__init__(messages)
+        self.flood_before = set(flood_before)
+        self.wait = wait
+
+    async def iter_messages(self, entity, limit=None, offset_date=None, min_id=0, reverse=False):
+        self.min_ids.append(min_id)
+        for message in self.messages:
+            if message.id <= min_id:
+                continue
+            if message.id in self.flood_before:
+                self.flood_before.discard(message.id)
+                raise FloodWaitError(request=None, capture=self.wait)
+            yield message
+
+
+def export_all(client, db, tmp_path, monkeypatch):
+    monkeypatch.setattr(telegram_chat_exporter, 'EXPORT_BATCH_SIZE', 2)
+    stats = ExportStats()
+
+    async def resolve(client, name):
+        return CHAT
+
+    results = asyncio.run(export_channels(
+        client, ['test'], export_chat_history, resolve, stats, limiter=FloodWaitLimiter(max_wait=60),
+        output_file=str(tmp_path / 'chat.txt'), db_manager=db, incremental=False, refresh_metrics_hours=0
+    ))
+    return results['test'], stats
+
+
+def test_flood_wait_resumes_from_last_saved_message(tmp_path, monkeypatch):
+    client = FloodingClient([message(i) for i in range(11, 18)], flood_before={14, 16})
+    db = FakeDatabase(mark=0)
+    channel_stats, stats = export_all(client, db, tmp_path, monkeypatch)
+
+    # Каждая попытка продолжает после сохраненного, а не с начала канала
+    assert client.min_ids == [0, 13, 15]
+    assert [ids for ids, _, _ in db.calls] == [[11, 12], [13], [14, 15], [16, 17]]
+    # Статистика и файл включают сообщения всех попыток
+    assert channel_stats.total_messages == 7
+    assert channel_stats.saved_to_db == 7
+    assert channel_stats.channels_processed == 1
+    assert stats.saved_to_db == 7
+    assert (tmp_path / 'chat.txt').read_text(encoding='utf-8').count('Новость') == 7
+
+
+def test_skipped_channel_keeps_saved_messages_in_stats(tmp_path, monkeypatch):
+    client = FloodingClient([message(i) for i in range(11, 18)], flood_before={14}, wait=3600)
+    db = FakeDatabase(mark=0)
+    channel_stats, stats = export_all(client, db, tmp_path, monkeypatch)
+
+    assert channel_stats is None
+    assert client.min_ids == [0]
+    assert stats.saved_to_db == 3
+    assert stats.channels_processed == 1
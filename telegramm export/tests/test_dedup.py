@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Тесты группировки почти одинаковых постов в сюжеты (dedup.py)
+
+Запуск: python -m pytest tests/test_dedup.py
+"""
+
+import asyncio
+import datetime
+
+from dedup import cluster_new_posts, lsh_bands, minhash, similarity
+
+NEWS = ("Отель Хаятт в Москве откроется после ремонта в марте, сообщили в пресс службе сети, "
+        "номера можно бронировать уже сейчас по специальной цене")
+
+
+class FakeDatabase:
+    """Таблицы posts/post_fingerprints/post_lsh_bands в памяти с интерфейсом AsyncDatabaseManager"""
+
+    def __init__(self, posts):
+        self.posts = {post['id']: dict(post, cluster_id=None) for post in posts}
+        self.fingerprints = {}
+        self.bands = []
+
+    async def get_posts_without_fingerprint(self, limit=None):
+        return [post for post_id, post in sorted(self.posts.items()) if post_id not in self.fingerprints][:limit]
+
+    async def find_lsh_candidates(self, bands, since):
+        wanted = set(bands)
+        return [
+            {'band': band, 'band_hash': band_hash, 'post_id': post_id,
+             'signature': self.fingerprints[post_id], 'cluster_id': self.posts[post_id]['cluster_id'],
+             'date_published': self.posts[post_id]['date_published']}
+            for band, band_hash, post_id in self.bands
+            if (band, band_hash) in wanted and self.posts[post_id]['date_published'] >= since
+        ]
+
+    async def save_post_fingerprints(self, fingerprints):
+        for post_id, signature, cluster_id, bands in fingerprints:
+            self.fingerprints[post_id] = signature
+            self.posts[post_id]['cluster_id'] = cluster_id
+            self.bands.extend((band, band_hash, post_id) for band, band_hash in bands)
+        return True
+
+
+def make_posts(*contents):
+    now = datetime.datetime.now()
+    return [{'id': i, 'content': content, 'date_published': now} for i, content in enumerate(contents, 1)]
+
+
+def test_near_duplicates_are_similar():
+    assert similarity(minhash(NEWS), minhash("Срочно! " + NEWS)) > 0.8
+    assert similarity(minhash(NEWS), minhash("Авиакомпания запускает рейс из Казани в Стамбул")) < 0.2
+
+
+def test_wordless_posts_have_no_signature():
+    assert minhash("🔥🔥🔥") == []
+    assert lsh_bands(minhash("👍")) == []
+    assert similarity(minhash("🔥🔥🔥"), minhash("👍")) == 0.0
+
+
+def test_duplicates_join_one_story():
+    db = FakeDatabase(make_posts(NEWS, "Срочно! " + NEWS, "Авиакомпания запускает рейс из Казани в Стамбул"))
+    assert asyncio.run(cluster_new_posts(db)) == (3, 1)
+    assert [db.posts[i]['cluster_id'] for i in (1, 2, 3)] == [1, 1, 3]
+
+
+def test_wordless_posts_are_separate_stories():
+    db = FakeDatabase(make_posts("🔥🔥🔥", "👍", "!!!"))
+    assert asyncio.run(cluster_new_posts(db)) == (3, 0)
+    assert [db.posts[i]['cluster_id'] for i in (1, 2, 3)] == [1, 2, 3]
+    assert db.bands == []
+    # Подпись сохранена: посты не выбираются повторно
+    assert asyncio.run(cluster_new_posts(db)) == (0, 0)
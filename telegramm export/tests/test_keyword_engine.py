@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Тесты оценки текстов по ключевым словам (keyword_engine.py)
+
+Запуск: python -m pytest tests/test_keyword_engine.py
+"""
+
+from keyword_engine import AhoCorasick, KeywordEngine, stem
+
+
+def keywords(engine, text):
+    return engine.score(text).keywords
+
+
+def test_stem():
+    assert stem('отель') == 'отел'
+    assert stem('россия') == 'росс'
+    assert stem('новый') == 'нов'
+    assert stem('китай') == 'кита'
+    assert stem('музей') == 'музе'
+    # Основа не короче трех букв
+    assert stem('виза') == 'виз'
+    assert stem('сша') == 'сша'
+
+
+def test_inflected_forms_match():
+    engine = KeywordEngine()
+    assert keywords(engine, 'Нет свободных отелей') == ['отель']
+    assert keywords(engine, 'Визы в Россию подорожали') == ['виза', 'россия']
+    assert keywords(engine, 'Рейсы из Китая и в Китае') == ['китай', 'рейс']
+    assert keywords(engine, 'Китайские туристы') == ['китай', 'турист']
+
+
+def test_stem_does_not_match_other_words():
+    engine = KeywordEngine()
+    # "кита"/"китов" — формы слова "кит", а не "китай"
+    assert keywords(engine, 'Экскурсия: наблюдение за китами и китов, фото кита') == []
+    # Основа совпадает только в начале слова
+    assert keywords(engine, 'Перевизы') == []
+
+
+def test_noun_j_forms():
+    engine = KeywordEngine({'музей': 8, 'трамвай': 6})
+    assert keywords(engine, 'Музеи и музеев, в музее, музеями') == ['музей']
+    assert keywords(engine, 'Трамваем до центра') == ['трамвай']
+    assert keywords(engine, 'Муза и музы') == []
+
+
+def test_score_and_topic():
+    engine = KeywordEngine()
+    match = engine.score('Новые рейсы в Турцию и отели')
+    assert match.score == 9
+    assert match.topics == ['aviation', 'hotels']
+    assert match.topic == 'aviation'
+    empty = engine.score('Погода в выходные')
+    assert (empty.score, empty.topic, empty.keywords) == (5.0, None, [])
+
+
+def test_phrases_and_batch():
+    engine = KeywordEngine({'безвизовый въезд': 10, 'виза': 9})
+    matches = engine.score_batch(['Открыт безвизовый въезд', 'Визу отменили', ''])
+    assert [match.score for match in matches] == [10, 9, 5.0]
+    assert 'безвизовый въезд' in matches[0].keywords
+
+
+def test_aho_corasick_finds_overlapping_patterns():
+    automaton = AhoCorasick(['he', 'she', 'his', 'hers'])
+    found = sorted((end, automaton.patterns[pattern_id]) for end, pattern_id in automaton.iter('ushers'))
+    assert found == [(4, 'he'), (4, 'she'), (6, 'hers')]
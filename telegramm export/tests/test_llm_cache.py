@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Тесты кэша ответов LLM и объединения одновременных запросов (llm_cache.py)
+
+Запуск: python -m pytest tests/test_llm_cache.py
+"""
+
+import asyncio
+
+import llm_cache
+from llm_cache import LLMCache, make_cache_key
+
+ARGS = ('eliza', 'model', 0.3, 'summarize')
+
+
+class SlowDatabase:
+    """Таблица llm_cache в памяти; чтение ждет события, чтобы воспроизвести гонку"""
+
+    def __init__(self):
+        self.rows = {}
+        self.read_gate = None
+
+    async def get_llm_cache(self, key):
+        if self.read_gate:
+            await self.read_gate.wait()
+        return self.rows.get(key)
+
+    async def save_llm_cache(self, key, provider, model, response_text, usage, ttl):
+        self.rows[key] = {'response_text': response_text, 'usage': usage, 'ttl': ttl}
+
+
+def counting_request(calls, delay=0.01):
+    async def request():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return {"status": "success", "analysis_text": f"ответ {len(calls)}", "usage": {}}
+    return request
+
+
+def test_cache_key_normalizes_whitespace():
+    assert make_cache_key(*ARGS, 'Новость  дня\n') == make_cache_key(*ARGS, 'Новость дня')
+    assert make_cache_key(*ARGS, 'Новость дня') != make_cache_key('zeliboba', *ARGS[1:], 'Новость дня')
+
+
+def test_concurrent_requests_are_coalesced():
+    async def run():
+        cache = LLMCache(lru_size=10)
+        calls = []
+        results = await asyncio.gather(*(
+            cache.get_or_call(*ARGS, 'Новость', counting_request(calls)) for _ in range(3)
+        ))
+        return cache, calls, results
+
+    cache, calls, results = asyncio.run(run())
+    assert len(calls) == 1
+    assert 'cached' not in results[0]
+    assert [result['cached'] for result in results[1:]] == [True, True]
+    assert {result['analysis_text'] for result in results} == {'ответ 1'}
+    assert cache.stats['coalesced'] == 2
+
+
+def test_request_finishing_during_db_read_is_not_repeated():
+    async def run():
+        db = SlowDatabase()
+        cache = LLMCache(db, lru_size=10)
+        calls = []
+        release = asyncio.Event()
+
+        async def first_request():
+            calls.append(1)
+            await release.wait()
+            return {"status": "success", "analysis_text": "ответ 1", "usage": {}}
+
+        first = asyncio.ensure_future(cache.get_or_call(*ARGS, 'Новость', first_request))
+        await asyncio.sleep(0)
+        # Второй вызов промахивается мимо LRU и ждет БД, пока первый запрос завершается
+        db.read_gate = asyncio.Event()
+        second = asyncio.ensure_future(cache.get_or_call(*ARGS, 'Новость', counting_request(calls)))
+        await asyncio.sleep(0)
+        release.set()
+        await first
+        db.rows.clear()
+        db.read_gate.set()
+        return calls, await second
+
+    calls, result = asyncio.run(run())
+    assert len(calls) == 1
+    assert result['analysis_text'] == 'ответ 1'
+    assert result['cached'] is True
+
+
+def test_failed_response_is_not_cached():
+    async def run():
+        cache = LLMCache(lru_size=10)
+
+        async def failing():
+            return {"status": "error", "error": "429"}
+
+        await cache.get_or_call(*ARGS, 'Новость', failing)
+        calls = []
+        return await cache.get_or_call(*ARGS, 'Новость', counting_request(calls)), calls
+
+    result, calls = asyncio.run(run())
+    assert len(calls) == 1
+    assert result['analysis_text'] == 'ответ 1'
+
+
+def test_failed_leader_is_not_shared_with_waiters():
+    async def run():
+        cache = LLMCache(lru_size=10)
+        calls = []
+
+        async def flaky():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            if len(calls) == 1:
+                return {"status": "error", "error": "503"}
+            return {"status": "success", "analysis_text": "ответ", "usage": {}}
+
+        return await asyncio.gather(*(cache.get_or_call(*ARGS, 'Новость', flaky) for _ in range(3))), calls
+
+    results, calls = asyncio.run(run())
+    assert results[0]['status'] == 'error'
+    # Ожидающие не получают ошибку первого запроса: повтор один на всех
+    assert len(calls) == 2
+    assert [result['status'] for result in results[1:]] == ['success', 'success']
+    assert sum(1 for result in results if result.get('cached')) == 1
+
+
+class CountingDatabase:
+    def __init__(self):
+        self.rows = {}
+        self.recorded = []
+
+    async def get_llm_cache(self, key):
+        return self.rows.get(key)
+
+    async def save_llm_cache(self, key, provider, model, response_text, usage, ttl):
+        self.rows[key] = {'response_text': response_text, 'usage': usage, 'ttl': ttl}
+
+    async def record_llm_cache_hits(self, hits):
+        self.recorded.append(hits)
+
+
+def test_hits_are_recorded_in_batches(monkeypatch):
+    monkeypatch.setattr(llm_cache, 'HIT_FLUSH_SIZE', 3)
+
+    async def run():
+        db = CountingDatabase()
+        cache = LLMCache(db, lru_size=10)
+        calls = []
+        for _ in range(5):
+            await cache.get_or_call(*ARGS, 'Новость', counting_request(calls))
+        flushed_early = list(db.recorded)
+        await cache.flush_hits()
+        return db, flushed_early
+
+    db, flushed_early = asyncio.run(run())
+    key = make_cache_key(*ARGS, 'Новость')
+    assert flushed_early == [{key: 3}]
+    assert db.recorded == [{key: 3}, {key: 1}]
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Тесты пакетной обработки постов: переход на одиночные запросы (summary_processor.py)
+
+Запуск: python -m pytest tests/test_summary_processor.py
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from summary_processor import PostSummaryProcessor
+
+CONTENT = 'Авиакомпания открывает прямые рейсы из Москвы в Анталию с первого июня'
+
+
+def make_processor(analyze_content):
+    processor = PostSummaryProcessor.__new__(PostSummaryProcessor)
+    processor.eliza_analyzer = SimpleNamespace(analyze_content=analyze_content)
+    processor.eliza_limiter = SimpleNamespace(call=lambda request, tokens: request(), max_concurrency=2)
+    processor.llm_cache = None
+    processor.concurrency = 2
+    return processor
+
+
+def test_failed_batch_falls_back_to_single_posts():
+    async def analyze_content(content, prompt, max_tokens=None):
+        raise ConnectionError('сеть недоступна')
+
+    processed = []
+
+    async def process_post(numbered_post):
+        processed.append(numbered_post[1]['id'])
+        return True
+
+    async def run():
+        processor = make_processor(analyze_content)
+        posts = [{'id': i, 'content': CONTENT} for i in range(1, 6)] + [{'id': 6, 'content': 'коротко'}]
+        return await processor.process_batches(list(enumerate(posts, 1)), 'Саммари', process_post, 3)
+
+    results = asyncio.run(run())
+    assert results == [True] * 6
+    assert sorted(processed) == [1, 2, 3, 4, 5, 6]